@@ -0,0 +1,101 @@
+###############################
+# ALLOCATIONS BENCHMARK
+# Counts the values every engine builds per iteration of loops where no
+# statement needs a new value: plain variable moves, and literals with
+# arithmetic on small integers. The loop counter is a Number per iteration
+# past the small integers.
+# Values are counted where they are built: Value.__init__, which copies go
+# through too, and new_number, wherever an engine module bound it, unless it
+# gave a shared small integer
+# Usage: python -m benchmarks.allocations [iterations]
+###############################
+import sys
+import compiler.run as run
+from benchmarks.support import reset_globals, run_program
+import compiler.transpiler as transpiler
+import modules.value as value
+
+MOVES = '''
+FUNCTION moves(n)
+    VAR a = 1
+    VAR b = 2
+    VAR t = 0
+    FOR i = 0 TO n THEN
+        t = a
+        a = b
+        b = t
+    END
+    RETURN a
+END
+
+moves(ITERATIONS)
+'''
+
+LITERALS = '''
+FUNCTION literals(n)
+    VAR a = 0
+    VAR s = ""
+    FOR i = 0 TO n THEN
+        a = 7
+        s = "text"
+        a = a * 2 + 1
+    END
+    RETURN a
+END
+
+literals(ITERATIONS)
+'''
+
+# Program and statements in its loop, by name
+PROGRAMS = {
+    'variable moves': (MOVES, 3),
+    'literals': (LITERALS, 3),
+}
+
+built = [0]
+
+def counted_init(init):
+    def wrapper(*args):
+        built[0] += 1
+        return init(*args)
+    return wrapper
+
+# A Number new_number hands out from the small integers is not built
+def counted_new_number(new_number):
+    shared = {id(number) for number in getattr(value, 'SMALL_NUMBERS', ())}
+    def wrapper(*args):
+        number = new_number(*args)
+        if id(number) not in shared: built[0] += 1
+        return number
+    return wrapper
+
+# Count through every binding of the constructors the engines use
+def install():
+    value.Value.__init__ = counted_init(value.Value.__init__)
+    original = value.new_number
+    new_number = counted_new_number(original)
+    for name, module in list(sys.modules.items()):
+        if name.split('.')[0] in ('compiler', 'modules') and getattr(module, 'new_number', None) is original:
+            module.new_number = new_number
+    transpiler.RUNTIME['new_number'] = new_number
+
+def count(engine, program, iterations):
+    built[0] = 0
+    run_program(engine, program.replace("ITERATIONS", str(iterations)))
+    return built[0]
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    install()
+    for title, (program, statements) in PROGRAMS.items():
+        print(f"Values built per iteration, {title}")
+        for engine in run.ENGINES:
+            # The difference between two runs leaves the setup out, and the
+            # loop counter's Number is not a statement's
+            built_values = count(engine, program, 2 * iterations) - count(engine, program, iterations)
+            per_iteration = built_values / iterations
+            print(f"{engine:12} {per_iteration:6.2f} per iteration  {(per_iteration - 1) / statements:5.2f} per statement")
+    reset_globals()
+
+if __name__ == '__main__':
+    main()
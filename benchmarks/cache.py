@@ -0,0 +1,57 @@
+###############################
+# CACHE BENCHMARK
+# Compares getting the AST of a library script by lexing and parsing it with
+# getting it from the in-process LRU and from the on-disk cache in a fresh
+# cache object, including reading the script through ASTCache.read
+# Usage: python -m benchmarks.cache [size_in_kb]
+###############################
+import os
+import sys
+import tempfile
+import time
+import compiler.run as run
+from benchmarks.parser import make_source
+from compiler.cache import ASTCache
+from modules.diagnostics import NullDiagnostics
+
+def best_of(function, repeat=200):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    size_kb = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'library.coffee')
+    with open(path, 'w') as file:
+        file.write(make_source(size_kb))
+
+    sink = NullDiagnostics()
+    def full_parse():
+        with open(path) as file:
+            node, _, error = run.parse(path, file.read(), False, sink)
+        if error: raise Exception(error.as_string())
+
+    cache = ASTCache(directory=os.path.join(directory, 'ast'))
+    text = cache.read(path)
+    node, checked_names, _ = run.parse(path, text, False, sink)
+    cache.put(path, text, node, checked_names)
+    def memory_hit():
+        if cache.get(path, cache.read(path), run.global_symbol_table) is None: raise Exception('miss')
+
+    def disk_hit():
+        fresh = ASTCache(directory=cache.directory)
+        if fresh.get(path, fresh.read(path), run.global_symbol_table) is None: raise Exception('miss')
+
+    parse_time = best_of(full_parse, 20)
+    print(f"Script: {len(text) / 1024:.1f} KB")
+    for name, elapsed in (('read + parse', parse_time), ('memory hit', best_of(memory_hit)), ('disk hit', best_of(disk_hit, 50))):
+        print(f"{name:13} {elapsed * 1000:9.3f} ms  {elapsed / parse_time * 100:6.1f}% of a full parse")
+    print(cache.stats())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+###############################
+# CALL OVERHEAD BENCHMARK
+# Times a loop calling a 2-argument user function on every execution engine,
+# with frames drawn from the frame pool and with the pool turned off
+# Usage: python -m benchmarks.call_overhead [calls]
+###############################
+import sys
+import time
+import compiler.run as run
+from benchmarks.support import reset_globals, run_program
+import modules.function as function
+
+PROGRAM = '''
+FUNCTION add(a, b) => a + b
+
+FUNCTION calls(n)
+    VAR total = 0
+    FOR i = 0 TO n THEN
+        total = add(total, i)
+    END
+    RETURN total
+END
+
+calls(CALLS)
+'''
+
+def measure(engine, text):
+    start = time.perf_counter()
+    value = run_program(engine, text)
+    elapsed = time.perf_counter() - start
+    return elapsed, repr(value.elements[-1])
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    text = PROGRAM.replace("CALLS", str(calls))
+    pool_size = function.FRAME_POOL_SIZE
+    print(f"{calls} calls to a 2-argument function")
+    for engine in run.ENGINES:
+        for title, size in (('pooled', pool_size), ('unpooled', 0)):
+            function.FRAME_POOL_SIZE = size
+            function.FRAME_POOLS.clear()
+            elapsed, result = measure(engine, text)
+            print(f"{engine:12} {title:9} {elapsed:6.2f} s  {elapsed / calls * 1e9:6.0f} ns/call  result {result}")
+    function.FRAME_POOL_SIZE = pool_size
+    reset_globals()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+###############################
+# CALLS BENCHMARK
+# Times a hot loop of recursive user function calls with scope tracing off
+# (the default), tracing every call, sampling every Nth call and under a
+# time budget, and counts the files opened while the loop runs
+# Usage: python -m benchmarks.calls [iterations]
+###############################
+import os
+import sys
+import tempfile
+import time
+import compiler.run as run
+from modules import diagnostics
+
+SETUP = [
+    'VAR n = 0',
+    'VAR fact = 0',
+    'VAR total = 0',
+    'FUNCTION fact(n) => IF n <= 1 THEN 1 ELSE n * fact(n - 1)',
+]
+
+opened = []
+
+def audit(event, args):
+    if event == 'open': opened.append(args[0])
+
+def measure(loop):
+    del opened[:]
+    start = time.perf_counter()
+    _, error, _ = run.run('<bench>', loop)
+    elapsed = time.perf_counter() - start
+    if error: raise Exception(error.as_string())
+    return elapsed, len(opened)
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    loop = f'FOR i = 0 TO {iterations} THEN; total = total + fact(20); END'
+    calls = iterations * 20
+    for line in SETUP:
+        _, error, _ = run.run('<bench>', line)
+        if error: raise Exception(error.as_string())
+    sys.addaudithook(audit)
+
+    path = os.path.join(tempfile.mkdtemp(), 'scope_trace.txt')
+    modes = [
+        ('off (default)', None),
+        ('every call', dict(every=1)),
+        ('every 100th call', dict(every=100)),
+        ('budget 5 ms', dict(budget=0.005)),
+    ]
+    print(f"{calls} calls")
+    for name, options in modes:
+        if options is not None: tracer = diagnostics.enable_tracing(path, **options)
+        elapsed, files = measure(loop)
+        samples = tracer.samples if options is not None else 0
+        diagnostics.disable_tracing()
+        print(f"{name:18} {elapsed * 1000:8.1f} ms  {files} files opened  {samples} samples")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+###############################
+# ENGINES BENCHMARK
+# Times the primality test from tests/primo.coffee over a range of numbers on
+# every execution engine and reports the speedup over the tree walking
+# interpreter. Every engine must compute the same result. The hit rates of the
+# interpreter's binary operator caches are printed after the timings
+# Usage: python -m benchmarks.engines [limit]
+###############################
+import sys
+import time
+import compiler.run as run
+from benchmarks.support import reset_globals, run_program
+from compiler.inline_cache import binary_stats, reset_binary_stats
+
+PROGRAM = '''
+FUNCTION esPrimo(x)
+    IF x <= 1 THEN RETURN FALSE
+    VAR i = 2
+    WHILE i <= x / 2 THEN
+        IF x % i == 0 THEN
+            RETURN FALSE
+        END
+        i = i + 1
+    END
+    RETURN TRUE
+END
+
+FUNCTION contarPrimos(limite)
+    VAR total = 0
+    FOR n = 0 TO limite THEN
+        IF esPrimo(n) THEN total = total + 1
+    END
+    RETURN total
+END
+
+contarPrimos(LIMIT)
+'''
+
+# Best time of a few runs, each with a fresh set of globals since the program
+# declares its functions
+def measure(engine, text, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = run_program(engine, text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, repr(value.elements[-1])
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    text = PROGRAM.replace("LIMIT", str(limit))
+    baseline = None
+    print(f"Primes up to {limit}")
+    reset_binary_stats()
+    for engine in run.ENGINES:
+        elapsed, result = measure(engine, text)
+        baseline = baseline or elapsed
+        print(f"{engine:12} {elapsed * 1000:9.1f} ms  {baseline / elapsed:5.1f}x  result {result}")
+    reset_globals()
+    for method_name, (hits, misses, rate) in binary_stats().items():
+        print(f"{method_name:20} {hits:9} hits {misses:6} misses  {rate:6.1%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+###############################
+# GLOBALS BENCHMARK
+# Times a loop inside a function reading a global list and the LEN builtin on
+# every iteration, on every execution engine. The reads go through the global
+# caches, which hit while no global is rebound
+# Usage: python -m benchmarks.globals [iterations]
+###############################
+import sys
+import time
+import compiler.run as run
+from benchmarks.support import reset_globals, run_program
+
+PROGRAM = '''
+VAR items = [1, 2, 3]
+
+FUNCTION reads(n)
+    VAR total = 0
+    FOR i = 0 TO n THEN
+        total = total + LEN(items)
+    END
+    RETURN total
+END
+
+reads(ITERATIONS)
+'''
+
+def measure(engine, text):
+    start = time.perf_counter()
+    value = run_program(engine, text)
+    elapsed = time.perf_counter() - start
+    return elapsed, repr(value.elements[-1])
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    text = PROGRAM.replace("ITERATIONS", str(iterations))
+    print(f"{iterations} iterations reading 2 globals")
+    for engine in run.ENGINES:
+        elapsed, result = measure(engine, text)
+        print(f"{engine:12} {elapsed:6.2f} s  {elapsed / iterations * 1e9:6.0f} ns/iteration  result {result}")
+    reset_globals()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+###############################
+# LEXER BENCHMARK
+# Measures lexing throughput (MB/s) of the table-driven Lexer against the
+# reference CharLexer on a synthetic script, and the memory held by the
+# resulting token list
+# Usage: python -m benchmarks.lexer [size_in_mb]
+###############################
+import sys
+import time
+import tracemalloc
+from compiler.lexer import CharLexer, Lexer
+
+SAMPLE = '''# Sample chunk repeated to build the benchmark script
+FUNCTION esPrimo(x)
+    IF x <= 1 THEN RETURN FALSE
+    VAR i = 2
+    WHILE i <= x / 2 THEN
+        IF x % i == 0 THEN
+            RETURN FALSE
+        END
+        i = i + 1
+    END
+    RETURN TRUE
+END
+VAR numbers = [1, 2.5, 3, 4 ^ 2, -5]; VAR total = 0
+FOR j = 0 TO LEN(numbers) STEP 1 THEN; total = total + numbers / j; END
+FUNCTION saludo(nombre) => "Hola, " + nombre + "!"
+PRINT(saludo("mundo")); IF total >= 10 AND NOT total != 12 THEN PRINT("ok") ELSE PRINT("no")
+'''
+
+def make_source(size_mb):
+    return SAMPLE * max(1, int(size_mb * 1024 * 1024 / len(SAMPLE)))
+
+def signature(tokens):
+    return [(tok.type, tok.value, tok.pos_start, tok.pos_end) for tok in tokens]
+
+def measure(make, text, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens, error = make(text)
+        elapsed = time.perf_counter() - start
+        if error: raise Exception(error.as_string())
+        best = elapsed if best is None else min(best, elapsed)
+    return tokens, best
+
+def char_lexer(text):
+    return CharLexer('<bench>', text).make_tokens()
+
+def table_lexer(text):
+    return Lexer('<bench>', text).make_tokens()
+
+def buffer_lexer(text):
+    return Lexer('<bench>', text).make_token_buffer()
+
+# Bytes still allocated once the token stream has been built
+def token_memory(make, text):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tokens, _ = make(text)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, len(tokens)
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    text = make_source(size_mb)
+    mb = len(text) / (1024 * 1024)
+
+    char_tokens, char_time = measure(char_lexer, text)
+    table_tokens, table_time = measure(table_lexer, text)
+    buffer, buffer_time = measure(buffer_lexer, text)
+    if signature(char_tokens) != signature(table_tokens) or signature(table_tokens) != signature(buffer.to_tokens()):
+        raise Exception('Lexers produced different token streams')
+
+    print(f"Source: {mb:.2f} MB, {len(table_tokens)} tokens")
+    print(f"CharLexer      : {char_time:8.3f} s  {mb / char_time:8.2f} MB/s")
+    print(f"Lexer (list)   : {table_time:8.3f} s  {mb / table_time:8.2f} MB/s  {char_time / table_time:6.2f}x")
+    print(f"Lexer (buffer) : {buffer_time:8.3f} s  {mb / buffer_time:8.2f} MB/s  {char_time / buffer_time:6.2f}x")
+
+    for name, make in (('list', table_lexer), ('buffer', buffer_lexer)):
+        used, count = token_memory(make, text)
+        print(f"Memory ({name:6}): {used / (1024 * 1024):8.2f} MB  {used / count:8.1f} bytes/token")
+
+if __name__ == '__main__':
+    main()
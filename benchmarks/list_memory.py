@@ -0,0 +1,44 @@
+###############################
+# LIST MEMORY BENCHMARK
+# Builds a list of a million Numbers, and one of as many Strings, on every
+# execution engine and measures with tracemalloc the memory the list still
+# holds once the program has run, per element. The values are large enough
+# not to come from the shared small Numbers
+# Usage: python -m benchmarks.list_memory [elements]
+###############################
+import sys
+import tracemalloc
+import compiler.run as run
+from benchmarks.support import reset_globals, run_program
+
+PROGRAMS = {
+    'numbers': '''
+VAR big = FOR i = 0 TO ELEMENTS THEN i + 100000
+''',
+    'strings': '''
+VAR big = FOR i = 0 TO ELEMENTS THEN "item " + i
+''',
+}
+
+def held(engine, text):
+    tracemalloc.start()
+    try:
+        run_program(engine, text, cache=False)
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Drop the list before the next run
+    reset_globals()
+    return size
+
+def main():
+    elements = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    print(f"Memory held by a list of {elements} values")
+    for engine in run.ENGINES:
+        for title, program in PROGRAMS.items():
+            size = held(engine, program.replace("ELEMENTS", str(elements)))
+            print(f"{engine:12} {title:8} {size / 2 ** 20:8.1f} MiB  {size / elements:6.1f} bytes/element")
+    reset_globals()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+###############################
+# LOOP MEMORY BENCHMARK
+# Runs a long WHILE loop used as a statement, like the main loop of a script
+# that never ends, on every execution engine and measures the peak memory
+# with tracemalloc. A loop whose value is not used must run in constant
+# memory: the peak of the full run may not exceed that of a run ten times
+# shorter by more than SLACK bytes
+# Usage: python -m benchmarks.loop_memory [iterations]
+###############################
+import sys
+import tracemalloc
+import compiler.run as run
+from benchmarks.support import reset_globals, run_program
+
+PROGRAM = '''
+FUNCTION daemon(n)
+    VAR i = 0
+    WHILE i < n THEN
+        i = i + 1
+        FOR j = 0 TO 2 THEN i + j
+    END
+    RETURN i
+END
+
+daemon(ITERATIONS)
+'''
+
+SLACK = 64 * 1024
+
+def peak(engine, iterations):
+    tracemalloc.start()
+    try:
+        run_program(engine, PROGRAM.replace("ITERATIONS", str(iterations)), cache=False)
+        _, peak_size = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak_size
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 7
+    print(f"Peak memory of a WHILE statement of {iterations} iterations")
+    for engine in run.ENGINES:
+        short = peak(engine, iterations // 10)
+        full = peak(engine, iterations)
+        print(f"{engine:12} {short / 1024:9.1f} KiB at {iterations // 10}  {full / 1024:9.1f} KiB at {iterations}")
+        if full > short + SLACK:
+            raise Exception(f"{engine} memory grows with the iterations of a loop whose value is not used")
+    reset_globals()
+
+if __name__ == '__main__':
+    main()
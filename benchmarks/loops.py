@@ -0,0 +1,59 @@
+###############################
+# LOOPS BENCHMARK
+# Times a FOR loop summing its counter on every execution engine. The loop
+# runs as a counted loop, over a range of native integers, and again with a
+# body that assigns the loop variable, which keeps it on the generic loop
+# Usage: python -m benchmarks.loops [iterations]
+###############################
+import sys
+import time
+import compiler.run as run
+from benchmarks.support import reset_globals, run_program
+
+COUNTED = '''
+FUNCTION total(n)
+    VAR s = 0
+    FOR i = 0 TO n THEN
+        s = s + i
+    END
+    RETURN s
+END
+
+total(ITERATIONS)
+'''
+
+GENERIC = '''
+FUNCTION total(n)
+    VAR s = 0
+    FOR i = 0 TO n THEN
+        s = s + i
+        i = i
+    END
+    RETURN s
+END
+
+total(ITERATIONS)
+'''
+
+PROGRAMS = {
+    'counted': COUNTED,
+    'generic': GENERIC,
+}
+
+def measure(engine, text):
+    start = time.perf_counter()
+    value = run_program(engine, text)
+    elapsed = time.perf_counter() - start
+    return elapsed, repr(value.elements[-1])
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 7
+    print(f"FOR loop of {iterations} iterations")
+    for engine in run.ENGINES:
+        for title, program in PROGRAMS.items():
+            elapsed, result = measure(engine, program.replace("ITERATIONS", str(iterations)))
+            print(f"{engine:12} {title:8} {elapsed:7.2f} s  {elapsed / iterations * 1e9:6.0f} ns/iteration  result {result}")
+    reset_globals()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+###############################
+# PARSER BENCHMARK
+# Measures how fast the Parser builds the AST of a synthetic script from an
+# already lexed token list and from the array-backed TokenBuffer, and compares
+# lexing the whole file up front with the streaming mode, both for a full
+# parse and for a syntax error on the first line. Deeply nested IF/WHILE
+# blocks are timed on their own, as every block end is a decision point, as
+# are long arithmetic expressions and the deepest parenthesised expression
+# that parses within the default recursion limit
+# Usage: python -m benchmarks.parser [size_in_kb] [nesting_depth]
+###############################
+import sys
+import time
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+from compiler.tokens import TokenStream
+
+SAMPLE = '''FUNCTION area(ancho, alto) => 1 * ancho * alto
+FUNCTION clasifica(valor)
+    IF 0 > valor THEN
+        RETURN "negativo"
+    ELIF 0 == valor THEN
+        RETURN "cero"
+    ELSE
+        RETURN "positivo"
+    END
+END
+FOR i = 0 TO 100 STEP 2 THEN; PRINT(2 * i + 1); END
+WHILE FALSE THEN; PRINT("nunca"); BREAK; END
+PRINT([1, 2.5, 3, 4 ^ 2, -5] + 6)
+PRINT(IF 1 < 2 AND NOT 3 >= 4 THEN "si" ELSE "no")
+'''
+
+def make_source(size_kb):
+    return SAMPLE * max(1, int(size_kb * 1024 / len(SAMPLE)))
+
+# Blocks nested depth levels deep, alternating IF/ELSE and WHILE, each with a
+# few statements before and after the inner block
+def make_nested(depth, statements=3):
+    lines = []
+    for level in range(depth):
+        indent = '    ' * level
+        lines.append(indent + ('IF 1 < 2 THEN' if level % 2 == 0 else 'WHILE FALSE THEN'))
+        lines.extend([indent + f'    PRINT({level})'] * statements)
+    for level in reversed(range(depth)):
+        indent = '    ' * level
+        lines.extend([indent + f'    PRINT({level})'] * statements)
+        if level % 2 == 0:
+            lines.append(indent + 'ELSE')
+            lines.extend([indent + '    BREAK'] * statements)
+        lines.append(indent + 'END')
+    return '\n'.join(lines) + '\n'
+
+def parses(text):
+    tokens, _ = Lexer('<bench>', text).make_tokens()
+    try:
+        return not Parser(tokens).parse().error
+    except RecursionError:
+        return False
+
+# Deepest ((((1)))) nesting the parser handles, found by bisection
+def max_paren_depth(limit=5000):
+    low, high = 1, limit
+    while low < high:
+        depth = (low + high + 1) // 2
+        if parses('(' * depth + '1' + ')' * depth): low = depth
+        else: high = depth - 1
+    return low
+
+def measure(tokens, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ast = Parser(tokens).parse()
+        elapsed = time.perf_counter() - start
+        if ast.error: raise Exception(ast.error.as_string())
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+# Lex and parse in one go, either from a full token list or from a stream
+def lex_and_parse(text, streaming):
+    start = time.perf_counter()
+    lexer = Lexer('<bench>', text)
+    if streaming:
+        tokens = TokenStream(lexer.iter_tokens())
+    else:
+        tokens, _ = lexer.make_tokens()
+    ast = Parser(tokens).parse()
+    elapsed = time.perf_counter() - start
+    window = tokens.peak_window if streaming else len(tokens)
+    return ast, elapsed, window
+
+def main():
+    size_kb = float(sys.argv[1]) if len(sys.argv) > 1 else 256
+    text = make_source(size_kb)
+    tokens, error = Lexer('<bench>', text).make_tokens()
+    if error: raise Exception(error.as_string())
+    buffer, error = Lexer('<bench>', text).make_token_buffer()
+    if error: raise Exception(error.as_string())
+
+    print(f"Source: {len(text) / 1024:.0f} KB, {len(tokens)} tokens")
+    for name, stream in (('token list', tokens), ('token buffer', buffer)):
+        elapsed = measure(stream)
+        print(f"Parser ({name:12}): {elapsed:8.3f} s  {len(tokens) / elapsed / 1000:8.1f} K tokens/s")
+
+    broken = 'PRINT(1 +)\n' + text
+    for streaming in (False, True):
+        name = 'streaming' if streaming else 'full list'
+        ast, elapsed, window = lex_and_parse(text, streaming)
+        _, error_elapsed, _ = lex_and_parse(broken, streaming)
+        print(f"Lex + parse ({name:9}): {elapsed:8.3f} s  peak tokens held {window:7}  "
+            f"first-line error after {error_elapsed * 1000:8.2f} ms")
+
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    nested = make_nested(depth) * 50
+    tokens, error = Lexer('<bench>', nested).make_tokens()
+    if error: raise Exception(error.as_string())
+    elapsed = measure(tokens)
+    print(f"Nested IF/WHILE (depth {depth}, {len(tokens)} tokens): {elapsed:8.3f} s  "
+        f"{len(tokens) / elapsed / 1000:8.1f} K tokens/s")
+
+    arithmetic = '\n'.join(['PRINT(' + ' + '.join(['2 * 3 - -4 ^ 2 / 5'] * 200) + ')'] * 50) + '\n'
+    tokens, error = Lexer('<bench>', arithmetic).make_tokens()
+    if error: raise Exception(error.as_string())
+    elapsed = measure(tokens)
+    print(f"Long arithmetic ({len(tokens)} tokens): {elapsed:8.3f} s  "
+        f"{len(tokens) / elapsed / 1000:8.1f} K tokens/s")
+    print(f"Deepest parenthesised expression: {max_paren_depth()} levels")
+
+if __name__ == '__main__':
+    main()
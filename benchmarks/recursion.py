@@ -0,0 +1,65 @@
+###############################
+# RECURSION BENCHMARK
+# Runs a recursive function to a given depth on every execution engine, once
+# as a plain recursion and once with the recursive call as a tail call
+# (RETURN f(...)). The VM keeps the calls of a script on its own stack, so it
+# runs both with the Python recursion limit lowered to LIMIT; the other
+# engines use Python frames for every call and stop with a RecursionError
+# Usage: python -m benchmarks.recursion [depth]
+###############################
+import sys
+import time
+import compiler.run as run
+from benchmarks.support import reset_globals, run_program
+
+DEPTH = '''
+FUNCTION depth(n)
+    IF n == 0 THEN RETURN 0
+    RETURN 1 + depth(n - 1)
+END
+
+depth(DEPTH)
+'''
+
+TAIL = '''
+FUNCTION count(n, total)
+    IF n == 0 THEN RETURN total
+    RETURN count(n - 1, total + 1)
+END
+
+count(DEPTH, 0)
+'''
+
+PROGRAMS = {
+    'recursion': DEPTH,
+    'tail call': TAIL,
+}
+
+# Python frames the VM may use, whatever the depth of the script
+LIMIT = 200
+
+def measure(engine, text):
+    limit = sys.getrecursionlimit()
+    if engine == 'vm': sys.setrecursionlimit(LIMIT)
+    start = time.perf_counter()
+    try:
+        value = run_program(engine, text)
+    except RecursionError:
+        return None, 'RecursionError'
+    finally:
+        sys.setrecursionlimit(limit)
+    elapsed = time.perf_counter() - start
+    return elapsed, repr(value.elements[-1])
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    print(f"Recursion to a depth of {depth}")
+    for engine in run.ENGINES:
+        for title, program in PROGRAMS.items():
+            elapsed, result = measure(engine, program.replace("DEPTH", str(depth)))
+            timing = f"{elapsed:7.2f} s" if elapsed is not None else "      -  "
+            print(f"{engine:12} {title:10} {timing}  result {result}")
+    reset_globals()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+###############################
+# BENCHMARK SUPPORT
+# Every program a benchmark runs starts from the globals the interpreter
+# started with, so the same program can declare its names again on the next
+# engine, and the benchmark leaves the globals as it found them
+###############################
+import compiler.run as run
+
+SYMBOLS = dict(run.global_symbol_table.symbols)
+
+def reset_globals():
+    run.global_symbol_table.symbols = dict(SYMBOLS)
+
+# Runs a program on fresh globals and returns its value, or raises its error
+def run_program(engine, text, **options):
+    reset_globals()
+    value, error, _ = run.run('<bench>', text, engine=engine, **options)
+    if error: raise Exception(error.as_string())
+    return value
@@ -0,0 +1,309 @@
+import operator
+import weakref
+from compiler.tokens import TT_KEYWORD, TT_MINUS
+from compiler.optimizer import BINARY_METHODS
+from modules.nodes import CallNode
+from modules.symbol_table import GlobalCache
+###############################
+# BYTECODE
+# The VM runs a program as a flat list of instructions, each an opcode
+# followed by a single operand (None, an int, a value or a tuple of constants). The
+# compiler tracks the stack depth statically so a BREAK or CONTINUE, which can
+# sit in the middle of an expression, knows how far to unwind the stack.
+###############################
+
+CONSTANT = 0         # pooled value of a literal
+NULL = 1             # push Number.null
+POP = 2
+LOAD_GLOBAL = 3      # GlobalCache of the name, with its positions
+LOAD_LOCAL = 4       # (depth, slot, name, pos_start, pos_end)
+STORE_GLOBAL = 5     # name, leaves the value on the stack
+STORE_LOCAL = 6      # (depth, slot), leaves the value on the stack
+BINARY = 7           # (method name, Number operation, pos_start, pos_end, right operand start)
+NEGATE = 8           # (operand start, pos_end)
+NOT = 9              # (operand start, pos_end)
+JUMP = 10            # target
+JUMP_IF_FALSE = 11   # target, pops the condition
+BUILD_LIST = 12      # element count
+NEW_LIST = 13        # push an empty list to collect loop values into
+LIST_APPEND = 14     # distance of the list from the top once the value is popped
+LOOP_LIST = 15       # turns the collected values into a List
+FOR_INIT = 16        # (counted, has step), pops start, end and step and pushes the loop state
+FOR_NEXT = 17        # (exit target, slot, name), stores the next value or exits
+MAKE_FUNCTION = 18   # (name, body node, arg names, auto return, arg slots, slot names, frame escapes, source)
+CALL = 19            # (arg count, pos_start, pos_end, enclosing Loop or None, tail call)
+BREAK = 20           # Loop
+CONTINUE = 21        # Loop
+SIGNAL_BREAK = 22    # BREAK outside a loop of this code, passed to the caller
+SIGNAL_CONTINUE = 23
+RETURN = 24          # pops the return value
+END = 25             # the value of the code is on top of the stack, if any
+LOAD_SLOT = 26       # (slot, name, pos_start, pos_end), a local of this function
+STORE_SLOT = 27      # slot, leaves the value on the stack
+
+# What each Value method computes when both operands are Numbers, on their
+# values. None means the method has to run, to raise its error
+NUMBER_OPERATIONS = {
+    'added_to': operator.add,
+    'subbed_by': operator.sub,
+    'multed_by': operator.mul,
+    'dived_by': lambda a, b: a / b if b != 0 else None,
+    'modded_by': lambda a, b: a % b if b != 0 else None,
+    'powed_by': operator.pow,
+    'get_comparison_eq': lambda a, b: int(a == b),
+    'get_comparison_ne': lambda a, b: int(a != b),
+    'get_comparison_lt': lambda a, b: int(a < b),
+    'get_comparison_gt': lambda a, b: int(a > b),
+    'get_comparison_lte': lambda a, b: int(a <= b),
+    'get_comparison_gte': lambda a, b: int(a >= b),
+    'anded_by': lambda a, b: int(a and b),
+    'ored_by': lambda a, b: int(a or b),
+}
+
+class Code:
+    def __init__(self, instructions, pos_start):
+        self.instructions = instructions
+        # Position of the compiled node, a rebased AST gets compiled again
+        self.pos_start = pos_start
+
+# Jump targets of a loop, and the stack depth its body starts at
+class Loop:
+    def __init__(self, head, height):
+        self.head = head
+        self.exit = None
+        self.height = height
+
+# Compiled code of function bodies and programs, by node
+compiled = weakref.WeakKeyDictionary()
+
+# Code for a node, compiled the first time it runs. keep_value is False for
+# bodies whose value is thrown away, like those of block functions
+def code_for(node, keep_value=True):
+    code = compiled.get(node)
+    if code is None or code.pos_start != node.pos_start:
+        code = Compiler().compile(node, keep_value)
+        compiled[node] = code
+    return code
+
+class Compiler:
+    def __init__(self):
+        self.instructions = []
+        self.depth = 0
+        self.loops = []
+
+    def compile(self, node, keep_value=True):
+        self.visit(node, keep_value)
+        self.emit(END)
+        return Code(self.instructions, node.pos_start)
+
+    def emit(self, op, arg=None):
+        self.instructions.append(op)
+        self.instructions.append(arg)
+        return len(self.instructions) - 1
+
+    def here(self):
+        return len(self.instructions)
+
+    def patch(self, index, target):
+        self.instructions[index] = target
+
+    # Compile a node leaving its value on the stack when keep_value is True
+    # and nothing otherwise
+    def visit(self, node, keep_value):
+        method = getattr(self, f'visit_{type(node).__name__}')
+        method(node, keep_value)
+
+    def discard(self, keep_value):
+        if not keep_value:
+            self.emit(POP)
+            self.depth -= 1
+
+    def visit_NumberNode(self, node, keep_value):
+        if not keep_value: return
+        self.emit(CONSTANT, node.value)
+        self.depth += 1
+
+    def visit_StringNode(self, node, keep_value):
+        self.visit_NumberNode(node, keep_value)
+
+    def visit_ListNode(self, node, keep_value):
+        for element_node in node.element_nodes:
+            self.visit(element_node, keep_value)
+        if keep_value:
+            count = len(node.element_nodes)
+            self.emit(BUILD_LIST, count)
+            self.depth -= count - 1
+
+    # Still loaded when the value is not used, an undefined name is an error
+    def visit_VarAccessNode(self, node, keep_value):
+        name = node.var_name_tok.value
+        if node.slot is None:
+            self.emit(LOAD_GLOBAL, GlobalCache(name, node.pos_start, node.pos_end))
+        elif node.depth == 0:
+            self.emit(LOAD_SLOT, (node.slot, name, node.pos_start, node.pos_end))
+        else:
+            self.emit(LOAD_LOCAL, (node.depth, node.slot, name, node.pos_start, node.pos_end))
+        self.depth += 1
+        self.discard(keep_value)
+
+    def visit_VarAssignNode(self, node, keep_value):
+        self.visit(node.value_node, True)
+        if node.slot is None:
+            self.emit(STORE_GLOBAL, node.var_name_tok.value)
+        elif node.depth == 0:
+            self.emit(STORE_SLOT, node.slot)
+        else:
+            self.emit(STORE_LOCAL, (node.depth, node.slot))
+        self.discard(keep_value)
+
+    def visit_BinOpNode(self, node, keep_value):
+        self.visit(node.left_node, True)
+        self.visit(node.right_node, True)
+        op_tok = node.op_tok
+        method_name = BINARY_METHODS[op_tok.value if op_tok.type == TT_KEYWORD else op_tok.type]
+        self.emit(BINARY, (method_name, NUMBER_OPERATIONS[method_name], node.pos_start, node.pos_end, node.right_node.pos_start))
+        self.depth -= 1
+        self.discard(keep_value)
+
+    def visit_UnaryOpNode(self, node, keep_value):
+        self.visit(node.node, True)
+        if node.op_tok.type == TT_MINUS:
+            self.emit(NEGATE, (node.node.pos_start, node.pos_end))
+        elif node.op_tok.matches(TT_KEYWORD, 'NOT'):
+            self.emit(NOT, (node.node.pos_start, node.pos_end))
+        self.discard(keep_value)
+
+    # Every case leaves the same depth: its value, or Number.null for a block
+    # IF, or nothing when the value is not used
+    def visit_IfNode(self, node, keep_value):
+        end_jumps = []
+        for condition, expr, should_return_null in node.cases:
+            self.visit(condition, True)
+            next_jump = self.emit(JUMP_IF_FALSE)
+            self.depth -= 1
+            self.branch(expr, should_return_null, keep_value)
+            end_jumps.append(self.emit(JUMP))
+            self.depth -= keep_value
+            self.patch(next_jump, self.here())
+        if node.else_case:
+            self.branch(node.else_case[0], node.else_case[1], keep_value)
+        elif keep_value:
+            self.emit(NULL)
+            self.depth += 1
+        for end_jump in end_jumps:
+            self.patch(end_jump, self.here())
+
+    def branch(self, expr, should_return_null, keep_value):
+        self.visit(expr, keep_value and not should_return_null)
+        if keep_value and should_return_null:
+            self.emit(NULL)
+            self.depth += 1
+
+    # The loop keeps its state on the stack: the list collecting the body
+    # values, when they are used, and [i, end value, step, counting up]
+    def visit_ForNode(self, node, keep_value):
+        collect = keep_value and not node.should_return_null
+        if collect:
+            self.emit(NEW_LIST)
+            self.depth += 1
+        self.visit(node.start_value_node, True)
+        self.visit(node.end_value_node, True)
+        if node.step_value_node:
+            self.visit(node.step_value_node, True)
+        self.emit(FOR_INIT, (node.counted, node.step_value_node is not None))
+        self.depth -= 2 if node.step_value_node else 1
+
+        loop = Loop(self.here(), self.depth)
+        exit_index = self.emit(FOR_NEXT)
+        self.loop_body(loop, node.body_node, collect, 2)
+        self.patch(exit_index, (loop.exit, node.slot, node.var_name_tok.value))
+        self.emit(POP)
+        self.depth -= 1
+        self.loop_result(node, collect, keep_value)
+
+    def visit_WhileNode(self, node, keep_value):
+        collect = keep_value and not node.should_return_null
+        if collect:
+            self.emit(NEW_LIST)
+            self.depth += 1
+
+        loop = Loop(self.here(), self.depth)
+        self.visit(node.condition_node, True)
+        exit_jump = self.emit(JUMP_IF_FALSE)
+        self.depth -= 1
+        self.loop_body(loop, node.body_node, collect, 1)
+        self.patch(exit_jump, loop.exit)
+        self.loop_result(node, collect, keep_value)
+
+    def loop_body(self, loop, body_node, collect, list_distance):
+        self.loops.append(loop)
+        self.visit(body_node, collect)
+        if collect:
+            self.emit(LIST_APPEND, list_distance)
+            self.depth -= 1
+        self.loops.pop()
+        self.emit(JUMP, loop.head)
+        loop.exit = self.here()
+
+    def loop_result(self, node, collect, keep_value):
+        if collect:
+            self.emit(LOOP_LIST)
+        elif keep_value:
+            self.emit(NULL)
+            self.depth += 1
+
+    # The body is compiled now, knowing whether its value is used
+    def visit_FuncDefNode(self, node, keep_value):
+        code_for(node.body_node, node.should_auto_return)
+        func_name = node.var_name_tok.value if node.var_name_tok else None
+        arg_names = [arg_name.value for arg_name in node.arg_name_toks]
+        self.emit(MAKE_FUNCTION, (
+            func_name, node.body_node, arg_names, node.should_auto_return, node.arg_slots, node.slot_names, node.frame_escapes, node.source
+        ))
+        self.depth += 1
+        if node.var_name_tok:
+            if node.slot is None:
+                self.emit(STORE_GLOBAL, node.var_name_tok.value)
+            else:
+                self.emit(STORE_SLOT, node.slot)
+        self.discard(keep_value)
+
+    def visit_CallNode(self, node, keep_value, tail=False):
+        self.visit(node.node_to_call, True)
+        for arg_node in node.arg_nodes:
+            self.visit(arg_node, True)
+        count = len(node.arg_nodes)
+        loop = self.loops[-1] if self.loops else None
+        self.emit(CALL, (count, node.pos_start, node.pos_end, loop, tail))
+        self.depth -= count
+        self.discard(keep_value)
+
+    # RETURN, BREAK and CONTINUE never fall through, the value they count as
+    # pushing keeps the depth of the code after them consistent
+    # RETURN f(...) outside a loop is a tail call: the VM may run the callee
+    # in place of the function returning its value
+    def visit_ReturnNode(self, node, keep_value):
+        if isinstance(node.node_to_return, CallNode) and not self.loops:
+            self.visit_CallNode(node.node_to_return, True, True)
+        elif node.node_to_return:
+            self.visit(node.node_to_return, True)
+        else:
+            self.emit(NULL)
+            self.depth += 1
+        self.emit(RETURN)
+        self.depth -= 1
+        self.depth += keep_value
+
+    def visit_ContinueNode(self, node, keep_value):
+        if self.loops:
+            self.emit(CONTINUE, self.loops[-1])
+        else:
+            self.emit(SIGNAL_CONTINUE)
+        self.depth += keep_value
+
+    def visit_BreakNode(self, node, keep_value):
+        if self.loops:
+            self.emit(BREAK, self.loops[-1])
+        else:
+            self.emit(SIGNAL_BREAK)
+        self.depth += keep_value
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from compiler.tokens import Token
+from modules.position import SOURCES
+###############################
+# AST CACHE
+# Parsed programs are kept in an in-process LRU keyed by (file name, content
+# hash, compiler version, optimized or not), and optionally in a directory of pickled ASTs that
+# survives between processes. Script files read through the cache are only
+# read again when their mtime or size changes.
+###############################
+
+# Any change to the lexer, the parser, the resolver, the optimizer or the node
+# classes gives cached ASTs a new version, so entries written by an older
+# compiler are never loaded
+def compiler_version():
+    import compiler.lexer, compiler.parser, compiler.tokens, compiler.resolver, compiler.optimizer, modules.nodes
+    digest = hashlib.sha1()
+    for module in (compiler.lexer, compiler.parser, compiler.tokens, compiler.resolver, compiler.optimizer, modules.nodes):
+        with open(module.__file__, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+VERSION = compiler_version()
+
+class CacheEntry:
+    def __init__(self, node, source, checked_names):
+        self.node = node
+        # The entry keeps its source registered in SOURCES until it is
+        # evicted, base is the source's offset when the AST was built
+        self.source = source
+        self.base = source.base
+        # Names the parser checked against the global symbol table, mapped to
+        # whether they had to be declared (True) or not (False)
+        self.checked_names = checked_names
+
+# Shift every position in an AST by delta, for an AST parsed while its source
+# sat at another offset in SOURCES
+def rebase(node, delta, seen=None):
+    if seen is None: seen = set()
+    if id(node) in seen: return
+    seen.add(id(node))
+    if isinstance(node, (list, tuple)):
+        for item in node:
+            rebase(item, delta, seen)
+        return
+    if isinstance(node, Token):
+        node.pos_start += delta
+        node.pos_end += delta
+        return
+    if not hasattr(node, '__dict__'): return
+    for key, value in vars(node).items():
+        if key in ('pos_start', 'pos_end'):
+            if value is not None: setattr(node, key, value + delta)
+        elif isinstance(value, (list, tuple, Token)) or hasattr(value, 'pos_start'):
+            rebase(value, delta, seen)
+
+class ASTCache:
+    def __init__(self, max_entries=256, directory=None, max_disk_entries=4096):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self.entries = OrderedDict()
+        self.files = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, fn, text, optimized=True):
+        return (fn, hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest(), VERSION, optimized)
+
+    def disk_path(self, key):
+        name = hashlib.sha1(repr(key).encode('utf-8', 'surrogatepass')).hexdigest()
+        return os.path.join(self.directory, name + '.ast')
+
+    # Contents of a script file, read from disk only when its mtime or size
+    # changed since the last read
+    def read(self, path):
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self.files.get(path)
+        if cached and cached[0] == signature: return cached[1]
+        with open(path, "r") as file:
+            text = file.read()
+        self.files[path] = (signature, text)
+        return text
+
+    # Cached AST for a source, or None when it has not been parsed yet or was
+    # parsed against a global symbol table that declared other names
+    def get(self, fn, text, symbol_table, optimized=True):
+        key = self.key(fn, text, optimized)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        elif self.directory:
+            entry = self.load(key)
+            if entry is not None:
+                self.disk_hits += 1
+                self.store(key, entry)
+        if entry is None or not self.still_valid(entry, symbol_table):
+            self.misses += 1
+            return None
+        self.hits += 1
+        source = SOURCES.add(fn, text)
+        if entry.base != source.base:
+            rebase(entry.node, source.base - entry.base)
+            entry.base = source.base
+        entry.source = source
+        return entry.node
+
+    def put(self, fn, text, node, checked_names, optimized=True):
+        key = self.key(fn, text, optimized)
+        entry = CacheEntry(node, SOURCES.add(fn, text), checked_names)
+        self.store(key, entry)
+        if self.directory: self.save(key, entry)
+
+    def still_valid(self, entry, symbol_table):
+        for name, declared in entry.checked_names.items():
+            if (symbol_table.get(name) is not None) != declared: return False
+        return True
+
+    def store(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def load(self, key):
+        path = self.disk_path(key)
+        try:
+            with open(path, "rb") as file:
+                entry = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+        # Touch the file so eviction drops the least recently used entries
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def save(self, key, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.disk_path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                pickle.dump(entry, file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except (OSError, pickle.PicklingError, RecursionError):
+            if os.path.exists(temp_path): os.remove(temp_path)
+            return
+        self.evict_disk()
+
+    def evict_disk(self):
+        names = [name for name in os.listdir(self.directory) if name.endswith('.ast')]
+        if len(names) <= self.max_disk_entries: return
+        paths = sorted((os.path.join(self.directory, name) for name in names), key=os.path.getmtime)
+        for path in paths[:len(paths) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except OSError:
+                pass
+
+    def clear(self):
+        self.entries.clear()
+        self.files.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+        }
+
+ast_cache = ASTCache()
@@ -0,0 +1,291 @@
+import weakref
+from compiler.tokens import TT_KEYWORD, TT_MINUS
+from compiler.optimizer import BINARY_METHODS
+from compiler.bytecode import NUMBER_OPERATIONS
+from compiler.interpreter import counted_range, result_of
+from compiler.signals import Break, Continue, Failure, Return
+from modules.list import List
+from modules.errors import RTError
+from modules.symbol_table import GlobalCache
+from modules.function import Function
+from modules.value import Number, new_number, operation_error
+
+###############################
+# CLOSURE COMPILER
+# Walks the AST once and turns every node into a Python closure with its
+# children, operator and constants already bound, so running a program is
+# just calling closures: no per node getattr, name formatting or RTResult.
+# Values are shared, variables and calls give their value without a copy.
+# A closure takes the context and the run function and returns the node's
+# value. Errors, RETURN, BREAK and CONTINUE are raised as signals, the same
+# way the interpreter raises them.
+###############################
+
+# Closures of function bodies and programs, by node
+compiled = weakref.WeakKeyDictionary()
+
+# Closure for a node, compiled the first time it runs. keep_value is False
+# for bodies whose value is thrown away, like those of block functions
+def closure_for(node, keep_value=True):
+    entry = compiled.get(node)
+    # A rebased AST gets compiled again, its positions are bound in
+    if entry is None or entry[0] != node.pos_start:
+        entry = (node.pos_start, ClosureCompiler().compile(node, keep_value))
+        compiled[node] = entry
+    return entry[1]
+
+def nothing(context, run):
+    return None
+
+class ClosureInterpreter:
+    def visit(self, node, context, run=None):
+        return result_of(self.evaluate, node, context, run)
+
+    def evaluate(self, node, context, run=None):
+        return closure_for(node)(context, run)
+
+# The closures are stateless, one interpreter is passed to every call
+interpreter = ClosureInterpreter()
+
+class ClosureCompiler:
+    # Closure computing the node's value. With keep_value False the value is
+    # not used and closures may skip building it
+    def compile(self, node, keep_value=True):
+        method = getattr(self, f'visit_{type(node).__name__}')
+        return method(node, keep_value)
+
+    # A literal is its pooled value
+    def visit_NumberNode(self, node, keep_value):
+        if not keep_value: return nothing
+        value = node.value
+        def constant(context, run):
+            return value
+        return constant
+
+    def visit_StringNode(self, node, keep_value):
+        return self.visit_NumberNode(node, keep_value)
+
+    def visit_ListNode(self, node, keep_value):
+        elements = [self.compile(element_node, keep_value) for element_node in node.element_nodes]
+        if not keep_value:
+            def statements(context, run):
+                for element in elements:
+                    element(context, run)
+            return statements
+        def list_(context, run):
+            return List([element(context, run) for element in elements])
+        return list_
+
+    def visit_VarAccessNode(self, node, keep_value):
+        name, depth, slot = node.var_name_tok.value, node.depth, node.slot
+        pos_start, pos_end = node.pos_start, node.pos_end
+        def not_defined(context):
+            return Failure(RTError(pos_start, pos_end, f"'{name}' is not defined", context))
+
+        if slot is None:
+            cache = GlobalCache(name)
+            def load_global(context, run):
+                symbol_table = context.symbol_table
+                value = cache.cell.value if cache.version == symbol_table.version else cache.miss(symbol_table)
+                if value is None: raise not_defined(context)
+                return value
+            return load_global
+        if depth == 0:
+            def load_slot(context, run):
+                value = context.frame[slot]
+                if value is None: raise not_defined(context)
+                return value
+            return load_slot
+        def load_local(context, run):
+            frame = context.frame
+            for _ in range(depth): frame = frame[0]
+            value = frame[slot]
+            if value is None: raise not_defined(context)
+            return value
+        return load_local
+
+    def visit_VarAssignNode(self, node, keep_value):
+        value_closure = self.compile(node.value_node)
+        name, depth, slot = node.var_name_tok.value, node.depth, node.slot
+        if slot is None:
+            def store_global(context, run):
+                value = value_closure(context, run)
+                context.symbol_table.set(name, value)
+                return value
+            return store_global
+        def store_local(context, run):
+            value = value_closure(context, run)
+            frame = context.frame
+            for _ in range(depth): frame = frame[0]
+            frame[slot] = value
+            return value
+        return store_local
+
+    # Two Numbers are combined inline, anything else and every error goes
+    # through the Value method
+    def visit_BinOpNode(self, node, keep_value):
+        left_closure = self.compile(node.left_node)
+        right_closure = self.compile(node.right_node)
+        op_tok = node.op_tok
+        method_name = BINARY_METHODS[op_tok.value if op_tok.type == TT_KEYWORD else op_tok.type]
+        operation = NUMBER_OPERATIONS[method_name]
+        pos_start, pos_end, right_start = node.pos_start, node.pos_end, node.right_node.pos_start
+        def binary(context, run):
+            left = left_closure(context, run)
+            right = right_closure(context, run)
+            if type(left) is Number and type(right) is Number:
+                value = operation(left.value, right.value)
+                if value is not None: return new_number(value)
+            result, error = getattr(left, method_name)(right)
+            if error: raise Failure(operation_error(error, pos_start, right_start, pos_end, context))
+            return result
+        return binary
+
+    def visit_UnaryOpNode(self, node, keep_value):
+        operand = self.compile(node.node)
+        pos_end, operand_start = node.pos_end, node.node.pos_start
+        if node.op_tok.type == TT_MINUS:
+            apply = lambda value: value.multed_by(new_number(-1))
+        elif node.op_tok.matches(TT_KEYWORD, 'NOT'):
+            apply = lambda value: value.notted()
+        else:
+            return operand
+        def unary(context, run):
+            value = operand(context, run)
+            result, error = apply(value)
+            if error: raise Failure(operation_error(error, operand_start, operand_start, pos_end, context))
+            return result
+        return unary
+
+    def visit_IfNode(self, node, keep_value):
+        cases = [
+            (self.compile(condition), self.compile(expr, keep_value and not should_return_null), should_return_null)
+            for condition, expr, should_return_null in node.cases
+        ]
+        if node.else_case:
+            else_closure = self.compile(node.else_case[0], keep_value and not node.else_case[1])
+            else_returns_null = node.else_case[1]
+        else:
+            else_closure = None
+        def if_(context, run):
+            for condition, expr, should_return_null in cases:
+                if condition(context, run).is_true():
+                    value = expr(context, run)
+                    return Number.null if should_return_null else value
+            if else_closure:
+                value = else_closure(context, run)
+                return Number.null if else_returns_null else value
+            return Number.null
+        return if_
+
+    # The body values are only collected when the loop's value is used
+    def visit_ForNode(self, node, keep_value):
+        start_closure = self.compile(node.start_value_node)
+        end_closure = self.compile(node.end_value_node)
+        step_closure = self.compile(node.step_value_node) if node.step_value_node else None
+        collect = keep_value and not node.should_return_null
+        body = self.compile(node.body_node, collect)
+        name, slot, counted = node.var_name_tok.value, node.slot, node.counted
+        def for_(context, run):
+            elements = []
+            start_value = start_closure(context, run)
+            end_value = end_closure(context, run)
+            step_value = step_closure(context, run) if step_closure else new_number(1)
+            start, end, step = start_value.value, end_value.value, step_value.value
+            if counted_range(counted, start, end, step):
+                frame, symbol_table = context.frame, context.symbol_table
+                for i in range(start, end, step):
+                    if slot is None: symbol_table.set(name, new_number(i))
+                    else: frame[slot] = new_number(i)
+                    try:
+                        value = body(context, run)
+                    except Continue:
+                        continue
+                    except Break:
+                        break
+                    if collect: elements.append(value)
+            else:
+                i = start
+                ascending = step >= 0
+                while (i < end) if ascending else (i > end):
+                    if slot is None:
+                        context.symbol_table.set(name, new_number(i))
+                    else:
+                        context.frame[slot] = new_number(i)
+                    i += step
+                    try:
+                        value = body(context, run)
+                    except Continue:
+                        continue
+                    except Break:
+                        break
+                    if collect: elements.append(value)
+            if collect: return List(elements)
+            return Number.null
+        return for_
+
+    def visit_WhileNode(self, node, keep_value):
+        condition = self.compile(node.condition_node)
+        collect = keep_value and not node.should_return_null
+        body = self.compile(node.body_node, collect)
+        def while_(context, run):
+            elements = []
+            while condition(context, run).is_true():
+                try:
+                    value = body(context, run)
+                except Continue:
+                    continue
+                except Break:
+                    break
+                if collect: elements.append(value)
+            if collect: return List(elements)
+            return Number.null
+        return while_
+
+    # The body is compiled now, knowing whether its value is used
+    def visit_FuncDefNode(self, node, keep_value):
+        closure_for(node.body_node, node.should_auto_return)
+        func_name = node.var_name_tok.value if node.var_name_tok else None
+        arg_names = [arg_name.value for arg_name in node.arg_name_toks]
+        body_node, should_auto_return = node.body_node, node.should_auto_return
+        slot, arg_slots, slot_names = node.slot, node.arg_slots, node.slot_names
+        frame_escapes, source = node.frame_escapes, node.source
+        def function(context, run):
+            func_value = Function(
+                func_name, body_node, arg_names, should_auto_return, arg_slots, slot_names, context.frame, frame_escapes, source
+            )
+            if func_name:
+                if slot is None:
+                    context.symbol_table.set(func_name, func_value)
+                else:
+                    context.frame[slot] = func_value
+            return func_value
+        return function
+
+    # A BREAK or CONTINUE the callee did not handle goes on to the loop around
+    # the call, as it does in the interpreter
+    def visit_CallNode(self, node, keep_value):
+        callee = self.compile(node.node_to_call)
+        arg_closures = [self.compile(arg_node) for arg_node in node.arg_nodes]
+        pos_start, pos_end = node.pos_start, node.pos_end
+        def call(context, run):
+            value_to_call = callee(context, run)
+            args = [arg_closure(context, run) for arg_closure in arg_closures]
+            return value_to_call.execute(args, interpreter, context, pos_start, pos_end, run)
+        return call
+
+    def visit_ReturnNode(self, node, keep_value):
+        value_closure = self.compile(node.node_to_return) if node.node_to_return else None
+        def return_(context, run):
+            raise Return(value_closure(context, run) if value_closure else Number.null)
+        return return_
+
+    def visit_ContinueNode(self, node, keep_value):
+        def continue_(context, run):
+            raise Continue()
+        return continue_
+
+    def visit_BreakNode(self, node, keep_value):
+        def break_(context, run):
+            raise Break()
+        return break_
@@ -0,0 +1,98 @@
+from compiler.tokens import TT_KEYWORD
+from compiler.optimizer import BINARY_METHODS
+from compiler.bytecode import NUMBER_OPERATIONS
+from compiler.signals import Failure
+from modules.value import Number, String, new_number, operation_error
+from modules.symbol_table import GlobalCache
+
+###############################
+# INLINE CACHES
+# A BinOpNode gets a BinaryCache the first time the interpreter runs it. The
+# operator is resolved to its Value method once, and the cache remembers the
+# operand types it last saw with the fast path for them: while the operands
+# keep those types the result is built directly, without the isinstance
+# checks and the (result, error) tuple of the method.
+# Anything else goes through the method (a miss) and the cache switches to
+# the new types, or to no fast path when there is none for them.
+#
+# A read of a global name gets a GlobalCache (see modules/symbol_table.py):
+# the Cell of the name it found and the version of the symbol table it was
+# found in.
+###############################
+
+# Fast paths by (method name, left type, right type). They return the result
+# or None when the method has to run, to raise its error
+def number_operation(operation):
+    def fast(left, right):
+        value = operation(left.value, right.value)
+        if value is not None: return new_number(value)
+    return fast
+
+def string_concat(left, right):
+    return String(left.value + right.value)
+
+def string_number_concat(left, right):
+    return String(left.value + str(right.value))
+
+def number_string_concat(left, right):
+    return String(str(left.value) + right.value)
+
+def string_repeat(left, right):
+    return String(left.value * right.value)
+
+FAST_PATHS = {
+    (method_name, Number, Number): number_operation(operation)
+    for method_name, operation in NUMBER_OPERATIONS.items()
+}
+FAST_PATHS['added_to', String, String] = string_concat
+FAST_PATHS['added_to', String, Number] = string_number_concat
+FAST_PATHS['added_to', Number, String] = number_string_concat
+FAST_PATHS['multed_by', String, Number] = string_repeat
+
+# [hits, misses] of every cache, by method name, for profiling
+BINARY_STATS = {method_name: [0, 0] for method_name in NUMBER_OPERATIONS}
+
+class BinaryCache:
+    def __init__(self, method_name):
+        self.method_name = method_name
+        self.stats = BINARY_STATS[method_name]
+        self.left_type = None
+        self.right_type = None
+        self.fast = None
+
+    # Operand types without a fast path, or a fast path giving up: run the
+    # Value method of the node's operation and specialise for these types
+    def miss(self, left, right, node, context):
+        self.stats[1] += 1
+        left_type, right_type = type(left), type(right)
+        self.fast = FAST_PATHS.get((self.method_name, left_type, right_type))
+        if self.fast is None: left_type = right_type = None
+        self.left_type, self.right_type = left_type, right_type
+        result, error = getattr(left, self.method_name)(right)
+        if error:
+            raise Failure(operation_error(error, node.pos_start, node.right_node.pos_start, node.pos_end, context))
+        return result
+
+    # A cached AST is pickled, the cache starts over when it is loaded
+    def __reduce__(self):
+        return (BinaryCache, (self.method_name,))
+
+def binary_cache_for(node):
+    op_tok = node.op_tok
+    node.cache = BinaryCache(BINARY_METHODS[op_tok.value if op_tok.type == TT_KEYWORD else op_tok.type])
+    return node.cache
+
+# Hits, misses and hit rate of the operators that ran, by method name
+def binary_stats():
+    return {
+        method_name: (hits, misses, hits / (hits + misses))
+        for method_name, (hits, misses) in BINARY_STATS.items() if hits + misses
+    }
+
+def reset_binary_stats():
+    for stats in BINARY_STATS.values():
+        stats[0] = stats[1] = 0
+
+def global_cache_for(node):
+    node.cache = GlobalCache(node.var_name_tok.value)
+    return node.cache
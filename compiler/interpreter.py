@@ -1,12 +1,16 @@
-from compiler.tokens import TOKENS
+from compiler.tokens import TT_KEYWORD, TT_MINUS
+from compiler.inline_cache import binary_cache_for, global_cache_for
+from compiler.signals import Break, Continue, Failure, Return
 from modules.list import List
 from modules.errors import RTError
 from modules.function import Function
-from modules.value import Number
+from modules.value import Number, new_number, operation_error
 from modules.value import String
 
 ###############################
 # RUNTIME RESULT
+# How a program ended, built once where an engine is entered. Inside the
+# engines values are returned directly and everything else is a signal
 ###############################
 class RTResult:
     def __init__(self):
@@ -18,13 +22,6 @@ class RTResult:
         self.func_return_value = None
         self.loop_should_continue = False
         self.loop_should_break = False
-
-    def register(self, res):
-        self.error = res.error
-        self.func_return_value = res.func_return_value
-        self.loop_should_continue = res.loop_should_continue
-        self.loop_should_break = res.loop_should_break
-        return res.value
     
     def success(self, value=None):
         self.reset()
@@ -50,20 +47,41 @@ class RTResult:
         self.reset()
         self.error = error
         return self
-    
-    def should_return(self):
-        return (
-            self.error or
-            self.func_return_value or
-            self.loop_should_continue or
-            self.loop_should_break
-        )
+
+# Runs evaluate on a program and turns the signal it ended with, if any,
+# into its RTResult
+def result_of(evaluate, node, context, run=None):
+    try:
+        return RTResult().success(evaluate(node, context, run))
+    except Failure as failure:
+        return RTResult().failure(failure.error)
+    except Return as signal:
+        return RTResult().success_return(signal.value)
+    except Break:
+        return RTResult().success_break()
+    except Continue:
+        return RTResult().success_continue()
+
+# A counted loop with integer bounds and a nonzero integer step runs over
+# range(start, end, step), which counts like the generic loop: up to end when
+# the step is positive, down to it when it is negative
+def counted_range(counted, start, end, step):
+    return counted and type(start) is int and type(end) is int and type(step) is int and step != 0
 
 ###############################
 # INTERPRETER (VCI)
 ###############################
 class Interpreter:
+    # engine runs the bodies of the functions called from here: this
+    # interpreter, unless it runs a body for an engine that could not
+    def __init__(self, engine=None):
+        self.engine = engine or self
+
     def visit(self, node, context, run=None):
+        return result_of(self.evaluate, node, context, run)
+
+    # Value of a node, errors and RETURN, BREAK and CONTINUE are raised
+    def evaluate(self, node, context, run=None):
         method_name = f'visit_{type(node).__name__}'
         method = getattr(self, method_name, self.no_visit_method)
         return method(node, context, run)
@@ -71,224 +89,191 @@ class Interpreter:
     def no_visit_method(self, node, context, run=None):
         raise Exception(f'No visit_{type(node).__name__} method defined')
     
+    # A literal is its pooled value
     def visit_NumberNode(self, node, context, run=None):
-        return RTResult().success(
-            Number(node.tok.value).set_context(context).set_pos(node.pos_start, node.pos_end)
-        )
+        return node.value
     
     def visit_StringNode(self, node, context, run=None):
-        return RTResult().success(
-            String(node.tok.value).set_context(context).set_pos(node.pos_start, node.pos_end)
-        )
+        return node.value
 
     def visit_ListNode(self, node, context, run=None):
-        res = RTResult()
-        elements = []
-        for element_node in node.element_nodes:
-            elements.append(res.register(self.visit(element_node, context, run)))
-            if res.should_return(): return res
-        return res.success(
-            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
-        )
+        if node.should_return_null:
+            for element_node in node.element_nodes:
+                self.evaluate(element_node, context, run)
+            return Number.null
+        elements = [self.evaluate(element_node, context, run) for element_node in node.element_nodes]
+        return List(elements)
 
+    # Globals are looked up by name, locals at the slot the resolver gave them
+    # in the frame of the function depth levels out. Values are shared, the
+    # variable's value itself is the result
     def visit_VarAccessNode(self, node, context, run=None):
-        res = RTResult()
         var_name = node.var_name_tok.value
-        value = context.symbol_table.get(var_name)
+        if node.slot is None:
+            cache = node.cache or global_cache_for(node)
+            symbol_table = context.symbol_table
+            value = cache.cell.value if cache.version == symbol_table.version else cache.miss(symbol_table)
+        else:
+            frame = context.frame
+            for _ in range(node.depth): frame = frame[0]
+            value = frame[node.slot]
         if not value:
-            return res.failure(RTError(
+            raise Failure(RTError(
                 node.pos_start, node.pos_end,
                 f"'{var_name}' is not defined",
                 context
             ))
-        value = value.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
-        return res.success(value)
+        return value
 
     def visit_VarAssignNode(self, node, context, run=None):
-        res = RTResult()
         var_name = node.var_name_tok.value
-        value = res.register(self.visit(node.value_node, context, run))
-        if res.should_return(): return res
+        value = self.evaluate(node.value_node, context, run)
 
-        # Check if variable already exists when using VAR keyword
-        if node.var_name_tok.type == TOKENS['TT_KEYWORD'] and node.var_name_tok.value == 'VAR':
-            if context.symbol_table.get(var_name) is not None:
-                return res.failure(RTError(
-                node.pos_start, node.pos_end,
-                f"Variable '{var_name}' is already declared",
-                context
-                ))
-            
-        context.symbol_table.set(var_name, value)
-        return res.success(value)
+        if node.slot is None:
+            context.symbol_table.set(var_name, value)
+        else:
+            frame = context.frame
+            for _ in range(node.depth): frame = frame[0]
+            frame[node.slot] = value
+        return value
 
+    # The operator is resolved once per node, and the node's inline cache
+    # computes the operation for the operand types it saw last
     def visit_BinOpNode(self, node, context, run=None):
-        res = RTResult()
-        left = res.register(self.visit(node.left_node, context, run))
-        if res.should_return(): return res
-        right = res.register(self.visit(node.right_node, context, run))
-        if res.should_return(): return res
-        error = None
-        if node.op_tok.type == TOKENS['TT_PLUS']:
-            result, error = left.added_to(right)
-        elif node.op_tok.type == TOKENS['TT_MINUS']:
-            result, error = left.subbed_by(right)
-        elif node.op_tok.type == TOKENS['TT_MUL']:
-            result, error = left.multed_by(right)
-        elif node.op_tok.type == TOKENS['TT_DIV']:
-            result, error = left.dived_by(right)
-        elif node.op_tok.type == TOKENS['TT_MOD']:
-            result, error = left.modded_by(right)
-        elif node.op_tok.type == TOKENS['TT_POW']:
-            result, error = left.powed_by(right)
-        elif node.op_tok.type == TOKENS['TT_EE']:
-            result, error = left.get_comparison_eq(right)
-        elif node.op_tok.type == TOKENS['TT_NE']:
-            result, error = left.get_comparison_ne(right)   
-        elif node.op_tok.type == TOKENS['TT_LT']:
-            result, error = left.get_comparison_lt(right)
-        elif node.op_tok.type == TOKENS['TT_GT']:
-            result, error = left.get_comparison_gt(right)
-        elif node.op_tok.type == TOKENS['TT_LTE']:
-            result, error = left.get_comparison_lte(right)
-        elif node.op_tok.type == TOKENS['TT_GTE']:
-            result, error = left.get_comparison_gte(right)
-        elif node.op_tok.matches(TOKENS['TT_KEYWORD'], 'AND'):
-            result, error = left.anded_by(right)
-        elif node.op_tok.matches(TOKENS['TT_KEYWORD'], 'OR'):
-            result, error = left.ored_by(right)
-        if error:
-            return res.failure(error)
-        else:
-            return res.success(result.set_pos(node.pos_start, node.pos_end))
+        cache = node.cache or binary_cache_for(node)
+        left = self.evaluate(node.left_node, context, run)
+        right = self.evaluate(node.right_node, context, run)
+        if type(left) is cache.left_type and type(right) is cache.right_type:
+            result = cache.fast(left, right)
+            if result is not None:
+                cache.stats[0] += 1
+                return result
+        return cache.miss(left, right, node, context)
 
     def visit_UnaryOpNode(self, node, context, run=None):
-        res = RTResult()
-        number = res.register(self.visit(node.node, context, run))
-        if res.should_return(): return res
+        number = self.evaluate(node.node, context, run)
+        result, error = self.unary(node, number)
+        if error: raise Failure(operation_error(error, node.node.pos_start, node.node.pos_start, node.pos_end, context))
+        return result
 
-        error = None
-        if node.op_tok.type == TOKENS['TT_MINUS']:
-            number, error = number.multed_by(Number(-1))
-        elif node.op_tok.matches(TOKENS['TT_KEYWORD'], 'NOT'):
-            number, error = number.notted()
-        if error:
-            return res.failure(error)
-        else:
-            return res.success(number.set_pos(node.pos_start, node.pos_end))
+    def unary(self, node, number):
+        if node.op_tok.type == TT_MINUS:
+            return number.multed_by(new_number(-1))
+        elif node.op_tok.matches(TT_KEYWORD, 'NOT'):
+            return number.notted()
+        return number, None
         
     def visit_IfNode(self, node, context, run=None):
-        res = RTResult()
         for condition, expr, should_return_null in node.cases:
-            condition_value = res.register(self.visit(condition, context, run))
-            if res.should_return(): return res
-            if condition_value.is_true():
-                expr_value = res.register(self.visit(expr, context, run))
-                if res.should_return(): return res
-                return res.success(Number.null if should_return_null else expr_value)
+            if self.evaluate(condition, context, run).is_true():
+                expr_value = self.evaluate(expr, context, run)
+                return Number.null if should_return_null else expr_value
         if node.else_case:
             expr, should_return_null = node.else_case
-            expr_value = res.register(self.visit(expr, context, run))
-            if res.should_return(): return res
-            return res.success(Number.null if should_return_null else expr_value)
-        return res.success(Number.null)
+            expr_value = self.evaluate(expr, context, run)
+            return Number.null if should_return_null else expr_value
+        return Number.null
     
+    # A loop whose value is not used does not keep the values of its body
     def visit_ForNode(self, node, context, run=None):
-        res = RTResult()
         elements = []
+        collect = not node.should_return_null
 
-        start_value = res.register(self.visit(node.start_value_node, context, run))
-        if res.should_return(): return res
-        
-        end_value = res.register(self.visit(node.end_value_node, context, run))
-        if res.should_return(): return res
-        
+        start_value = self.evaluate(node.start_value_node, context, run)
+        end_value = self.evaluate(node.end_value_node, context, run)
         if node.step_value_node:
-            step_value = res.register(self.visit(node.step_value_node, context, run))
-            if res.should_return(): return res
+            step_value = self.evaluate(node.step_value_node, context, run)
         else:
-            step_value = Number(1)
-        
-        i = start_value.value
-        
-        if step_value.value >= 0:
-            condition = lambda: i < end_value.value
+            step_value = new_number(1)
+        start, end, step = start_value.value, end_value.value, step_value.value
+
+        if counted_range(node.counted, start, end, step):
+            # Only the loop stores the variable: its slot takes the Number of
+            # each native integer of the range
+            slot, frame = node.slot, context.frame
+            symbol_table, name = context.symbol_table, node.var_name_tok.value
+            for i in range(start, end, step):
+                if slot is None: symbol_table.set(name, new_number(i))
+                else: frame[slot] = new_number(i)
+                try:
+                    value = self.evaluate(node.body_node, context, run)
+                except Continue:
+                    continue
+                except Break:
+                    break
+                if collect: elements.append(value)
         else:
-            condition = lambda: i > end_value.value
-        while condition():
-            context.symbol_table.set(node.var_name_tok.value, Number(i))
-            i += step_value.value
+            i = start
+            ascending = step >= 0
+            while (i < end) if ascending else (i > end):
+                if node.slot is None:
+                    context.symbol_table.set(node.var_name_tok.value, new_number(i))
+                else:
+                    context.frame[node.slot] = new_number(i)
+                i += step
 
-            value = res.register(self.visit(node.body_node, context, run))
-            if res.should_return() and res.loop_should_continue == False and res.loop_should_break == False: return res
-            if res.loop_should_continue: continue
-            if res.loop_should_break: break
-            elements.append(value)
+                try:
+                    value = self.evaluate(node.body_node, context, run)
+                except Continue:
+                    continue
+                except Break:
+                    break
+                if collect: elements.append(value)
 
-        return res.success(
+        return (
             Number.null if node.should_return_null else
-            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
+            List(elements)
         )
     
     def visit_WhileNode(self, node, context, run=None):
-        res = RTResult()
         elements = []
+        collect = not node.should_return_null
         
-        while True:
-            condition = res.register(self.visit(node.condition_node, context, run))
-            if res.should_return(): return res
-
-            if not condition.is_true(): break
+        while self.evaluate(node.condition_node, context, run).is_true():
+            try:
+                value = self.evaluate(node.body_node, context, run)
+            except Continue:
+                continue
+            except Break:
+                break
+            if collect: elements.append(value)
 
-            value = res.register(self.visit(node.body_node, context, run))
-            if res.should_return() and res.loop_should_continue == False and res.loop_should_break == False: return res
-            if res.loop_should_continue: continue
-            if res.loop_should_break: break
-            elements.append(value)
-
-        return res.success(
+        return (
             Number.null if node.should_return_null else
-            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
+            List(elements)
         )
     
     def visit_FuncDefNode(self, node, context, run=None):
-        res = RTResult()
         func_name = node.var_name_tok.value if node.var_name_tok else None
         body_node = node.body_node
         arg_names = [arg_name.value for arg_name in node.arg_name_toks]
-        func_value = Function(func_name, body_node, arg_names, node.should_auto_return).set_context(context).set_pos(node.pos_start, node.pos_end)
+        func_value = Function(
+            func_name, body_node, arg_names, node.should_auto_return, node.arg_slots, node.slot_names, context.frame, node.frame_escapes, node.source
+        )
         if node.var_name_tok:
-            context.symbol_table.set(func_name, func_value)
-        return res.success(func_value)
+            if node.slot is None:
+                context.symbol_table.set(func_name, func_value)
+            else:
+                context.frame[node.slot] = func_value
+        return func_value
     
+    # Neither the function nor its return value is copied, the call site is
+    # passed instead. A BREAK or CONTINUE the callee does not handle goes on
+    # to the loop around the call
     def visit_CallNode(self, node, context, run=None):
-        res = RTResult()
-        args = []
-        value_to_call = res.register(self.visit(node.node_to_call, context, run))
-        if res.should_return(): return res
-        value_to_call = value_to_call.copy().set_pos(node.pos_start, node.pos_end)
-        
-        for arg_node in node.arg_nodes:
-            args.append(res.register(self.visit(arg_node, context, run)))
-            if res.should_return(): return res
-        
-        return_value = res.register(value_to_call.execute(args, self, res, run))
-        if res.should_return(): return res
-        return_value = return_value.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
-        return res.success(return_value)
+        value_to_call = self.evaluate(node.node_to_call, context, run)
+        args = [self.evaluate(arg_node, context, run) for arg_node in node.arg_nodes]
+        return value_to_call.execute(args, self.engine, context, node.pos_start, node.pos_end, run)
     
     def visit_ReturnNode(self, node, context, run=None):
-        res = RTResult()
         if node.node_to_return:
-            value = res.register(self.visit(node.node_to_return, context, run))
-            if res.should_return(): return res
+            value = self.evaluate(node.node_to_return, context, run)
         else:
-            print("HOLA")
             value = Number.null
-        return res.success_return(value)
+        raise Return(value)
     
     def visit_ContinueNode(self, node, context, run=None):
-        return RTResult().success_continue()
+        raise Continue()
     
     def visit_BreakNode(self, node, context, run=None):
-        return RTResult().success_break()
\ No newline at end of file
+        raise Break()
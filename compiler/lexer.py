@@ -1,45 +1,209 @@
-from compiler.tokens import Token, TOKENS, KEYWORDS
+from compiler.tokens import Token, TokenBuffer, KEYWORDS, TT_ARROW, TT_COMMA, TT_DIV, TT_EE, TT_EOF, TT_EQ, TT_FLOAT, TT_GT, TT_GTE, TT_IDENTIFIER, TT_INT, TT_KEYWORD, TT_LPAREN, TT_LSQUARE, TT_LT, TT_LTE, TT_MINUS, TT_MOD, TT_MUL, TT_NE, TT_NEWLINE, TT_PLUS, TT_POW, TT_RPAREN, TT_RSQUARE, TT_STRING
 from modules.errors import ExpectedCharError, IllegalCharError
+from modules.position import Position, SOURCES
+import re
 import string
+import sys
 
 LETTERS = string.ascii_letters
 DIGITS = '0123456789'
 LETTERS_DIGITS = LETTERS + DIGITS
 
 ###############################
-# POSITION
-# Position class to keep track of the current character in the input text
+# DISPATCH TABLES
+# The lexer looks up the first character of every lexeme in CHAR_KINDS and
+# either emits a single character token directly or matches the rest of the
+# lexeme with one of the compiled patterns below
 ###############################
 
-class Position: 
-    def __init__(self, idx, ln, col, fn, ftxt):
-        self.idx = idx
-        self.ln = ln 
-        self.col = col
-        self.fn = fn
-        self.ftxt = ftxt
+KIND_SKIP = 0
+KIND_COMMENT = 1
+KIND_NEWLINE = 2
+KIND_NUMBER = 3
+KIND_IDENTIFIER = 4
+KIND_STRING = 5
+KIND_OPERATOR = 6
+KIND_SINGLE = 7
 
-    def advance(self, current_char=None):
-        self.idx += 1
-        self.col += 1
+SINGLE_CHAR_TOKENS = {
+    '+': TT_PLUS,
+    '-': TT_MINUS,
+    '*': TT_MUL,
+    '/': TT_DIV,
+    '%': TT_MOD,
+    '^': TT_POW,
+    ',': TT_COMMA,
+    '(': TT_LPAREN,
+    ')': TT_RPAREN,
+    '[': TT_LSQUARE,
+    ']': TT_RSQUARE,
+    '=': TT_EQ,
+    '<': TT_LT,
+    '>': TT_GT,
+}
 
-        if current_char == '\n':
-            self.ln += 1
-            self.col = 0
+# Two character operators, tried first for '=', '<', '>' and '!'
+OPERATOR_TOKENS = {
+    '==': TT_EE,
+    '=>': TT_ARROW,
+    '<=': TT_LTE,
+    '>=': TT_GTE,
+    '!=': TT_NE,
+}
 
-        return self
+CHAR_KINDS = {' ': KIND_SKIP, '\t': KIND_SKIP, '#': KIND_COMMENT, ';': KIND_NEWLINE, '\n': KIND_NEWLINE, '"': KIND_STRING}
+CHAR_KINDS.update((char, KIND_NUMBER) for char in DIGITS)
+CHAR_KINDS.update((char, KIND_IDENTIFIER) for char in LETTERS)
+CHAR_KINDS.update((char, KIND_OPERATOR) for char in '=<>!')
+CHAR_KINDS.update((char, KIND_SINGLE) for char in '+-*/%^,()[]')
 
-    def copy(self):
-        return Position(self.idx, self.ln, self.col, self.fn, self.ftxt)
+WHITESPACE_RE = re.compile(r'[ \t]+')
+NUMBER_RE = re.compile(r'[0-9]\d*(\.\d*)?')
+IDENTIFIER_RE = re.compile(r'[A-Za-z][A-Za-z0-9_]*')
+STRING_BODY_RE = re.compile(r'[^"]*')
 
 # Lexer class to convert the input text into tokens
 class Lexer:
     def __init__(self, fn, text):
+        self.fn = fn
         self.text = text
+        self.source = SOURCES.add(fn, text)
+
+    # Function to add tokens to an array of tokens
+    def make_tokens(self):
+        buffer, error = self.make_token_buffer()
+        if error: return [], error
+        return buffer.to_tokens(), None
+
+    # Same token stream kept as parallel arrays, without Token objects
+    def make_token_buffer(self):
+        buffer = TokenBuffer()
+        _, error = self.scan(buffer)
+        return buffer, error
+
+    # Generator mode: the text is lexed a chunk at a time as the parser pulls
+    # tokens. A lexing error ends the stream with an EOF token at the error
+    # and is left in self.error for the caller to report
+    def iter_tokens(self, chunk_size=4096):
+        self.error = None
+        buffer = TokenBuffer()
+        idx = 0
+        while True:
+            idx, error = self.scan(buffer, idx, idx + chunk_size)
+            yield from buffer.to_tokens()
+            if error:
+                self.error = error
+                yield Token(TT_EOF, None, error.pos_start)
+                return
+            if buffer.kinds and buffer.kinds[-1] == TT_EOF:
+                return
+            buffer.clear()
+
+    # Single pass over the text: lexemes are sliced out of self.text and
+    # positions are the offsets of the lexeme in the source map. Scanning
+    # stops at the first lexeme starting at or after stop, and the EOF token
+    # is only added once the whole text has been read
+    def scan(self, buffer, idx=0, stop=None):
+        text = self.text
+        base = self.source.base
+        length = len(text)
+        if stop is None or stop > length: stop = length
+        add_kind = buffer.kinds.append
+        add_value = buffer.values.append
+        add_start = buffer.starts.append
+        add_end = buffer.ends.append
+        char_kinds = CHAR_KINDS
+        keywords = KEYWORDS
+        intern = sys.intern
+
+        while idx < stop:
+            char = text[idx]
+            kind = char_kinds.get(char)
+
+            if kind == KIND_SKIP:
+                idx = WHITESPACE_RE.match(text, idx).end()
+                continue
+            elif kind == KIND_IDENTIFIER:
+                end = IDENTIFIER_RE.match(text, idx).end()
+                id_str = text[idx:end]
+                keyword = keywords.get(id_str)
+                if keyword is None:
+                    add_kind(TT_IDENTIFIER)
+                    add_value(intern(id_str))
+                else:
+                    add_kind(TT_KEYWORD)
+                    add_value(keyword)
+            elif kind == KIND_SINGLE:
+                end = idx + 1
+                add_kind(SINGLE_CHAR_TOKENS[char])
+                add_value(None)
+            elif kind == KIND_NEWLINE:
+                end = idx + 1
+                add_kind(TT_NEWLINE)
+                add_value(None)
+            elif kind == KIND_NUMBER:
+                match = NUMBER_RE.match(text, idx)
+                end = match.end()
+                if match.group(1) is None:
+                    add_kind(TT_INT)
+                    add_value(int(text[idx:end]))
+                else:
+                    add_kind(TT_FLOAT)
+                    add_value(float(text[idx:end]))
+            elif kind == KIND_OPERATOR:
+                tok_type = OPERATOR_TOKENS.get(text[idx:idx + 2])
+                if tok_type is not None:
+                    end = idx + 2
+                elif char == '!':
+                    # The reference lexer skips the character after a lone '!'
+                    # before reporting, so the error span ends two places on
+                    return idx, ExpectedCharError(base + idx, base + idx + 2, "'=' (after '!' expected)")
+                else:
+                    tok_type = SINGLE_CHAR_TOKENS[char]
+                    end = idx + 1
+                add_kind(tok_type)
+                add_value(None)
+            elif kind == KIND_STRING:
+                body_end = STRING_BODY_RE.match(text, idx + 1).end()
+                # Backslashes are dropped and never escape a quote, matching
+                # the reference lexer; an unterminated string runs one past EOF
+                end = body_end + 1
+                add_kind(TT_STRING)
+                add_value(text[idx + 1:body_end].replace('\\', ''))
+            elif kind == KIND_COMMENT:
+                # Comments swallow the newline that terminates them
+                end = text.find('\n', idx)
+                idx = length if end < 0 else end + 1
+                continue
+            else:
+                return idx, IllegalCharError(base + idx, base + idx + 1, "'" + char + "'")
+
+            add_start(base + idx)
+            add_end(base + end)
+            idx = end
+
+        if idx >= length:
+            buffer.append(TT_EOF, None, base + idx, base + idx + 1)
+        return idx, None
+
+###############################
+# CHARACTER LEXER
+# Reference lexer that walks the input one character at a time, kept to
+# cross-check the table-driven Lexer and as the baseline of its benchmark
+###############################
+
+class CharLexer:
+    def __init__(self, fn, text):
+        self.text = text
+        self.source = SOURCES.add(fn, text)
+        self.base = self.source.base
         self.pos = Position(-1, 0, -1, fn, text)
         self.current_char = None
         self.advance()
     
+    def offset(self):
+        return self.base + self.pos.idx
+
     def advance(self):
         self.pos.advance(self.current_char)
         self.current_char = self.text[self.pos.idx] if self.pos.idx < len(self.text) else None
@@ -53,7 +217,7 @@ class Lexer:
             elif self.current_char == '#':
                 self.skip_comment()
             elif self.current_char in ';\n':
-                tokens.append(Token(TOKENS['TT_NEWLINE'], pos_start=self.pos))
+                tokens.append(Token(TT_NEWLINE, pos_start=self.offset()))
                 self.advance()
             elif self.current_char in DIGITS:
                 tokens.append(self.make_number())
@@ -62,37 +226,37 @@ class Lexer:
             elif self.current_char == '"':
                 tokens.append(self.make_string())
             elif self.current_char == '+':
-                tokens.append(Token(TOKENS['TT_PLUS'], pos_start=self.pos))
+                tokens.append(Token(TT_PLUS, pos_start=self.offset()))
                 self.advance()
             elif self.current_char == '-':
-                tokens.append(Token(TOKENS['TT_MINUS'], pos_start=self.pos))
+                tokens.append(Token(TT_MINUS, pos_start=self.offset()))
                 self.advance()
             elif self.current_char == '*':
-                tokens.append(Token(TOKENS['TT_MUL'], pos_start=self.pos))
+                tokens.append(Token(TT_MUL, pos_start=self.offset()))
                 self.advance()
             elif self.current_char == '/':
-                tokens.append(Token(TOKENS['TT_DIV'], pos_start=self.pos))
+                tokens.append(Token(TT_DIV, pos_start=self.offset()))
                 self.advance()
             elif self.current_char == '%':
-                tokens.append(Token(TOKENS['TT_MOD'], pos_start=self.pos))
+                tokens.append(Token(TT_MOD, pos_start=self.offset()))
                 self.advance()
             elif self.current_char == '^':
-                tokens.append(Token(TOKENS['TT_POW'], pos_start=self.pos))
+                tokens.append(Token(TT_POW, pos_start=self.offset()))
                 self.advance()
             elif self.current_char == ',':
-                tokens.append(Token(TOKENS['TT_COMMA'], pos_start=self.pos))
+                tokens.append(Token(TT_COMMA, pos_start=self.offset()))
                 self.advance()
             elif self.current_char == '(':
-                tokens.append(Token(TOKENS['TT_LPAREN'], pos_start=self.pos))
+                tokens.append(Token(TT_LPAREN, pos_start=self.offset()))
                 self.advance()
             elif self.current_char == ')':
-                tokens.append(Token(TOKENS['TT_RPAREN'], pos_start=self.pos))
+                tokens.append(Token(TT_RPAREN, pos_start=self.offset()))
                 self.advance()
             elif self.current_char == '[':
-                tokens.append(Token(TOKENS['TT_LSQUARE'], pos_start=self.pos))
+                tokens.append(Token(TT_LSQUARE, pos_start=self.offset()))
                 self.advance()
             elif self.current_char == ']':
-                tokens.append(Token(TOKENS['TT_RSQUARE'], pos_start=self.pos))
+                tokens.append(Token(TT_RSQUARE, pos_start=self.offset()))
                 self.advance()
             elif self.current_char == '!':
                 token, error = self.make_not_equals()
@@ -105,18 +269,18 @@ class Lexer:
             elif self.current_char == '>':
                 tokens.append(self.make_greater_than())
             else:
-                pos_start = self.pos.copy()
+                pos_start = self.offset()
                 char = self.current_char
                 self.advance()
-                return [], IllegalCharError(pos_start, self.pos.copy(), "'" + char + "'")
-        tokens.append(Token(TOKENS['TT_EOF'], pos_start=self.pos))
+                return [], IllegalCharError(pos_start, self.offset(), "'" + char + "'")
+        tokens.append(Token(TT_EOF, pos_start=self.offset()))
         return tokens, None
     
     # Function to convert character into integer or float
     def make_number(self):
         num_str = ''
         dot_count = 0
-        pos_start = self.pos.copy()
+        pos_start = self.offset()
 
         while self.current_char != None and (self.current_char.isdigit() or self.current_char == '.'):
             if self.current_char == '.':
@@ -128,26 +292,26 @@ class Lexer:
             self.advance()
 
         if dot_count == 0:
-            return Token(TOKENS['TT_INT'], int(num_str), pos_start, self.pos)
+            return Token(TT_INT, int(num_str), pos_start, self.offset())
         else:
-            return Token(TOKENS['TT_FLOAT'], float(num_str), pos_start, self.pos)
+            return Token(TT_FLOAT, float(num_str), pos_start, self.offset())
         
     # Function to convert character into identifier
     def make_identifier(self):
         id_str = ''
-        pos_start = self.pos.copy()
+        pos_start = self.offset()
 
         while self.current_char != None and self.current_char in LETTERS_DIGITS + '_':
             id_str += self.current_char
             self.advance()
 
-        tok_type = TOKENS['TT_KEYWORD'] if id_str in KEYWORDS else TOKENS['TT_IDENTIFIER']
-        return Token(tok_type, id_str, pos_start, self.pos)
+        tok_type = TT_KEYWORD if id_str in KEYWORDS else TT_IDENTIFIER
+        return Token(tok_type, id_str, pos_start, self.offset())
 
     # Function to convert character into string
     def make_string(self):
         string = ''
-        pos_start = self.pos.copy()
+        pos_start = self.offset()
         escape_character = False
         self.advance()
 
@@ -168,59 +332,60 @@ class Lexer:
             escape_character = False
 
         self.advance()
-        return Token(TOKENS['TT_STRING'], string, pos_start, self.pos)
+        return Token(TT_STRING, string, pos_start, self.offset())
 
     # Function to convert character into equals
     def make_not_equals(self):
-        pos_start = self.pos.copy()
+        pos_start = self.offset()
         self.advance()
 
         if self.current_char == '=':
             self.advance()
-            return Token(TOKENS['TT_NE'], pos_start=pos_start, pos_end=self.pos), None
+            return Token(TT_NE, pos_start=pos_start, pos_end=self.offset()), None
         
         self.advance()
-        return None, ExpectedCharError(pos_start, self.pos, "'=' (after '!' expected)")
+        return None, ExpectedCharError(pos_start, self.offset(), "'=' (after '!' expected)")
     
     def make_equals(self):
-        token_type = TOKENS['TT_EQ']
-        pos_start = self.pos.copy()
+        token_type = TT_EQ
+        pos_start = self.offset()
         self.advance()
 
         if self.current_char == '=':
             self.advance()
-            token_type = TOKENS['TT_EE']
+            token_type = TT_EE
 
         elif self.current_char == '>':
             self.advance()
-            token_type = TOKENS['TT_ARROW']
+            token_type = TT_ARROW
         
-        return Token(token_type, pos_start=pos_start, pos_end=self.pos)
+        return Token(token_type, pos_start=pos_start, pos_end=self.offset())
     
     def make_less_than(self):
-        token_type = TOKENS['TT_LT']
-        pos_start = self.pos.copy()
+        token_type = TT_LT
+        pos_start = self.offset()
         self.advance()
 
         if self.current_char == '=':
             self.advance()
-            token_type = TOKENS['TT_LTE']
+            token_type = TT_LTE
         
-        return Token(token_type, pos_start=pos_start, pos_end=self.pos)
+        return Token(token_type, pos_start=pos_start, pos_end=self.offset())
     
     def make_greater_than(self):
-        token_type = TOKENS['TT_GT']
-        pos_start = self.pos.copy()
+        token_type = TT_GT
+        pos_start = self.offset()
         self.advance()
 
         if self.current_char == '=':
             self.advance()
-            token_type = TOKENS['TT_GTE']
+            token_type = TT_GTE
         
-        return Token(token_type, pos_start=pos_start, pos_end=self.pos)
+        return Token(token_type, pos_start=pos_start, pos_end=self.offset())
     
     def skip_comment(self):
         self.advance()
-        while self.current_char != '\n':
+        while self.current_char not in ('\n', None):
             self.advance()
-        self.advance()
\ No newline at end of file
+        if self.current_char == '\n':
+            self.advance()
\ No newline at end of file
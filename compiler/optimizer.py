@@ -0,0 +1,181 @@
+from compiler.tokens import Token, TT_DIV, TT_EE, TT_FLOAT, TT_GT, TT_GTE, TT_INT, TT_KEYWORD, TT_LT, TT_LTE, TT_MINUS, TT_MOD, TT_MUL, TT_NE, TT_PLUS, TT_POW, TT_STRING
+from compiler.resolver import CONSTANT_NAMES
+from modules.nodes import BreakNode, ContinueNode, NumberNode, ReturnNode, StringNode
+from modules.value import Number, String
+###############################
+# OPTIMIZER
+# Rewrites a resolved AST before it is interpreted: arithmetic and comparisons
+# on literals and on the built-in constants are folded, IF/ELIF cases whose
+# condition is constant are pruned and statements after a RETURN, BREAK or
+# CONTINUE in the same block are dropped. Folding runs the same Value methods
+# the interpreter would, and an operation that fails is left in the tree so
+# the error is still raised at run time, at the same position.
+###############################
+
+BINARY_METHODS = {
+    TT_PLUS: 'added_to',
+    TT_MINUS: 'subbed_by',
+    TT_MUL: 'multed_by',
+    TT_DIV: 'dived_by',
+    TT_MOD: 'modded_by',
+    TT_POW: 'powed_by',
+    TT_EE: 'get_comparison_eq',
+    TT_NE: 'get_comparison_ne',
+    TT_LT: 'get_comparison_lt',
+    TT_GT: 'get_comparison_gt',
+    TT_LTE: 'get_comparison_lte',
+    TT_GTE: 'get_comparison_gte',
+    'AND': 'anded_by',
+    'OR': 'ored_by',
+}
+
+# Folding must not be more expensive than the program: powers of more bits
+# and longer strings are left for run time. Both are checked before the
+# operation runs
+MAX_FOLDED_BITS = 4096
+MAX_FOLDED_STRING = 1024
+
+class Optimizer:
+    def __init__(self, global_symbol_table):
+        self.global_symbol_table = global_symbol_table
+
+    def optimize(self, node):
+        return self.visit(node)
+
+    def visit(self, node):
+        method = getattr(self, f'visit_{type(node).__name__}', None)
+        return method(node) if method else node
+
+    # Value of a literal node
+    def constant(self, node):
+        if isinstance(node, NumberNode):
+            return Number(node.tok.value)
+        if isinstance(node, StringNode):
+            return String(node.tok.value)
+        return None
+
+    # Whether the result would be too large to fold: the length of a repeated
+    # string, or the bit length of the base times the exponent for a power
+    def too_large(self, method_name, left, right):
+        if not isinstance(right, Number) or type(right.value) is not int: return False
+        if method_name == 'multed_by' and isinstance(left, String):
+            return len(left.value) * right.value > MAX_FOLDED_STRING
+        if method_name == 'powed_by' and isinstance(left, Number) and type(left.value) is int:
+            return abs(left.value).bit_length() * right.value > MAX_FOLDED_BITS
+        return False
+
+    # Literal node for a folded value, or None if it cannot be one
+    def literal(self, value, pos_start, pos_end):
+        if isinstance(value, String):
+            if len(value.value) > MAX_FOLDED_STRING: return None
+            return StringNode(Token(TT_STRING, value.value, pos_start, pos_end))
+        if isinstance(value, Number) and type(value.value) in (int, float):
+            tok_type = TT_INT if type(value.value) is int else TT_FLOAT
+            return NumberNode(Token(tok_type, value.value, pos_start, pos_end))
+        return None
+
+    def visit_ListNode(self, node):
+        element_nodes = []
+        for element_node in node.element_nodes:
+            element_nodes.append(self.visit(element_node))
+            # Nothing after these runs, only statement lists can contain them
+            if isinstance(element_node, (ReturnNode, BreakNode, ContinueNode)): break
+        node.element_nodes = element_nodes
+        return node
+
+    def visit_VarAccessNode(self, node):
+        name = node.var_name_tok.value
+        if node.slot is None and name in CONSTANT_NAMES:
+            value = self.global_symbol_table.get(name)
+            folded = self.literal(value, node.pos_start, node.pos_end)
+            if folded: return folded
+        return node
+
+    def visit_VarAssignNode(self, node):
+        node.value_node = self.visit(node.value_node)
+        return node
+
+    def visit_BinOpNode(self, node):
+        node.left_node = self.visit(node.left_node)
+        node.right_node = self.visit(node.right_node)
+        left = self.constant(node.left_node)
+        right = self.constant(node.right_node)
+        if left is None or right is None: return node
+
+        op_tok = node.op_tok
+        method_name = BINARY_METHODS.get(op_tok.value if op_tok.type == TT_KEYWORD else op_tok.type)
+        if method_name is None: return node
+        if self.too_large(method_name, left, right): return node
+        try:
+            result, error = getattr(left, method_name)(right)
+        except Exception:
+            return node
+        if error: return node
+        return self.literal(result, node.pos_start, node.pos_end) or node
+
+    def visit_UnaryOpNode(self, node):
+        node.node = self.visit(node.node)
+        value = self.constant(node.node)
+        if value is None: return node
+        try:
+            if node.op_tok.type == TT_MINUS:
+                value, error = value.multed_by(Number(-1))
+            elif node.op_tok.matches(TT_KEYWORD, 'NOT'):
+                value, error = value.notted()
+            else:
+                error = None
+        except Exception:
+            return node
+        if error: return node
+        return self.literal(value, node.pos_start, node.pos_end) or node
+
+    # Cases whose condition is constant false are removed, and a constant
+    # true condition turns its case into the ELSE and drops what follows
+    def visit_IfNode(self, node):
+        cases = []
+        else_case = node.else_case
+        for condition, expr, should_return_null in node.cases:
+            condition = self.visit(condition)
+            value = self.constant(condition)
+            if value is None:
+                cases.append((condition, self.visit(expr), should_return_null))
+                continue
+            if not value.is_true(): continue
+            else_case = (expr, should_return_null)
+            break
+        if else_case:
+            else_case = (self.visit(else_case[0]), else_case[1])
+
+        # Only the ELSE is left: an inline IF is just its value
+        if not cases and else_case and not else_case[1]:
+            return else_case[0]
+        node.cases = cases
+        node.else_case = else_case
+        return node
+
+    def visit_ForNode(self, node):
+        node.start_value_node = self.visit(node.start_value_node)
+        node.end_value_node = self.visit(node.end_value_node)
+        if node.step_value_node:
+            node.step_value_node = self.visit(node.step_value_node)
+        node.body_node = self.visit(node.body_node)
+        return node
+
+    def visit_WhileNode(self, node):
+        node.condition_node = self.visit(node.condition_node)
+        node.body_node = self.visit(node.body_node)
+        return node
+
+    def visit_FuncDefNode(self, node):
+        node.body_node = self.visit(node.body_node)
+        return node
+
+    def visit_CallNode(self, node):
+        node.node_to_call = self.visit(node.node_to_call)
+        node.arg_nodes = [self.visit(arg_node) for arg_node in node.arg_nodes]
+        return node
+
+    def visit_ReturnNode(self, node):
+        if node.node_to_return:
+            node.node_to_return = self.visit(node.node_to_return)
+        return node
@@ -1,5 +1,5 @@
 from modules.errors import InvalidSyntaxError
-from compiler.tokens import TOKENS
+from compiler.tokens import TT_ARROW, TT_COMMA, TT_DIV, TT_EE, TT_EOF, TT_EQ, TT_FLOAT, TT_GT, TT_GTE, TT_IDENTIFIER, TT_INT, TT_KEYWORD, TT_LPAREN, TT_LSQUARE, TT_LT, TT_LTE, TT_MINUS, TT_MOD, TT_MUL, TT_NE, TT_NEWLINE, TT_PLUS, TT_POW, TT_RPAREN, TT_RSQUARE, TT_STRING
 from modules.nodes import BreakNode, CallNode, ContinueNode, ForNode, FuncDefNode, IfNode, ListNode, NumberNode, BinOpNode, ReturnNode, StringNode, UnaryOpNode, VarAccessNode, VarAssignNode, WhileNode
 ###############################
 # PARSE RESULT
@@ -11,7 +11,6 @@ class ParseResult:
         self.error = None  # To store any error encountered during parsing
         self.node = None   # To store the resulting node of the parsing process
         self.advance_count = 0  # To keep track of the number of advancements made during parsing
-        self.to_reverse_count = 0  # To keep track of the number of advancements to reverse
 
     def register_advancement(self):
         self.advance_count += 1
@@ -22,13 +21,6 @@ class ParseResult:
         if res.error: self.error = res.error  # Propagate the error if any
         return res.node  # Return the node from the result
     
-    # Try to register the result of a parsing operation
-    def try_register(self, res):
-        if res.error:
-            self.to_reverse_count = res.advance_count
-            return None
-        return self.register(res)
-
     # Mark the parsing as successful and store the resulting node
     def success(self, node):
         self.node = node
@@ -40,13 +32,58 @@ class ParseResult:
             self.error = error
         return self
 
+###############################
+# LOOKAHEAD SETS
+# Every choice in the grammar is made from the current token (and for an
+# assignment the one after it), so no token is parsed twice
+###############################
+
+# Tokens that can start an expression
+EXPR_FIRST_TYPES = frozenset((TT_INT, TT_FLOAT, TT_STRING, TT_IDENTIFIER, TT_LPAREN, TT_LSQUARE, TT_PLUS, TT_MINUS))
+EXPR_FIRST_KEYWORDS = frozenset(('VAR', 'NOT', 'IF', 'FOR', 'WHILE', 'FUNCTION'))
+# Keywords that can follow a list of statements, along with EOF
+STATEMENTS_FOLLOW_KEYWORDS = frozenset(('END', 'ELSE', 'ELIF'))
+
+###############################
+# OPERATOR TABLE
+# Precedence and right associativity of every binary operator, keyed by
+# value for keywords and by type for every other token. Unary '+' and '-'
+# apply to a power, NOT applies to a comparison
+###############################
+
+LOGIC_PRECEDENCE = 1
+COMPARISON_PRECEDENCE = 2
+POW_PRECEDENCE = 6
+
+BINARY_OPERATORS = {
+    'AND': (LOGIC_PRECEDENCE, False),
+    'OR': (LOGIC_PRECEDENCE, False),
+    TT_EE: (COMPARISON_PRECEDENCE, False),
+    TT_NE: (COMPARISON_PRECEDENCE, False),
+    TT_LT: (COMPARISON_PRECEDENCE, False),
+    TT_GT: (COMPARISON_PRECEDENCE, False),
+    TT_LTE: (COMPARISON_PRECEDENCE, False),
+    TT_GTE: (COMPARISON_PRECEDENCE, False),
+    TT_PLUS: (3, False),
+    TT_MINUS: (3, False),
+    TT_MUL: (4, False),
+    TT_DIV: (4, False),
+    TT_MOD: (4, False),
+    TT_POW: (POW_PRECEDENCE, True),
+}
+
+# Operands that are a single token, built without going through call() and
+# atom() unless they are called
+LEAF_NODES = {TT_INT: NumberNode, TT_FLOAT: NumberNode, TT_STRING: StringNode, TT_IDENTIFIER: VarAccessNode}
+
 ###############################
 # PARSER
 ###############################
 class Parser:
-    def __init__(self, tokens, global_symbol_table):
+    # tokens may be a list, a TokenBuffer or a TokenStream pulling from
+    # Lexer.iter_tokens()
+    def __init__(self, tokens):
         self.tokens = tokens
-        self.global_symbol_table = global_symbol_table
         self.tok_idx = -1
         self.advance()
 
@@ -55,18 +92,31 @@ class Parser:
         self.update_current_tok()
         return self.current_tok
 
-    def reverse(self, amount=1):
-        self.tok_idx -= amount
-        self.update_current_tok()
-        return self.current_tok
-    
     def update_current_tok(self):
-        if self.tok_idx >= 0 and self.tok_idx < len(self.tokens):
-            self.current_tok = self.tokens[self.tok_idx]
+        if self.tok_idx >= 0:
+            try:
+                self.current_tok = self.tokens[self.tok_idx]
+            except IndexError:
+                pass
+
+    # Token after the current one, without advancing
+    def peek(self):
+        try:
+            return self.tokens[self.tok_idx + 1]
+        except IndexError:
+            return self.current_tok
+
+    def starts_expr(self):
+        tok = self.current_tok
+        return tok.type in EXPR_FIRST_TYPES or (tok.type == TT_KEYWORD and tok.value in EXPR_FIRST_KEYWORDS)
+
+    def ends_statements(self):
+        tok = self.current_tok
+        return tok.type == TT_EOF or (tok.type == TT_KEYWORD and tok.value in STATEMENTS_FOLLOW_KEYWORDS)
 
     def parse(self):
         res = self.statements()
-        if not res.error and self.current_tok.type != TOKENS['TT_EOF']:
+        if not res.error and self.current_tok.type != TT_EOF:
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 "Expected '+', '-', '*' or '/'"
@@ -76,9 +126,9 @@ class Parser:
     def statements(self):
         res = ParseResult()
         statements = []
-        pos_start = self.current_tok.pos_start.copy()
+        pos_start = self.current_tok.pos_start
 
-        while self.current_tok.type == TOKENS['TT_NEWLINE']:
+        while self.current_tok.type == TT_NEWLINE:
             res.register_advancement()
             self.advance()
         
@@ -86,48 +136,42 @@ class Parser:
         if res.error: return res
         statements.append(statement)
 
-        more_statements = True
-
-        while True:
-            newline_count = 0
-            while self.current_tok.type == TOKENS['TT_NEWLINE']:
+        # Statements are separated by newlines and the list ends at a token
+        # that can follow it
+        while self.current_tok.type == TT_NEWLINE:
+            while self.current_tok.type == TT_NEWLINE:
                 res.register_advancement()
                 self.advance()
-                newline_count += 1
-            if newline_count == 0:
-                more_statements = False
-            if not more_statements: break
-            statement = res.try_register(self.statement())
-            if not statement:
-                self.reverse(res.to_reverse_count)
-                more_statements = False
-                continue
+            if self.ends_statements(): break
+            statement = res.register(self.statement())
+            if res.error: return res
             statements.append(statement)
 
-        return res.success(ListNode(statements, pos_start, self.current_tok.pos_start.copy()))
+        return res.success(ListNode(statements, pos_start, self.current_tok.pos_start))
 
     def statement(self):
         res = ParseResult()
-        pos_start = self.current_tok.pos_start.copy()
+        pos_start = self.current_tok.pos_start
 
-        if self.current_tok.matches(TOKENS['TT_KEYWORD'], 'RETURN'):
+        if self.current_tok.matches(TT_KEYWORD, 'RETURN'):
             res.register_advancement()
             self.advance()
 
-            expr = res.try_register(self.expr())
-            if not expr:
-                self.reverse(res.to_reverse_count)
-            return res.success(ReturnNode(expr, pos_start, self.current_tok.pos_start.copy()))
+            expr = None
+            if self.starts_expr():
+                expr = res.register(self.expr())
+                if res.error: return res
+            return res.success(ReturnNode(expr, pos_start, self.current_tok.pos_start))
         
-        if self.current_tok.matches(TOKENS['TT_KEYWORD'], 'CONTINUE'):
+        if self.current_tok.matches(TT_KEYWORD, 'CONTINUE'):
             res.register_advancement()
             self.advance()
-            return res.success(ContinueNode(pos_start, self.current_tok.pos_start.copy()))
+            return res.success(ContinueNode(pos_start, self.current_tok.pos_start))
         
-        if self.current_tok.matches(TOKENS['TT_KEYWORD'], 'BREAK'):
+        if self.current_tok.matches(TT_KEYWORD, 'BREAK'):
             res.register_advancement()
             self.advance()
-            return res.success(BreakNode(pos_start, self.current_tok.pos_start.copy()))
+            return res.success(BreakNode(pos_start, self.current_tok.pos_start))
 
         expr = res.register(self.expr())
         if res.error:
@@ -137,35 +181,17 @@ class Parser:
             ))
         return res.success(expr)
 
-    def bin_op(self, func_a, ops, func_b=None):
-        if func_b == None:
-            func_b = func_a
-        
-        res = ParseResult()
-        left = res.register(func_a())
-        if res.error: return res
-
-        while self.current_tok.type in ops or (self.current_tok.type, self.current_tok.value) in ops:
-            op_tok = self.current_tok
-            res.register_advancement()
-            self.advance()
-            right = res.register(func_b())
-            if res.error: return res
-            left = BinOpNode(left, op_tok, right)
-
-        return res.success(left)
-    
     def call(self):
         res = ParseResult()
         atom = res.register(self.atom())
         if res.error: return res
 
-        if self.current_tok.type == TOKENS['TT_LPAREN']:
+        if self.current_tok.type == TT_LPAREN:
             res.register_advancement()
             self.advance()
             arg_nodes = []
             
-            if self.current_tok.type == TOKENS['TT_RPAREN']:
+            if self.current_tok.type == TT_RPAREN:
                 res.register_advancement()
                 self.advance()
             else:
@@ -175,12 +201,12 @@ class Parser:
                         self.current_tok.pos_start, self.current_tok.pos_end,
                         "Expected ')', 'VAR', int, float, identifier, '+', '-', '(', '[', 'NOT'"
                     ))
-                while self.current_tok.type == TOKENS['TT_COMMA']:
+                while self.current_tok.type == TT_COMMA:
                     res.register_advancement()
                     self.advance()
                     arg_nodes.append(res.register(self.expr()))
                     if res.error: return res
-                if self.current_tok.type != TOKENS['TT_RPAREN']:
+                if self.current_tok.type != TT_RPAREN:
                     return res.failure(InvalidSyntaxError(
                         self.current_tok.pos_start, self.current_tok.pos_end,
                         f"Expected ',' or ')'"
@@ -195,27 +221,27 @@ class Parser:
         res = ParseResult()
         tok = self.current_tok
 
-        if tok.type in (TOKENS['TT_INT'], TOKENS['TT_FLOAT']):
+        if tok.type in (TT_INT, TT_FLOAT):
             res.register_advancement()
             self.advance()
             return res.success(NumberNode(tok))
         
-        if tok.type == TOKENS['TT_STRING']:
+        if tok.type == TT_STRING:
             res.register_advancement()
             self.advance()
             return res.success(StringNode(tok))
 
-        elif tok.type == TOKENS['TT_IDENTIFIER']:
+        elif tok.type == TT_IDENTIFIER:
             res.register_advancement()
             self.advance()
             return res.success(VarAccessNode(tok))
 
-        elif tok.type == TOKENS['TT_LPAREN']:
+        elif tok.type == TT_LPAREN:
             res.register_advancement()
             self.advance()
             expr = res.register(self.expr())
             if res.error: return res
-            if self.current_tok.type == TOKENS['TT_RPAREN']:
+            if self.current_tok.type == TT_RPAREN:
                 res.register_advancement()
                 self.advance()
                 return res.success(expr)
@@ -225,27 +251,27 @@ class Parser:
                     "Expected ')'"
                 ))
         
-        elif tok.type == TOKENS['TT_LSQUARE']:
+        elif tok.type == TT_LSQUARE:
             list_expr = res.register(self.list_expr())
             if res.error: return res
             return res.success(list_expr)
 
-        elif tok.matches(TOKENS['TT_KEYWORD'], 'IF'):
+        elif tok.matches(TT_KEYWORD, 'IF'):
             if_expr = res.register(self.if_expr())
             if res.error: return res
             return res.success(if_expr)	
         
-        elif tok.matches(TOKENS['TT_KEYWORD'], 'FOR'):
+        elif tok.matches(TT_KEYWORD, 'FOR'):
             for_expr = res.register(self.for_expr())
             if res.error: return res
             return res.success(for_expr)
        
-        elif tok.matches(TOKENS['TT_KEYWORD'], 'WHILE'):
+        elif tok.matches(TT_KEYWORD, 'WHILE'):
             while_expr = res.register(self.while_expr())
             if res.error: return res
             return res.success(while_expr)
 
-        elif tok.matches(TOKENS['TT_KEYWORD'], 'FUNCTION'):
+        elif tok.matches(TT_KEYWORD, 'FUNCTION'):
             func_def = res.register(self.func_def())
             if res.error: return res
             return res.success(func_def)
@@ -255,32 +281,13 @@ class Parser:
             "Expected int, float, identifier, '+', '-', '(', '[', 'IF', 'FOR', 'WHILE', 'FUNCTION'"
         ))
 
-    def power(self):
-        return self.bin_op(self.call, (TOKENS['TT_POW'], ), self.factor)
-
-    def factor(self):
-        res = ParseResult()
-        tok = self.current_tok
-
-        if tok.type in (TOKENS['TT_PLUS'], TOKENS['TT_MINUS']):
-            res.register_advancement()
-            self.advance()
-            factor = res.register(self.factor())
-            if res.error: return res
-            return res.success(UnaryOpNode(tok, factor))
-
-        return self.power()
-
-    def term(self):
-        return self.bin_op(self.factor, (TOKENS['TT_MUL'], TOKENS['TT_DIV'], TOKENS['TT_MOD']))
-
     def expr(self):
         res = ParseResult()
-        if self.current_tok.matches(TOKENS['TT_KEYWORD'], 'VAR'):
+        if self.current_tok.matches(TT_KEYWORD, 'VAR'):
             res.register_advancement()
             self.advance()
 
-            if self.current_tok.type != TOKENS['TT_IDENTIFIER']:
+            if self.current_tok.type != TT_IDENTIFIER:
                 return res.failure(InvalidSyntaxError(
                     self.current_tok.pos_start, self.current_tok.pos_end,
                     "Expected identifier"
@@ -290,7 +297,7 @@ class Parser:
             res.register_advancement()
             self.advance()
 
-            if self.current_tok.type != TOKENS['TT_EQ']:
+            if self.current_tok.type != TT_EQ:
                 return res.failure(InvalidSyntaxError(
                     self.current_tok.pos_start, self.current_tok.pos_end,
                     "Expected '='"
@@ -300,39 +307,22 @@ class Parser:
             self.advance()
             expr = res.register(self.expr())
             if res.error: return res
-
-            # Check if variable already exists
-            if self.global_symbol_table.get(var_name.value) is not None:
-                return res.failure(InvalidSyntaxError(
-                var_name.pos_start, var_name.pos_end,
-                f"Variable '{var_name.value}' is already declared"
-                ))
-
-            return res.success(VarAssignNode(var_name, expr))
+            return res.success(VarAssignNode(var_name, expr, True))
         
-        elif self.current_tok.type == TOKENS['TT_IDENTIFIER']:
+        elif self.current_tok.type == TT_IDENTIFIER:
             var_name = self.current_tok
-            res.register_advancement()
-            self.advance()
-            
-
-            # Check if variable already exists
-            if self.global_symbol_table.get(var_name.value) is None:
-                return res.failure(InvalidSyntaxError(
-                var_name.pos_start, var_name.pos_end,
-                f"Variable '{var_name.value}' is not declared"
-                ))
 
-
-            if self.current_tok.type == TOKENS['TT_EQ']:
+            # An identifier followed by '=' is an assignment, anything else
+            # is parsed as an expression starting with that identifier
+            if self.peek().type == TT_EQ:
+                res.register_advancement()
+                self.advance()
                 res.register_advancement()
                 self.advance()
                 expr = res.register(self.expr())
                 if res.error: return res
                 return res.success(VarAssignNode(var_name, expr))
-            else:
-                self.reverse()
-        node = res.register(self.bin_op(self.comp_expr, ((TOKENS['TT_KEYWORD'], 'AND'), (TOKENS['TT_KEYWORD'], 'OR'))))
+        node = res.register(self.binary_expr(LOGIC_PRECEDENCE))
 
         if res.error: 
             return res.failure(InvalidSyntaxError(
@@ -344,9 +334,9 @@ class Parser:
     def list_expr(self):
         res = ParseResult()
         element_nodes = []
-        pos_start = self.current_tok.pos_start.copy()
+        pos_start = self.current_tok.pos_start
 
-        if self.current_tok.type != TOKENS['TT_LSQUARE']:
+        if self.current_tok.type != TT_LSQUARE:
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected '['"
@@ -355,7 +345,7 @@ class Parser:
         res.register_advancement()
         self.advance()
 
-        if self.current_tok.type == TOKENS['TT_RSQUARE']:
+        if self.current_tok.type == TT_RSQUARE:
             res.register_advancement()
             self.advance()
         else:
@@ -365,19 +355,19 @@ class Parser:
                     self.current_tok.pos_start, self.current_tok.pos_end,
                     "Expected ']', 'VAR', int, float, identifier, '+', '-', '(', '[', 'IF', 'FOR', 'WHILE', 'FUNCTION'"
                 ))
-            while self.current_tok.type == TOKENS['TT_COMMA']:
+            while self.current_tok.type == TT_COMMA:
                 res.register_advancement()
                 self.advance()
                 element_nodes.append(res.register(self.expr()))
                 if res.error: return res
-            if self.current_tok.type != TOKENS['TT_RSQUARE']:
+            if self.current_tok.type != TT_RSQUARE:
                 return res.failure(InvalidSyntaxError(
                     self.current_tok.pos_start, self.current_tok.pos_end,
                     f"Expected ',' or ']'"
                 ))
             res.register_advancement()
             self.advance()
-        return res.success(ListNode(element_nodes, pos_start, self.current_tok.pos_end.copy()))
+        return res.success(ListNode(element_nodes, pos_start, self.current_tok.pos_end))
     
     def if_expr(self):
         res = ParseResult()
@@ -393,11 +383,11 @@ class Parser:
         res = ParseResult()
         else_case = None
 
-        if self.current_tok.matches(TOKENS['TT_KEYWORD'], 'ELSE'):
+        if self.current_tok.matches(TT_KEYWORD, 'ELSE'):
             res.register_advancement()
             self.advance()
 
-            if self.current_tok.type == TOKENS['TT_NEWLINE']:
+            if self.current_tok.type == TT_NEWLINE:
                 res.register_advancement()
                 self.advance()
 
@@ -405,7 +395,7 @@ class Parser:
                 if res.error: return res
                 else_case = (statements, True)
 
-                if self.current_tok.matches(TOKENS['TT_KEYWORD'], 'END'):
+                if self.current_tok.matches(TT_KEYWORD, 'END'):
                     res.register_advancement()
                     self.advance()
                 else:
@@ -423,7 +413,7 @@ class Parser:
         res = ParseResult()
         cases, else_case = [], None
 
-        if self.current_tok.matches(TOKENS['TT_KEYWORD'], 'ELIF'):
+        if self.current_tok.matches(TT_KEYWORD, 'ELIF'):
             all_cases = res.register(self.elif_expr())
             if res.error: return res
             new_cases, else_case = all_cases
@@ -439,7 +429,7 @@ class Parser:
         cases = []
         else_case = None
 
-        if not self.current_tok.matches(TOKENS['TT_KEYWORD'], case_keyword):
+        if not self.current_tok.matches(TT_KEYWORD, case_keyword):
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected '{case_keyword}'"
@@ -451,7 +441,7 @@ class Parser:
         condition = res.register(self.expr())
         if res.error: return res
 
-        if not self.current_tok.matches(TOKENS['TT_KEYWORD'], 'THEN'):
+        if not self.current_tok.matches(TT_KEYWORD, 'THEN'):
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected 'THEN'"
@@ -460,7 +450,7 @@ class Parser:
         res.register_advancement()
         self.advance()
         
-        if self.current_tok.type == TOKENS['TT_NEWLINE']:
+        if self.current_tok.type == TT_NEWLINE:
             res.register_advancement()
             self.advance()
 
@@ -468,7 +458,7 @@ class Parser:
             if res.error: return res
             cases.append((condition, statements, True))
 
-            if self.current_tok.matches(TOKENS['TT_KEYWORD'], 'END'):
+            if self.current_tok.matches(TT_KEYWORD, 'END'):
                 res.register_advancement()
                 self.advance()
             else:
@@ -491,7 +481,7 @@ class Parser:
     def while_expr(self):
         res = ParseResult()
 
-        if not self.current_tok.matches(TOKENS['TT_KEYWORD'], 'WHILE'):
+        if not self.current_tok.matches(TT_KEYWORD, 'WHILE'):
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected 'WHILE'"
@@ -503,7 +493,7 @@ class Parser:
         condition = res.register(self.expr())
         if res.error: return res
 
-        if not self.current_tok.matches(TOKENS['TT_KEYWORD'], 'THEN'):
+        if not self.current_tok.matches(TT_KEYWORD, 'THEN'):
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected 'THEN'"
@@ -511,14 +501,14 @@ class Parser:
         res.register_advancement()
         self.advance()
 
-        if self.current_tok.type == TOKENS['TT_NEWLINE']:
+        if self.current_tok.type == TT_NEWLINE:
             res.register_advancement()
             self.advance()
 
             body = res.register(self.statements())
             if res.error: return res
 
-            if not self.current_tok.matches(TOKENS['TT_KEYWORD'], 'END'):
+            if not self.current_tok.matches(TT_KEYWORD, 'END'):
                 return res.failure(InvalidSyntaxError(
                     self.current_tok.pos_start, self.current_tok.pos_end,
                     f"Expected 'END'"
@@ -537,7 +527,7 @@ class Parser:
     def for_expr(self):
         res = ParseResult()
 
-        if not self.current_tok.matches(TOKENS['TT_KEYWORD'], 'FOR'):
+        if not self.current_tok.matches(TT_KEYWORD, 'FOR'):
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected 'FOR'"
@@ -546,7 +536,7 @@ class Parser:
         res.register_advancement()
         self.advance()
 
-        if self.current_tok.type != TOKENS['TT_IDENTIFIER']:
+        if self.current_tok.type != TT_IDENTIFIER:
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected identifier"
@@ -556,7 +546,7 @@ class Parser:
         res.register_advancement()
         self.advance()
 
-        if self.current_tok.type != TOKENS['TT_EQ']:
+        if self.current_tok.type != TT_EQ:
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected '='"
@@ -568,7 +558,7 @@ class Parser:
         start_value = res.register(self.expr())
         if res.error: return res
 
-        if not self.current_tok.matches(TOKENS['TT_KEYWORD'], 'TO'):
+        if not self.current_tok.matches(TT_KEYWORD, 'TO'):
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected 'TO'"
@@ -580,7 +570,7 @@ class Parser:
         end_value = res.register(self.expr())
         if res.error: return res
 
-        if self.current_tok.matches(TOKENS['TT_KEYWORD'], 'STEP'):
+        if self.current_tok.matches(TT_KEYWORD, 'STEP'):
             res.register_advancement()
             self.advance()
 
@@ -589,7 +579,7 @@ class Parser:
         else:
             step_value = None
 
-        if not self.current_tok.matches(TOKENS['TT_KEYWORD'], 'THEN'):
+        if not self.current_tok.matches(TT_KEYWORD, 'THEN'):
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected 'THEN'"
@@ -597,14 +587,14 @@ class Parser:
         res.register_advancement()
         self.advance()
 
-        if self.current_tok.type == TOKENS['TT_NEWLINE']:
+        if self.current_tok.type == TT_NEWLINE:
             res.register_advancement()
             self.advance()
 
             body = res.register(self.statements())
             if res.error: return res
 
-            if not self.current_tok.matches(TOKENS['TT_KEYWORD'], 'END'):
+            if not self.current_tok.matches(TT_KEYWORD, 'END'):
                 return res.failure(InvalidSyntaxError(
                     self.current_tok.pos_start, self.current_tok.pos_end,
                     f"Expected 'END'"
@@ -621,7 +611,7 @@ class Parser:
     
     def func_def(self):
         res = ParseResult()
-        if not self.current_tok.matches(TOKENS['TT_KEYWORD'], 'FUNCTION'):
+        if not self.current_tok.matches(TT_KEYWORD, 'FUNCTION'):
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected 'FUNCTION'"
@@ -629,19 +619,19 @@ class Parser:
         res.register_advancement()
         self.advance()
 
-        if self.current_tok.type == TOKENS['TT_IDENTIFIER']:
+        if self.current_tok.type == TT_IDENTIFIER:
             var_name_tok = self.current_tok
             res.register_advancement()
             self.advance()
 
-            if self.current_tok.type != TOKENS['TT_LPAREN']:
+            if self.current_tok.type != TT_LPAREN:
                 return res.failure(InvalidSyntaxError(
                     self.current_tok.pos_start, self.current_tok.pos_end,
                     "Expected '('"
                 ))
         else:
             var_name_tok = None
-            if self.current_tok.type != TOKENS['TT_LPAREN']:
+            if self.current_tok.type != TT_LPAREN:
                 return res.failure(InvalidSyntaxError(
                     self.current_tok.pos_start, self.current_tok.pos_end,
                     "Expected identifier or '('"
@@ -650,16 +640,16 @@ class Parser:
         self.advance()
 
         arg_name_toks = []
-        if self.current_tok.type == TOKENS['TT_IDENTIFIER']:
+        if self.current_tok.type == TT_IDENTIFIER:
             arg_name_toks.append(self.current_tok)
             res.register_advancement()
             self.advance()
 
-            while self.current_tok.type == TOKENS['TT_COMMA']:
+            while self.current_tok.type == TT_COMMA:
                 res.register_advancement()
                 self.advance()
 
-                if self.current_tok.type != TOKENS['TT_IDENTIFIER']:
+                if self.current_tok.type != TT_IDENTIFIER:
                     return res.failure(InvalidSyntaxError(
                         self.current_tok.pos_start, self.current_tok.pos_end,
                         "Expected identifier"
@@ -668,13 +658,13 @@ class Parser:
                 res.register_advancement()
                 self.advance()
 
-            if self.current_tok.type != TOKENS['TT_RPAREN']:
+            if self.current_tok.type != TT_RPAREN:
                 return res.failure(InvalidSyntaxError(
                     self.current_tok.pos_start, self.current_tok.pos_end,
                     "Expected ',' or ')'"
                 ))
         else:
-            if self.current_tok.type != TOKENS['TT_RPAREN']:
+            if self.current_tok.type != TT_RPAREN:
                 return res.failure(InvalidSyntaxError(
                     self.current_tok.pos_start, self.current_tok.pos_end,
                     "Expected identifier or ')'"
@@ -682,14 +672,14 @@ class Parser:
         res.register_advancement()
         self.advance()
 
-        if self.current_tok.type == TOKENS['TT_ARROW']:
+        if self.current_tok.type == TT_ARROW:
             res.register_advancement()
             self.advance()
             body = res.register(self.expr())
             if res.error: return res
             return res.success(FuncDefNode(var_name_tok, arg_name_toks, body, True))
 
-        if self.current_tok.type != TOKENS['TT_NEWLINE']:
+        if self.current_tok.type != TT_NEWLINE:
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 "Expected '=>' or NEWLINE"
@@ -700,8 +690,7 @@ class Parser:
         body = res.register(self.statements())
         if res.error: return res
 
-        if not self.current_tok.matches(TOKENS['TT_KEYWORD'], 'END'):
-            print("TOKEN: ", self.current_tok)
+        if not self.current_tok.matches(TT_KEYWORD, 'END'):
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 "Expected 'END'"
@@ -711,22 +700,47 @@ class Parser:
 
         return res.success(FuncDefNode(var_name_tok, arg_name_toks, body, False))
 
-    def arith_expr(self):
-        return self.bin_op(self.term, (TOKENS['TT_PLUS'], TOKENS['TT_MINUS']))
-
-    def comp_expr(self):
+    # Precedence climbing: parse an operand, then keep folding in operators
+    # that bind at least as tightly as min_precedence. The right operand of
+    # a left associative operator only takes operators that bind tighter
+    def binary_expr(self, min_precedence):
         res = ParseResult()
-        if self.current_tok.matches(TOKENS['TT_KEYWORD'], 'NOT'):
-            op_tok = self.current_tok
+        tok = self.current_tok
+        leaf = LEAF_NODES.get(tok.type)
+        if leaf is not None and self.peek().type != TT_LPAREN:
             res.register_advancement()
             self.advance()
-            node = res.register(self.comp_expr())
-            if res.error: return res
-            return res.success(UnaryOpNode(op_tok, node))
-        node = res.register(self.bin_op(self.arith_expr, (TOKENS['TT_EE'], TOKENS['TT_NE'], TOKENS['TT_LT'], TOKENS['TT_GT'], TOKENS['TT_LTE'], TOKENS['TT_GTE'])))
+            left = leaf(tok)
+        elif tok.type in (TT_PLUS, TT_MINUS) or (tok.matches(TT_KEYWORD, 'NOT') and min_precedence <= COMPARISON_PRECEDENCE):
+            left = res.register(self.unary_expr())
+        else:
+            left = res.register(self.call())
         if res.error:
+            if min_precedence > COMPARISON_PRECEDENCE: return res
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 "Expected int, float, identifier, '+', '-', '(', '[', 'NOT'"
             ))
-        return res.success(node)
\ No newline at end of file
+
+        while True:
+            op_tok = self.current_tok
+            operator = BINARY_OPERATORS.get(op_tok.value if op_tok.type == TT_KEYWORD else op_tok.type)
+            if operator is None or operator[0] < min_precedence: break
+            precedence, right_associative = operator
+            res.register_advancement()
+            self.advance()
+            right = res.register(self.binary_expr(precedence if right_associative else precedence + 1))
+            if res.error: return res
+            left = BinOpNode(left, op_tok, right)
+
+        return res.success(left)
+
+    def unary_expr(self):
+        res = ParseResult()
+        op_tok = self.current_tok
+        res.register_advancement()
+        self.advance()
+        precedence = COMPARISON_PRECEDENCE if op_tok.type == TT_KEYWORD else POW_PRECEDENCE
+        node = res.register(self.binary_expr(precedence))
+        if res.error: return res
+        return res.success(UnaryOpNode(op_tok, node))
@@ -0,0 +1,239 @@
+from modules.errors import InvalidSyntaxError
+###############################
+# RESOLVER
+# Semantic pass between the parser and the interpreter. Every variable is
+# resolved to the scope that declares it. Names declared inside a function
+# (parameters, VAR, FOR variables and named inner functions) get a slot in the
+# function's frame and are addressed as (depth, slot), depth being the number
+# of functions between the use and the declaration. Names declared at the top
+# level live in the global symbol table and are still looked up by name.
+#
+# Declarations are checked per scope: VAR fails when the name is already
+# declared in the same scope, and a name that no enclosing scope declares
+# cannot be used or assigned. Functions are lexically scoped, they see the
+# variables of the functions they are written in and not those of their
+# caller, and an assignment without VAR writes to the scope that declared
+# the name.
+#
+# The built-in constants cannot be assigned at the top level, so the optimizer
+# can fold them. A function can still declare a local of the same name.
+#
+# A FOR loop is counted when nothing in its body writes the loop variable, not
+# an assignment, an inner FOR or a named function, in the loop's own scope or
+# from a function written inside the loop. The engines run a counted loop
+# over native integers.
+#
+# Every node is also marked by whether its value is used. A loop, or a list
+# of statements, whose value is thrown away (a statement of a block whose
+# value is NULL, like the body of a multi-line loop or of a function without
+# auto return) gets should_return_null, so the engines run it without
+# collecting the values of its body.
+###############################
+
+CONSTANT_NAMES = frozenset(('NULL', 'TRUE', 'FALSE', 'MATH_PI'))
+
+class Scope:
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.slots = {}
+        # Slot 0 of a frame holds the frame of the enclosing function
+        self.names = []
+        # Whether a function is defined in this scope, keeping its frame
+        self.defines_functions = False
+
+    def declare(self, name):
+        slot = self.slots.get(name)
+        if slot is None:
+            self.names.append(name)
+            slot = len(self.names)
+            self.slots[name] = slot
+        return slot
+
+class Resolver:
+    def __init__(self, global_symbol_table):
+        self.global_symbol_table = global_symbol_table
+        # Top level names declared so far by the program being resolved
+        self.declared_globals = set()
+        # Names looked up in the global symbol table, mapped to whether they
+        # were declared there, so a cached AST can tell when it is stale
+        self.checked_names = {}
+        self.scope = None
+        # (ForNode, scope, slot or name) of the loops being resolved
+        self.loops = []
+        # Whether the value of the node being resolved is used
+        self.keep_value = True
+
+    # Resolve a whole program, returning the first declaration error
+    def resolve(self, node):
+        return self.visit(node)
+
+    def visit(self, node):
+        method = getattr(self, f'visit_{type(node).__name__}', self.no_visit_method)
+        return method(node)
+
+    def no_visit_method(self, node):
+        return None
+
+    # Resolve a node whose value is used, or not with keep_value False
+    def used(self, node, keep_value=True):
+        outer, self.keep_value = self.keep_value, keep_value
+        error = self.visit(node)
+        self.keep_value = outer
+        return error
+
+    def visit_list(self, nodes):
+        for node in nodes:
+            error = self.visit(node)
+            if error: return error
+        return None
+
+    def is_global(self, name):
+        if name in self.declared_globals: return True
+        declared = self.global_symbol_table.get(name) is not None
+        self.checked_names[name] = declared
+        return declared
+
+    # (depth, slot) of a visible name, (0, None) for a global, None when the
+    # name is not declared
+    def lookup(self, name):
+        depth = 0
+        scope = self.scope
+        while scope:
+            slot = scope.slots.get(name)
+            if slot is not None: return depth, slot
+            scope = scope.parent
+            depth += 1
+        if self.is_global(name): return 0, None
+        return None
+
+    def declare(self, name):
+        if self.scope: return self.scope.declare(name)
+        self.declared_globals.add(name)
+        return None
+
+    # A write to the variable of a loop being resolved makes it uncounted
+    def writes(self, name, depth, slot):
+        scope = self.scope
+        for _ in range(depth): scope = scope.parent
+        binding = (scope, slot) if slot is not None else (None, name)
+        for node, loop_scope, key in self.loops:
+            if (loop_scope, key) == binding: node.counted = False
+
+    # Error for a global write to a built-in constant
+    def assigns_constant(self, tok, slot):
+        if slot is not None or tok.value not in CONSTANT_NAMES: return None
+        return InvalidSyntaxError(
+            tok.pos_start, tok.pos_end,
+            f"Cannot assign to constant '{tok.value}'"
+        )
+
+    def not_declared(self, tok):
+        return InvalidSyntaxError(
+            tok.pos_start, tok.pos_end,
+            f"Variable '{tok.value}' is not declared"
+        )
+
+    def visit_NumberNode(self, node):
+        return None
+
+    def visit_StringNode(self, node):
+        return None
+
+    def visit_ListNode(self, node):
+        if not self.keep_value: node.should_return_null = True
+        return self.visit_list(node.element_nodes)
+
+    def visit_VarAccessNode(self, node):
+        address = self.lookup(node.var_name_tok.value)
+        if address is None: return self.not_declared(node.var_name_tok)
+        node.depth, node.slot = address
+        return None
+
+    def visit_VarAssignNode(self, node):
+        error = self.used(node.value_node)
+        if error: return error
+        tok = node.var_name_tok
+
+        if node.declare:
+            if (tok.value in self.scope.slots) if self.scope else self.is_global(tok.value):
+                return InvalidSyntaxError(
+                    tok.pos_start, tok.pos_end,
+                    f"Variable '{tok.value}' is already declared"
+                )
+            node.depth, node.slot = 0, self.declare(tok.value)
+            return None
+
+        address = self.lookup(tok.value)
+        if address is None: return self.not_declared(tok)
+        node.depth, node.slot = address
+        self.writes(tok.value, node.depth, node.slot)
+        return self.assigns_constant(tok, node.slot)
+
+    def visit_BinOpNode(self, node):
+        return self.used(node.left_node) or self.used(node.right_node)
+
+    def visit_UnaryOpNode(self, node):
+        return self.used(node.node)
+
+    def visit_IfNode(self, node):
+        for condition, expr, should_return_null in node.cases:
+            error = self.used(condition) or self.used(expr, self.keep_value and not should_return_null)
+            if error: return error
+        if node.else_case:
+            expr, should_return_null = node.else_case
+            return self.used(expr, self.keep_value and not should_return_null)
+        return None
+
+    # The loop variable belongs to the scope the loop is in
+    def visit_ForNode(self, node):
+        error = self.used(node.start_value_node) or self.used(node.end_value_node)
+        if error: return error
+        if node.step_value_node:
+            error = self.used(node.step_value_node)
+            if error: return error
+        if not self.keep_value: node.should_return_null = True
+        name = node.var_name_tok.value
+        node.slot = self.declare(name)
+        error = self.assigns_constant(node.var_name_tok, node.slot)
+        if error: return error
+        self.writes(name, 0, node.slot)
+        node.counted = True
+        self.loops.append((node, self.scope, node.slot if node.slot is not None else name))
+        error = self.used(node.body_node, not node.should_return_null)
+        self.loops.pop()
+        return error
+
+    def visit_WhileNode(self, node):
+        if not self.keep_value: node.should_return_null = True
+        return self.used(node.condition_node) or self.used(node.body_node, not node.should_return_null)
+
+    # A named function is declared before its body is resolved so it can
+    # call itself
+    def visit_FuncDefNode(self, node):
+        if node.var_name_tok:
+            node.slot = self.declare(node.var_name_tok.value)
+            error = self.assigns_constant(node.var_name_tok, node.slot)
+            if error: return error
+            self.writes(node.var_name_tok.value, 0, node.slot)
+
+        if self.scope: self.scope.defines_functions = True
+        scope = Scope(self.scope)
+        node.arg_slots = [scope.declare(arg_name_tok.value) for arg_name_tok in node.arg_name_toks]
+        self.scope = scope
+        error = self.used(node.body_node, node.should_auto_return)
+        self.scope = scope.parent
+        node.slot_names = scope.names
+        node.frame_escapes = scope.defines_functions
+        return error
+
+    def visit_CallNode(self, node):
+        error = self.used(node.node_to_call)
+        if error: return error
+        for arg_node in node.arg_nodes:
+            error = self.used(arg_node)
+            if error: return error
+        return None
+
+    def visit_ReturnNode(self, node):
+        if node.node_to_return: return self.used(node.node_to_return)
+        return None
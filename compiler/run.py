@@ -3,17 +3,34 @@
 ###############################
 from compiler.lexer import Lexer
 from compiler.parser import Parser
+from compiler.resolver import Resolver
+from compiler.optimizer import Optimizer
 from compiler.interpreter import Interpreter
+from compiler.vm import VM
+from compiler.closures import ClosureInterpreter
+from compiler.transpiler import PythonInterpreter
 from modules.context import Context
 from modules.function import BuiltInFunction
 from modules.symbol_table import SymbolTable
 from modules.value import Number
-from compiler.tokens import TOKENS
+from compiler.tokens import TokenStream
+from compiler.cache import ast_cache
+from modules.diagnostics import get_diagnostics, set_diagnostics
+from modules.position import SOURCES
 
 ###############################
 # RUN
 ###############################
 
+# Execution engines, by name: the tree walking interpreter, the bytecode VM,
+# the AST compiled to Python closures and the AST lowered to Python code
+ENGINES = {
+    'interpreter': Interpreter,
+    'vm': VM,
+    'closures': ClosureInterpreter,
+    'python': PythonInterpreter,
+}
+
 global_symbol_table = SymbolTable()
 global_symbol_table.set("NULL", Number.null)
 global_symbol_table.set("TRUE", Number.true)
@@ -33,40 +50,82 @@ global_symbol_table.set("POP", BuiltInFunction("pop"))
 global_symbol_table.set("EXTEND", BuiltInFunction("extend"))
 global_symbol_table.set("LEN", BuiltInFunction("len"))
 global_symbol_table.set("RUN", BuiltInFunction("run"))
+global_symbol_table.set("MEMOIZE", BuiltInFunction("memoize"))
+global_symbol_table.set("MEMO_STATS", BuiltInFunction("memo_stats"))
 
-def run(fn, text, context = None):
-    # Clean the symbol_table.txt file
-    open("symbol_table.txt", "w").close()
-    # Clean the token_table.txt file
-    open("token_table.txt", "w").close()
-    
+# Token and symbol tables go to the active diagnostics sink, which by default
+# drops them without touching the disk. Pass a sink (FileDiagnostics for the
+# old *_table.txt files, MemoryDiagnostics to get them back as data) to use it
+# for this run and any script it RUNs.
+# With streaming=True the parser pulls tokens from the lexer as it goes, so
+# only a small window of tokens is alive at once and an early syntax error is
+# reported before the rest of the file is lexed. The token table needs the
+# whole token list and is not emitted in that mode.
+# Parsed programs are reused from the AST cache unless cache=False or a
+# diagnostics sink wants the token table.
+# With optimize=False the resolved AST is interpreted as parsed, without
+# constant folding or dead branch elimination.
+# engine picks the engine from ENGINES that runs the program and any script it
+# RUNs.
+def run(fn, text, context = None, streaming = False, diagnostics = None, cache = True, optimize = True, engine = 'interpreter'):
+    if diagnostics is None:
+        return execute(fn, text, context, streaming, get_diagnostics(), cache, optimize, engine)
+    previous = set_diagnostics(diagnostics)
+    try:
+        return execute(fn, text, context, streaming, diagnostics, cache, optimize, engine)
+    finally:
+        set_diagnostics(previous)
+
+def execute(fn, text, context, streaming, sink, cache, optimize=True, engine='interpreter'):
+    sink.begin_run(fn)
+    # Keeps the source registered while it is parsed and run
+    source = SOURCES.add(fn, text)
+
+    node = None
+    cache = cache and not sink.enabled
+    if cache: node = ast_cache.get(fn, text, global_symbol_table, optimize)
+    if node is None:
+        node, checked_names, error = parse(fn, text, streaming, sink, optimize)
+        if error: return None, error, context
+        if cache: ast_cache.put(fn, text, node, checked_names, optimize)
+
+    # Generate Result (VCI and execution)
+    # Visits each node in the AST and executes the corresponding method in the interpreter,
+    # or runs the program compiled to bytecode on the VM
+    interpreter = ENGINES[engine]()
+    context = Context('program')
+    context.symbol_table = global_symbol_table
+    run_script = lambda fn, text: run(fn, text, optimize=optimize, engine=engine)
+    result = interpreter.visit(node, context, run_script)
+
+    return result.value, result.error, context
+
+# Returns the resolved (and optimized) AST with the global names the resolver
+# checked, or an error
+def parse(fn, text, streaming, sink, optimize=True):
     # Generate Tokens (Lexical Analysis)
     # Visits each character in the text and generates the corresponding token
     lexer = Lexer(fn, text)
-    tokens, error = lexer.make_tokens()
-    if error: return None, error, context
-    
-    # Print the token table
-    with open("token_table.txt", "w") as token_file:
-        token_file.write("////////////////////////////////////////////\n")
-        token_file.write("Tokens:\n")
-        for token in tokens:
-            line_number = token.pos_start.ln + 1 if token.pos_start else "?"
-            identifier_flag = -2 if token.type == TOKENS['TT_IDENTIFIER'] else -1
-            token_file.write(f"{token.value} ,  {token.type}, {identifier_flag}, {line_number}\n")
-        token_file.write("--------------------------------------------\n")
+    if streaming:
+        tokens = TokenStream(lexer.iter_tokens())
+    else:
+        tokens, error = lexer.make_tokens()
+        if error: return None, None, error
+        if sink.enabled: sink.token_table(tokens)
     
-    # Generate AST (Intermediate Representation) (Syntax Analysis) (Semantic Analysis)
+    # Generate AST (Intermediate Representation) (Syntax Analysis)
     # Visits each token and generates the corresponding node in the AST
-    parser = Parser(tokens, global_symbol_table)
+    parser = Parser(tokens)
     ast = parser.parse()
-    if ast.error: return None, ast.error, context
+    if streaming and lexer.error: return None, None, lexer.error
+    if ast.error: return None, None, ast.error
 
-    # Generate Result (VCI and execution)
-    # Visits each node in the AST and executes the corresponding method in the interpreter
-    interpreter = Interpreter()
-    context = Context('program')
-    context.symbol_table = global_symbol_table
-    result = interpreter.visit(ast.node, context, run)
+    # Resolve every variable to the scope that declares it (Semantic Analysis)
+    resolver = Resolver(global_symbol_table)
+    error = resolver.resolve(ast.node)
+    if error: return None, None, error
 
-    return result.value, result.error, context
\ No newline at end of file
+    # Fold constants and drop dead code (Optimization)
+    node = ast.node
+    if optimize: node = Optimizer(global_symbol_table).optimize(node)
+    return node, resolver.checked_names, None
\ No newline at end of file
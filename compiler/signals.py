@@ -0,0 +1,24 @@
+###############################
+# SIGNALS
+# Every engine evaluates a node to its value and leaves the normal path to
+# these exceptions: a runtime error is raised as a Failure, and RETURN, BREAK
+# and CONTINUE as the signal of the same name. A loop catches BREAK and
+# CONTINUE, a function call catches RETURN, and the value of a program is
+# reported as an RTResult once, where the engine is entered.
+###############################
+
+class Failure(Exception):
+    def __init__(self, error):
+        self.error = error
+
+class Return(Exception):
+    def __init__(self, value):
+        self.value = value
+
+# A new instance is raised every time, a shared one would keep growing its
+# traceback
+class Break(Exception):
+    pass
+
+class Continue(Exception):
+    pass
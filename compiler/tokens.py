@@ -1,37 +1,50 @@
+import sys
+from array import array
+from itertools import islice
 ###############################
 # TOKENS
 ###############################
 
-TOKENS = {
-    'TT_INT': 'INT',
-    'TT_FLOAT': 'FLOAT',
-    'TT_STRING': 'STRING',
-    'TT_PLUS': 'PLUS',
-    'TT_MINUS': 'MINUS',
-    'TT_MUL': 'MUL',
-    'TT_DIV': 'DIV',
-    'TT_MOD': 'MOD',
-    'TT_LPAREN': 'LPAREN',
-    'TT_RPAREN': 'RPAREN',
-    'TT_LSQUARE': 'LSQUARE',
-    'TT_RSQUARE': 'RSQUARE',
-    'TT_POW': 'POW',
-    'TT_IDENTIFIER': 'IDENTIFIER',
-    'TT_KEYWORD': 'KEYWORD',
-    'TT_EQ': 'EQ',
-    'TT_EE': 'EE',
-    'TT_NE': 'NE',
-    'TT_LT': 'LT',
-    'TT_GT': 'GT',
-    'TT_LTE': 'LTE',
-    'TT_GTE': 'GTE',
-    'TT_COMMA': 'COMMA',
-    'TT_ARROW': 'ARROW',
-    'TT_NEWLINE': 'NEWLINE',
-    'TT_EOF': 'EOF',
-}
-
-KEYWORDS = [
+# Token kinds are small integers so the parser and interpreter compare them
+# with a single integer comparison; TOKEN_NAMES maps them back for display
+TT_INT = 0
+TT_FLOAT = 1
+TT_STRING = 2
+TT_PLUS = 3
+TT_MINUS = 4
+TT_MUL = 5
+TT_DIV = 6
+TT_MOD = 7
+TT_LPAREN = 8
+TT_RPAREN = 9
+TT_LSQUARE = 10
+TT_RSQUARE = 11
+TT_POW = 12
+TT_IDENTIFIER = 13
+TT_KEYWORD = 14
+TT_EQ = 15
+TT_EE = 16
+TT_NE = 17
+TT_LT = 18
+TT_GT = 19
+TT_LTE = 20
+TT_GTE = 21
+TT_COMMA = 22
+TT_ARROW = 23
+TT_NEWLINE = 24
+TT_EOF = 25
+
+TOKEN_NAMES = [
+    'INT', 'FLOAT', 'STRING', 'PLUS', 'MINUS', 'MUL', 'DIV', 'MOD',
+    'LPAREN', 'RPAREN', 'LSQUARE', 'RSQUARE', 'POW', 'IDENTIFIER', 'KEYWORD',
+    'EQ', 'EE', 'NE', 'LT', 'GT', 'LTE', 'GTE', 'COMMA', 'ARROW', 'NEWLINE', 'EOF',
+]
+
+TOKENS = {'TT_' + name: kind for kind, name in enumerate(TOKEN_NAMES)}
+
+# Keywords map to their interned spelling, so every keyword token shares one
+# string object and matches() succeeds on the identity check
+KEYWORDS = {keyword: sys.intern(keyword) for keyword in [
     'VAR',
     'AND',
     'OR',
@@ -49,25 +62,105 @@ KEYWORDS = [
     'RETURN',
     'CONTINUE',
     'BREAK',
-]
+]}
 
 # Token class to keep track of the tokens in the input text
 class Token:
+    __slots__ = ('type', 'value', 'pos_start', 'pos_end')
+
     def __init__(self, type_, value=None, pos_start=None, pos_end=None):
         self.type = type_
         self.value = value
 
-        if pos_start:
-            self.pos_start = pos_start.copy()
-            self.pos_end = pos_start.copy()
-            self.pos_end.advance()
-        if pos_end:
-            self.pos_end = pos_end
+        # Positions are offsets in the source map (see modules/position.py);
+        # a token given only its start covers a single character
+        self.pos_start = pos_start
+        if pos_end is None and pos_start is not None:
+            pos_end = pos_start + 1
+        self.pos_end = pos_end
 
     def matches(self, type_, value):
         return self.type == type_ and self.value == value
 
     # String representation of the token
     def __repr__(self):
-        if self.value: return f'{self.type}:{self.value}'
-        return f'{self.type}'
\ No newline at end of file
+        if self.value: return f'{TOKEN_NAMES[self.type]}:{self.value}'
+        return f'{TOKEN_NAMES[self.type]}'
+
+###############################
+# TOKEN BUFFER
+# Array-backed token stream: kinds, values and offsets are kept in parallel
+# arrays and a Token is only built when the parser reads an index
+###############################
+
+class TokenBuffer:
+    def __init__(self):
+        self.kinds = array('B')
+        self.values = []
+        self.starts = array('q')
+        self.ends = array('q')
+
+    def append(self, type_, value, pos_start, pos_end):
+        self.kinds.append(type_)
+        self.values.append(value)
+        self.starts.append(pos_start)
+        self.ends.append(pos_end)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, idx):
+        return Token(self.kinds[idx], self.values[idx], self.starts[idx], self.ends[idx])
+
+    def clear(self):
+        del self.kinds[:]
+        del self.values[:]
+        del self.starts[:]
+        del self.ends[:]
+
+    def to_tokens(self):
+        return list(map(Token, self.kinds, self.values, self.starts, self.ends))
+
+###############################
+# TOKEN STREAM
+# Indexable window over a token iterator such as Lexer.iter_tokens(). Tokens
+# are pulled as the parser reaches them and dropped once it has moved past
+# them. The parser never goes back, so only one token behind the one it asks
+# for is kept
+###############################
+
+# Tokens pulled from the iterator at a time
+STREAM_BATCH = 64
+
+class TokenStream:
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+        self.window = []
+        self.window_start = 0
+        self.finished = False
+        self.peak_window = 0
+
+    def __getitem__(self, idx):
+        pos = idx - self.window_start
+        if pos < len(self.window):
+            if pos < 0: raise IndexError(f'token {idx} was already released')
+            return self.window[pos]
+        if self.finished: raise IndexError(idx)
+
+        self.release(idx)
+        while idx - self.window_start >= len(self.window):
+            pulled = len(self.window)
+            self.window.extend(islice(self.tokens, STREAM_BATCH))
+            if len(self.window) == pulled:
+                self.finished = True
+                raise IndexError(idx)
+        self.peak_window = max(self.peak_window, len(self.window))
+        return self.window[idx - self.window_start]
+
+    # Drop tokens before the previous token, in batches so the window list is
+    # not shifted on every token
+    def release(self, idx):
+        keep = idx - 1
+        if keep - self.window_start >= STREAM_BATCH:
+            del self.window[:keep - self.window_start]
+            self.window_start = keep
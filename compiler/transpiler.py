@@ -0,0 +1,474 @@
+import ast
+import weakref
+from compiler.tokens import TT_KEYWORD, TT_MINUS
+from compiler.optimizer import BINARY_METHODS
+from compiler.interpreter import Interpreter, counted_range, result_of
+from compiler.signals import Break, Continue, Failure, Return
+from modules.list import List
+from modules.errors import RTError
+from modules.function import Function
+from modules.position import SOURCES
+from modules.symbol_table import GlobalCache
+from modules.value import Number, new_number, operation_error
+
+###############################
+# TRANSPILER
+# Lowers the body of a function, or a whole program, to a Python ast module
+# holding one function and compiles it with compile(). CoffeeScript values
+# stay Number, String, List and Function objects and every operation keeps
+# its Value method, so coercions and list operators behave the same, but
+# arithmetic on two Numbers is inlined and loops become Python loops, BREAK
+# and CONTINUE becoming break and continue. Expressions are flattened into
+# statements on temporaries, so evaluation order is the source order.
+#
+# Runtime errors are built with the positions of the nodes like in the
+# interpreter, and the generated code carries the line numbers of the
+# CoffeeScript source, so a Python traceback points at the script too.
+# A body that cannot be lowered or compiled (an unknown node, or nesting
+# deeper than Python allows) runs on the interpreter instead, which still
+# hands the functions it calls back to this engine.
+###############################
+
+class Unsupported(Exception):
+    pass
+
+# Python operator for each Value method on two Numbers. Comparisons and
+# logic give 0 or 1, division and modulo by zero go to the method for the
+# error
+NUMBER_OPERATORS = {
+    'added_to': ast.Add,
+    'subbed_by': ast.Sub,
+    'multed_by': ast.Mult,
+    'dived_by': ast.Div,
+    'modded_by': ast.Mod,
+    'powed_by': ast.Pow,
+}
+NUMBER_COMPARISONS = {
+    'get_comparison_eq': ast.Eq,
+    'get_comparison_ne': ast.NotEq,
+    'get_comparison_lt': ast.Lt,
+    'get_comparison_gt': ast.Gt,
+    'get_comparison_lte': ast.LtE,
+    'get_comparison_gte': ast.GtE,
+}
+NUMBER_LOGIC = {
+    'anded_by': ast.And,
+    'ored_by': ast.Or,
+}
+
+###############################
+# RUNTIME HELPERS
+# Globals of the generated code for everything that is not inlined
+###############################
+
+def load(value, name, pos_start, pos_end, context):
+    if value is None:
+        raise Failure(RTError(pos_start, pos_end, f"'{name}' is not defined", context))
+    return value
+
+def binary(left, right, method_name, pos_start, pos_end, right_start, context):
+    result, error = getattr(left, method_name)(right)
+    if error: raise Failure(operation_error(error, pos_start, right_start, pos_end, context))
+    return result
+
+def negate(value, operand_start, pos_end, context):
+    result, error = value.multed_by(new_number(-1))
+    if error: raise Failure(operation_error(error, operand_start, operand_start, pos_end, context))
+    return result
+
+def not_(value, operand_start, pos_end, context):
+    result, error = value.notted()
+    if error: raise Failure(operation_error(error, operand_start, operand_start, pos_end, context))
+    return result
+
+# definition holds the fields of the FuncDefNode, the generated code does not
+# keep the node: it can be the body the code is cached for
+def make_function(definition, context):
+    func_name, body_node, arg_names, should_auto_return, arg_slots, slot_names, frame_escapes, source = definition
+    return Function(
+        func_name, body_node, arg_names, should_auto_return, arg_slots, slot_names, context.frame, frame_escapes, source
+    )
+
+# A BREAK or CONTINUE the callee did not handle goes on to the loop around the
+# call, as it does in the interpreter
+def call(value_to_call, args, context, run, pos_start, pos_end):
+    return value_to_call.execute(args, interpreter, context, pos_start, pos_end, run)
+
+# Integers a FOR loop counts through: a range for a counted loop, otherwise
+# the values of the generic loop
+def loop_range(counted, start_value, end_value, step):
+    if counted_range(counted, start_value.value, end_value.value, step):
+        return range(start_value.value, end_value.value, step)
+    return generic_range(start_value.value, end_value, step)
+
+def generic_range(i, end_value, step):
+    ascending = step >= 0
+    while (i < end_value.value) if ascending else (i > end_value.value):
+        yield i
+        i += step
+
+RUNTIME = {
+    'Number': Number,
+    'NULL': Number.null,
+    'Break': Break,
+    'Continue': Continue,
+    'new_number': new_number,
+    'load': load,
+    'List': List,
+    'binary': binary,
+    'negate': negate,
+    'not_': not_,
+    'make_function': make_function,
+    'call': call,
+    'loop_range': loop_range,
+}
+
+###############################
+# ENGINE
+###############################
+
+# Generated function of each lowered body and program, None for those that
+# run on the interpreter
+transpiled = weakref.WeakKeyDictionary()
+
+# Python function for a node, lowered the first time it runs. keep_value is
+# False for bodies whose value is thrown away, like those of block functions
+def function_for(node, keep_value=True):
+    entry = transpiled.get(node)
+    # A rebased AST is lowered again, its positions are in the code
+    if entry is None or entry[0] != node.pos_start:
+        try:
+            function = Transpiler().transpile(node, keep_value)
+        except (Unsupported, SyntaxError, RecursionError, MemoryError):
+            function = None
+        entry = (node.pos_start, function)
+        transpiled[node] = entry
+    return entry[1]
+
+class PythonInterpreter:
+    def __init__(self):
+        self.fallback = Interpreter(self)
+
+    def visit(self, node, context, run=None):
+        return result_of(self.evaluate, node, context, run)
+
+    # The generated function returns (True, value) for a RETURN and
+    # (False, value) when it runs to the end
+    def evaluate(self, node, context, run=None):
+        function = function_for(node)
+        if function is None: return self.fallback.evaluate(node, context, run)
+        returned, value = function(context, run)
+        if returned: raise Return(value)
+        return value
+
+# Passed to every call made from generated code
+interpreter = PythonInterpreter()
+
+###############################
+# LOWERING
+###############################
+
+def name(id):
+    return ast.Name(id, ast.Load())
+
+def attribute(value, attr):
+    return ast.Attribute(value, attr, ast.Load())
+
+def call_expr(function, *args):
+    return ast.Call(function, list(args), [])
+
+def is_number(expr):
+    return ast.Compare(call_expr(name('type'), expr), [ast.Is()], [name('Number')])
+
+class Transpiler:
+    def __init__(self):
+        self.block = []
+        self.temps = 0
+        self.constants = []
+        self.line = 1
+        self.loops = 0
+
+    def transpile(self, node, keep_value=True):
+        source = SOURCES.file_at(node.pos_start)
+        value = self.lower(node, keep_value)
+        self.emit(ast.Return(ast.Tuple([ast.Constant(False), value or ast.Constant(None)], ast.Load())))
+        body = [
+            ast.Assign([ast.Name('frame', ast.Store())], attribute(name('context'), 'frame')),
+            ast.Assign([ast.Name('symbol_table', ast.Store())], attribute(name('context'), 'symbol_table')),
+        ] + self.block
+        for statement in body[:2]:
+            statement.lineno = self.line_of(node.pos_start)
+        arguments = ast.arguments([], [ast.arg('context'), ast.arg('run')], None, [], [], None, [])
+        function = ast.FunctionDef('body', arguments, body, [], None)
+        function.lineno = body[0].lineno
+        module = ast.fix_missing_locations(ast.Module([function], []))
+        # Statements keep the line of their node, which can be past the
+        # end line they got from the function
+        for child in ast.walk(module):
+            if getattr(child, 'end_lineno', None) is not None and child.end_lineno < child.lineno:
+                child.end_lineno = child.lineno
+
+        namespace = dict(RUNTIME, K=self.constants)
+        exec(compile(module, source.fn, 'exec'), namespace)
+        return namespace['body']
+
+    def line_of(self, pos):
+        return SOURCES.resolve(pos).ln + 1
+
+    def emit(self, statement):
+        statement.lineno = self.line
+        self.block.append(statement)
+
+    def temp(self):
+        self.temps += 1
+        return f'_t{self.temps}'
+
+    # Assign an expression to a new temporary and return its name
+    def bind(self, expr):
+        temp = self.temp()
+        self.emit(ast.Assign([ast.Name(temp, ast.Store())], expr))
+        return name(temp)
+
+    def constant(self, value):
+        self.constants.append(value)
+        return ast.Subscript(name('K'), ast.Constant(len(self.constants) - 1), ast.Load())
+
+    def positions(self, node):
+        return ast.Constant(node.pos_start), ast.Constant(node.pos_end)
+
+    # Statements for the node go to the current block. Returns an expression
+    # that reads its value without side effects, or None when keep_value is
+    # False
+    def lower(self, node, keep_value=True):
+        method = getattr(self, f'lower_{type(node).__name__}', None)
+        if method is None: raise Unsupported(type(node).__name__)
+        line = self.line
+        self.line = self.line_of(node.pos_start)
+        value = method(node, keep_value)
+        self.line = line
+        return value
+
+    # Lower nodes into a nested block and return its statements
+    def nested(self, lower):
+        block = self.block
+        self.block = []
+        lower()
+        nested, self.block = self.block or [ast.Pass()], block
+        for statement in nested:
+            if not hasattr(statement, 'lineno'): statement.lineno = self.line
+        return nested
+
+    # A literal is its pooled value, read from the constants
+    def lower_NumberNode(self, node, keep_value):
+        if not keep_value: return None
+        return self.bind(self.constant(node.value))
+
+    def lower_StringNode(self, node, keep_value):
+        return self.lower_NumberNode(node, keep_value)
+
+    def lower_ListNode(self, node, keep_value):
+        elements = [self.lower(element_node, keep_value) for element_node in node.element_nodes]
+        if not keep_value: return None
+        return self.bind(call_expr(name('List'), ast.List(elements, ast.Load())))
+
+    def frame_at(self, depth):
+        frame = name('frame')
+        for _ in range(depth):
+            frame = ast.Subscript(frame, ast.Constant(0), ast.Load())
+        return frame
+
+    # A local is read inline, an undefined one goes through load for the
+    # error
+    def lower_VarAccessNode(self, node, keep_value):
+        var_name = ast.Constant(node.var_name_tok.value)
+        if node.slot is None:
+            # Through the GlobalCache of the read while the table's version
+            # matches
+            cache = self.constant(GlobalCache(node.var_name_tok.value))
+            value = ast.IfExp(
+                ast.Compare(attribute(cache, 'version'), [ast.Eq()], [attribute(name('symbol_table'), 'version')]),
+                attribute(attribute(cache, 'cell'), 'value'),
+                call_expr(attribute(cache, 'miss'), name('symbol_table'))
+            )
+            return self.bind(call_expr(name('load'), value, var_name, *self.positions(node), name('context')))
+        value = self.bind(ast.Subscript(self.frame_at(node.depth), ast.Constant(node.slot), ast.Load()))
+        undefined = ast.If(
+            ast.Compare(value, [ast.Is()], [ast.Constant(None)]),
+            [ast.Expr(call_expr(name('load'), value, var_name, *self.positions(node), name('context')))],
+            []
+        )
+        undefined.body[0].lineno = self.line
+        self.emit(undefined)
+        return value
+
+    def store(self, value, var_name, depth, slot):
+        if slot is None:
+            self.emit(ast.Expr(call_expr(attribute(name('symbol_table'), 'set'), ast.Constant(var_name), value)))
+        else:
+            target = ast.Subscript(self.frame_at(depth), ast.Constant(slot), ast.Store())
+            self.emit(ast.Assign([target], value))
+
+    def lower_VarAssignNode(self, node, keep_value):
+        value = self.lower(node.value_node)
+        self.store(value, node.var_name_tok.value, node.depth, node.slot)
+        return value
+
+    def lower_BinOpNode(self, node, keep_value):
+        left = self.lower(node.left_node)
+        right = self.lower(node.right_node)
+        op_tok = node.op_tok
+        method_name = BINARY_METHODS[op_tok.value if op_tok.type == TT_KEYWORD else op_tok.type]
+        left_value, right_value = attribute(left, 'value'), attribute(right, 'value')
+
+        test = ast.BoolOp(ast.And(), [is_number(left), is_number(right)])
+        if method_name in NUMBER_OPERATORS:
+            fast = ast.BinOp(left_value, NUMBER_OPERATORS[method_name](), right_value)
+            if method_name in ('dived_by', 'modded_by'):
+                test.values.append(ast.Compare(right_value, [ast.NotEq()], [ast.Constant(0)]))
+        elif method_name in NUMBER_COMPARISONS:
+            fast = call_expr(name('int'), ast.Compare(left_value, [NUMBER_COMPARISONS[method_name]()], [right_value]))
+        else:
+            fast = call_expr(name('int'), ast.BoolOp(NUMBER_LOGIC[method_name](), [left_value, right_value]))
+        return self.bind(ast.IfExp(
+            test,
+            call_expr(name('new_number'), fast),
+            call_expr(
+                name('binary'), left, right, ast.Constant(method_name), *self.positions(node),
+                ast.Constant(node.right_node.pos_start), name('context')
+            )
+        ))
+
+    def lower_UnaryOpNode(self, node, keep_value):
+        value = self.lower(node.node)
+        positions = ast.Constant(node.node.pos_start), ast.Constant(node.pos_end)
+        if node.op_tok.type == TT_MINUS:
+            return self.bind(call_expr(name('negate'), value, *positions, name('context')))
+        if node.op_tok.matches(TT_KEYWORD, 'NOT'):
+            return self.bind(call_expr(name('not_'), value, *positions, name('context')))
+        return value
+
+    # Nested if/else, each condition evaluated in the else of the one before.
+    # Every branch assigns the result temporary when the value is used
+    def lower_IfNode(self, node, keep_value):
+        result = self.temp()
+
+        def branch(expr, should_return_null):
+            value = self.lower(expr, keep_value and not should_return_null)
+            if keep_value:
+                self.emit(ast.Assign([ast.Name(result, ast.Store())], name('NULL') if should_return_null else value))
+
+        def cases(index):
+            if index == len(node.cases):
+                if node.else_case:
+                    branch(*node.else_case)
+                elif keep_value:
+                    self.emit(ast.Assign([ast.Name(result, ast.Store())], name('NULL')))
+                return
+            condition, expr, should_return_null = node.cases[index]
+            condition_value = self.lower(condition)
+            self.emit(ast.If(
+                call_expr(attribute(condition_value, 'is_true')),
+                self.nested(lambda: branch(expr, should_return_null)),
+                self.nested(lambda: cases(index + 1))
+            ))
+
+        cases(0)
+        return name(result) if keep_value else None
+
+    # Body of a loop, collecting its value. A BREAK or CONTINUE in the body is
+    # a Python break or continue, one raised by a call in the body or by the
+    # condition of a WHILE in it is caught for this loop
+    def loop_body(self, node, collect, elements):
+        def body():
+            value = self.lower(node.body_node, collect)
+            if collect:
+                self.emit(ast.Expr(call_expr(attribute(name(elements), 'append'), value)))
+        self.loops += 1
+        statements = self.nested(body)
+        self.loops -= 1
+        handlers = [
+            ast.ExceptHandler(name('Break'), None, [ast.Break()]),
+            ast.ExceptHandler(name('Continue'), None, [ast.Continue()]),
+        ]
+        for handler in handlers:
+            handler.lineno = self.line
+            handler.body[0].lineno = self.line
+        return [ast.Try(statements, handlers, [], [])]
+
+    def loop_result(self, node, collect, keep_value, elements):
+        if collect:
+            return self.bind(call_expr(name('List'), name(elements)))
+        return name('NULL') if keep_value else None
+
+    def lower_ForNode(self, node, keep_value):
+        collect = keep_value and not node.should_return_null
+        elements = self.temp()
+        if collect: self.emit(ast.Assign([ast.Name(elements, ast.Store())], ast.List([], ast.Load())))
+        start_value = self.lower(node.start_value_node)
+        end_value = self.lower(node.end_value_node)
+        if node.step_value_node:
+            step = self.bind(attribute(self.lower(node.step_value_node), 'value'))
+        else:
+            step = self.bind(ast.Constant(1))
+        i = self.temp()
+        counter = call_expr(name('loop_range'), ast.Constant(node.counted), start_value, end_value, step)
+
+        def head():
+            self.store(call_expr(name('new_number'), name(i)), node.var_name_tok.value, 0, node.slot)
+        body = self.nested(head) + self.loop_body(node, collect, elements)
+        self.emit(ast.For(ast.Name(i, ast.Store()), counter, body, []))
+        return self.loop_result(node, collect, keep_value, elements)
+
+    def lower_WhileNode(self, node, keep_value):
+        collect = keep_value and not node.should_return_null
+        elements = self.temp()
+        if collect: self.emit(ast.Assign([ast.Name(elements, ast.Store())], ast.List([], ast.Load())))
+
+        # The condition runs inside the Python loop but is not part of the
+        # body, a BREAK or CONTINUE in it belongs to the loops around
+        def head():
+            condition = self.lower(node.condition_node)
+            exit_ = ast.If(ast.UnaryOp(ast.Not(), call_expr(attribute(condition, 'is_true'))), [ast.Break()], [])
+            exit_.body[0].lineno = self.line
+            self.emit(exit_)
+        loops, self.loops = self.loops, 0
+        head_statements = self.nested(head)
+        self.loops = loops
+        body = head_statements + self.loop_body(node, collect, elements)
+        self.emit(ast.While(ast.Constant(True), body, []))
+        return self.loop_result(node, collect, keep_value, elements)
+
+    # The body is lowered now, knowing whether its value is used
+    def lower_FuncDefNode(self, node, keep_value):
+        function_for(node.body_node, node.should_auto_return)
+        func_name = node.var_name_tok.value if node.var_name_tok else None
+        arg_names = [arg_name.value for arg_name in node.arg_name_toks]
+        definition = (
+            func_name, node.body_node, arg_names, node.should_auto_return, node.arg_slots, node.slot_names, node.frame_escapes, node.source
+        )
+        value = self.bind(call_expr(name('make_function'), self.constant(definition), name('context')))
+        if node.var_name_tok:
+            self.store(value, node.var_name_tok.value, 0, node.slot)
+        return value
+
+    def lower_CallNode(self, node, keep_value):
+        value_to_call = self.lower(node.node_to_call)
+        args = [self.lower(arg_node) for arg_node in node.arg_nodes]
+        return self.bind(call_expr(
+            name('call'), value_to_call, ast.List(args, ast.Load()), name('context'), name('run'), *self.positions(node)
+        ))
+
+    # RETURN, BREAK and CONTINUE never fall through, the NULL they give keeps
+    # the code after them well formed
+    def lower_ReturnNode(self, node, keep_value):
+        value = self.lower(node.node_to_return) if node.node_to_return else name('NULL')
+        self.emit(ast.Return(ast.Tuple([ast.Constant(True), value], ast.Load())))
+        return name('NULL')
+
+    def lower_ContinueNode(self, node, keep_value):
+        self.emit(ast.Continue() if self.loops else ast.Raise(call_expr(name('Continue')), None))
+        return name('NULL')
+
+    def lower_BreakNode(self, node, keep_value):
+        self.emit(ast.Break() if self.loops else ast.Raise(call_expr(name('Break')), None))
+        return name('NULL')
@@ -0,0 +1,269 @@
+from compiler.bytecode import code_for, BINARY, BREAK, BUILD_LIST, CALL, CONTINUE, END, FOR_INIT, FOR_NEXT, JUMP, JUMP_IF_FALSE, LIST_APPEND, LOAD_GLOBAL, LOAD_LOCAL, LOAD_SLOT, LOOP_LIST, MAKE_FUNCTION, NEGATE, NEW_LIST, NOT, NULL, CONSTANT, POP, RETURN, SIGNAL_BREAK, SIGNAL_CONTINUE, STORE_GLOBAL, STORE_LOCAL, STORE_SLOT
+from compiler.interpreter import counted_range, result_of
+from compiler.signals import Break, Continue, Failure, Return
+from modules.list import List
+from modules.errors import RTError
+from modules.function import Function
+from modules import diagnostics
+from modules.value import Number, new_number, operation_error
+
+###############################
+# VIRTUAL MACHINE
+# Runs compiled code in a single dispatch loop over a value stack. It works
+# on the same values as the tree walking interpreter and stands in for it:
+# Function.execute calls back into visit for the body of a user function,
+# which runs that body's code with the new context. Errors, RETURN and a
+# BREAK or CONTINUE outside any loop of the code are raised as signals, like
+# they are from the interpreter.
+#
+# Numbers are built with new_number, and an operation on two Numbers is
+# computed inline, leaving the Value methods for the other types and for the
+# errors. Values are shared: loading a variable pushes its value and a call
+# pushes the value the function returned, neither is copied.
+#
+# A call to a user function does not go through Function.execute: the VM
+# saves the state of the running code on its own list of callers and runs the
+# body of the function in the same loop, so the depth of the recursion of a
+# script is not bounded by the Python stack. RETURN f(...) outside a loop is a
+# tail call, the callee takes the place of the function returning and the
+# error traceback goes from it straight to that function's caller.
+###############################
+
+class VM:
+    def visit(self, node, context, run=None):
+        return result_of(self.evaluate, node, context, run)
+
+    def evaluate(self, node, context, run=None):
+        return self.execute(code_for(node), context, run)
+
+    def execute(self, code, context, run):
+        instructions = code.instructions
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        frame = context.frame
+        symbol_table = context.symbol_table
+        pc = 0
+        # The user function whose body is running, None for the code the VM
+        # was entered with, and the codes that called the running one
+        function = None
+        callers = []
+
+        while True:
+            try:
+                # Most frequent opcodes first
+                while True:
+                    op = instructions[pc]
+                    arg = instructions[pc + 1]
+                    pc += 2
+
+                    if op == LOAD_SLOT:
+                        value = frame[arg[0]]
+                        if value is None:
+                            raise Failure(RTError(arg[2], arg[3], f"'{arg[1]}' is not defined", context))
+                        push(value)
+
+                    elif op == CONSTANT:
+                        push(arg)
+
+                    elif op == BINARY:
+                        right = pop()
+                        left = stack[-1]
+                        if type(left) is Number and type(right) is Number:
+                            value = arg[1](left.value, right.value)
+                            if value is not None:
+                                stack[-1] = new_number(value)
+                                continue
+                        result, error = getattr(left, arg[0])(right)
+                        if error: raise Failure(operation_error(error, arg[2], arg[4], arg[3], context))
+                        stack[-1] = result
+
+                    elif op == JUMP_IF_FALSE:
+                        if not pop().is_true(): pc = arg
+
+                    elif op == JUMP:
+                        pc = arg
+
+                    elif op == STORE_SLOT:
+                        frame[arg] = stack[-1]
+
+                    elif op == POP:
+                        pop()
+
+                    elif op == LOAD_LOCAL:
+                        depth, slot, name, pos_start, pos_end = arg
+                        scope = frame
+                        for _ in range(depth): scope = scope[0]
+                        value = scope[slot]
+                        if value is None:
+                            raise Failure(RTError(pos_start, pos_end, f"'{name}' is not defined", context))
+                        push(value)
+
+                    elif op == STORE_LOCAL:
+                        scope = frame
+                        for _ in range(arg[0]): scope = scope[0]
+                        scope[arg[1]] = stack[-1]
+
+                    elif op == LOAD_GLOBAL:
+                        value = arg.cell.value if arg.version == symbol_table.version else arg.miss(symbol_table)
+                        if value is None:
+                            raise Failure(RTError(arg.pos_start, arg.pos_end, f"'{arg.name}' is not defined", context))
+                        push(value)
+
+                    elif op == STORE_GLOBAL:
+                        symbol_table.set(arg, stack[-1])
+
+                    elif op == FOR_NEXT:
+                        # The state of a counted loop is an iterator over its range,
+                        # that of the others is [i, end value, step, ascending]
+                        state = stack[-1]
+                        if type(state) is list:
+                            i = state[0]
+                            if (i < state[1].value) if state[3] else (i > state[1].value):
+                                state[0] = i + state[2]
+                            else:
+                                i = None
+                        else:
+                            i = next(state, None)
+                        if i is None:
+                            pc = arg[0]
+                        elif arg[1] is None:
+                            symbol_table.set(arg[2], new_number(i))
+                        else:
+                            frame[arg[1]] = new_number(i)
+
+                    elif op == CALL:
+                        count, pos_start, pos_end, loop, tail = arg
+                        args = stack[len(stack) - count:]
+                        del stack[len(stack) - count:]
+                        value_to_call = pop()
+                        if type(value_to_call) is Function:
+                            execution_context = value_to_call.generate_new_context(context, pos_start, pos_end)
+                            value_to_call.check_and_populate_args(value_to_call.arg_names, args, execution_context)
+                            # A tail call from a user function returns to that
+                            # function's caller, the tracer wants every call to end
+                            if tail and function is not None and not diagnostics.tracer:
+                                execution_context.parent = context.parent
+                                execution_context.parent_entry_pos = context.parent_entry_pos
+                                execution_context.parent_entry_end = context.parent_entry_end
+                                if function.pool: function.release_frame(context)
+                            else:
+                                callers.append((instructions, pc, stack, context, function, loop))
+                            function = value_to_call
+                            instructions = code_for(function.body_node, function.should_auto_return).instructions
+                            pc = 0
+                            stack = []
+                            push = stack.append
+                            pop = stack.pop
+                            context = execution_context
+                            frame = context.frame
+                            symbol_table = context.symbol_table
+                            continue
+                        # A BREAK or CONTINUE the callee did not handle ends up in the
+                        # loop around the call, as it does in the interpreter
+                        try:
+                            value = value_to_call.execute(args, self, context, pos_start, pos_end, run)
+                        except Break:
+                            if loop is None: raise
+                            del stack[loop.height:]
+                            pc = loop.exit
+                            continue
+                        except Continue:
+                            if loop is None: raise
+                            del stack[loop.height:]
+                            pc = loop.head
+                            continue
+                        push(value)
+
+                    elif op == NULL:
+                        push(Number.null)
+
+                    elif op == LIST_APPEND:
+                        value = pop()
+                        stack[-arg].append(value)
+
+                    elif op == NEGATE:
+                        result, error = stack[-1].multed_by(new_number(-1))
+                        if error: raise Failure(operation_error(error, arg[0], arg[0], arg[1], context))
+                        stack[-1] = result
+
+                    elif op == NOT:
+                        result, error = stack[-1].notted()
+                        if error: raise Failure(operation_error(error, arg[0], arg[0], arg[1], context))
+                        stack[-1] = result
+
+                    elif op == BUILD_LIST:
+                        elements = stack[len(stack) - arg:]
+                        del stack[len(stack) - arg:]
+                        push(List(elements))
+
+                    elif op == NEW_LIST:
+                        push([])
+
+                    elif op == LOOP_LIST:
+                        stack[-1] = List(stack[-1])
+
+                    elif op == FOR_INIT:
+                        counted, has_step = arg
+                        step_value = pop() if has_step else new_number(1)
+                        end_value = pop()
+                        start_value = pop()
+                        if counted_range(counted, start_value.value, end_value.value, step_value.value):
+                            push(iter(range(start_value.value, end_value.value, step_value.value)))
+                        else:
+                            push([start_value.value, end_value, step_value.value, step_value.value >= 0])
+
+                    elif op == MAKE_FUNCTION:
+                        func_name, body_node, arg_names, should_auto_return, arg_slots, slot_names, frame_escapes, source = arg
+                        push(Function(
+                            func_name, body_node, arg_names, should_auto_return, arg_slots, slot_names, frame, frame_escapes, source
+                        ))
+
+                    elif op == BREAK:
+                        del stack[arg.height:]
+                        pc = arg.exit
+
+                    elif op == CONTINUE:
+                        del stack[arg.height:]
+                        pc = arg.head
+
+                    elif op == SIGNAL_BREAK:
+                        raise Break()
+
+                    elif op == SIGNAL_CONTINUE:
+                        raise Continue()
+
+                    # The value of the function goes to its caller, the value
+                    # of the code the VM was entered with is returned or
+                    # raised in a Return
+                    elif op == RETURN or op == END:
+                        if op == RETURN:
+                            value = pop()
+                            if function is None: raise Return(value)
+                        else:
+                            value = stack[-1] if stack else None
+                            if function is None: return value
+                            value = (value if function.should_auto_return else None) or Number.null
+                        if diagnostics.tracer: diagnostics.tracer.call(context)
+                        if function.pool: function.release_frame(context)
+                        instructions, pc, stack, context, function, _ = callers.pop()
+                        push = stack.append
+                        pop = stack.pop
+                        frame = context.frame
+                        symbol_table = context.symbol_table
+                        push(value)
+
+            # A BREAK or CONTINUE a function does not handle goes to the loop
+            # around the call to it in its callers
+            except (Break, Continue) as signal:
+                while callers:
+                    instructions, pc, stack, context, function, loop = callers.pop()
+                    if loop is not None: break
+                else:
+                    raise
+                push = stack.append
+                pop = stack.pop
+                frame = context.frame
+                symbol_table = context.symbol_table
+                del stack[loop.height:]
+                pc = loop.exit if type(signal) is Break else loop.head
@@ -1,42 +1,23 @@
+from modules.diagnostics import get_diagnostics
 ###############################
 # CONTEXT
 ###############################
 class Context:
-    def __init__(self, display_name, parent=None, parent_entry_pos=None):
+    __slots__ = ('display_name', 'parent', 'parent_entry_pos', 'parent_entry_end', 'symbol_table', 'frame', 'slot_names')
+
+    # parent_entry_pos and parent_entry_end span the call that entered it
+    def __init__(self, display_name, parent=None, parent_entry_pos=None, parent_entry_end=None):
         self.display_name = display_name
         self.parent = parent
         self.parent_entry_pos = parent_entry_pos
+        self.parent_entry_end = parent_entry_end
         self.symbol_table = None
+        # Slots of a user function call, slot 0 being the frame of the
+        # function it was defined in, and the names of the other slots
+        self.frame = None
+        self.slot_names = None
 
+    # Dump this context and its parents to the active diagnostics sink
     def print_symbol_table(self):
-        BUILT_IN_FUNCTIONS = [
-        "NULL", "TRUE", "FALSE", "MATH_PI", "PRINT", "INPUT", "INPUT_INT", "INPUT_FLOAT", "CLEAR",
-        "IS_NUMBER", "IS_STRING", "IS_LIST", "IS_FUNCTION", "APPEND", "POP", "EXTEND", "LEN", "RUN"
-        ]
-        address = hex(id(self))
-        with open("symbol_table.txt", "a") as file:
-            file.write(f"\nSymbol table in context: <{self.display_name}> at {address}\n")
-            file.write("--------------------------------------------\n")
-            if self.symbol_table:
-                for key, value in self.symbol_table.symbols.items():
-                    if key in BUILT_IN_FUNCTIONS: continue
-                    hex_address = hex(id(key))
-                    file.write(f"{key} : {repr(value)} (type: {type(value).__name__}), {hex_address}\n")
-            file.write("--------------------------------------------\n")
-
-        with open("address_table.txt", "a") as file:
-            file.write(f"\<{self.display_name}> at {address}\n")
-            
-        if self.parent:
-            self.parent.print_symbol_table()
-
-
-        # print(f"\nSymbol table in context: <{self.display_name}>")
-        # print("--------------------------------------------")
-        # if self.symbol_table:
-        #     for key, value in self.symbol_table.symbols.items():
-        #         if key in BUILT_IN_FUNCTIONS: continue
-        #         print(f"{key} : {repr(value)} (type: {type(value).__name__})")
-        # print("--------------------------------------------")
-        # if self.parent:
-        #     self.parent.print_symbol_table()
+        sink = get_diagnostics()
+        if sink.enabled: sink.symbol_table(self)
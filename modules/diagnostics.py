@@ -0,0 +1,170 @@
+import time
+from compiler.tokens import TOKEN_NAMES, TT_IDENTIFIER
+from modules.position import SOURCES
+###############################
+# DIAGNOSTICS
+# Token tables and symbol tables produced while running a program go to the
+# active sink. The default NullDiagnostics drops them without any file I/O;
+# FileDiagnostics writes the classic *_table.txt files and MemoryDiagnostics
+# keeps them as data for the caller.
+# Scopes of user function calls are only recorded when a ScopeTracer is
+# enabled, which is off by default
+###############################
+
+BUILT_IN_NAMES = frozenset([
+    "NULL", "TRUE", "FALSE", "MATH_PI", "PRINT", "INPUT", "INPUT_INT", "INPUT_FLOAT", "CLEAR",
+    "IS_NUMBER", "IS_STRING", "IS_LIST", "IS_FUNCTION", "APPEND", "POP", "EXTEND", "LEN", "RUN",
+    "MEMOIZE", "MEMO_STATS"
+])
+
+# One row of the token table: value, kind name, identifier flag, line number
+def token_rows(tokens):
+    rows = []
+    for token in tokens:
+        line_number = SOURCES.resolve(token.pos_start).ln + 1 if token.pos_start else "?"
+        identifier_flag = -2 if token.type == TT_IDENTIFIER else -1
+        rows.append((token.value, TOKEN_NAMES[token.type], identifier_flag, line_number))
+    return rows
+
+# Symbol tables of a context and all of its parents, innermost first. A user
+# function call shows the locals in its frame
+def symbol_tables(context):
+    tables = []
+    while context:
+        symbols = []
+        if context.frame is not None:
+            for key, value in zip(context.slot_names, context.frame[1:]):
+                if value is None: continue
+                symbols.append((key, repr(value), type(value).__name__, hex(id(key))))
+        elif context.symbol_table:
+            for key, value in context.symbol_table.symbols.items():
+                if key in BUILT_IN_NAMES: continue
+                symbols.append((key, repr(value), type(value).__name__, hex(id(key))))
+        tables.append((context.display_name, hex(id(context)), symbols))
+        context = context.parent
+    return tables
+
+def format_symbol_tables(tables):
+    lines = []
+    for display_name, address, symbols in tables:
+        lines.append(f"\nSymbol table in context: <{display_name}> at {address}\n")
+        lines.append("--------------------------------------------\n")
+        for key, value, type_name, key_address in symbols:
+            lines.append(f"{key} : {value} (type: {type_name}), {key_address}\n")
+        lines.append("--------------------------------------------\n")
+    return ''.join(lines)
+
+class NullDiagnostics:
+    enabled = False
+
+    def begin_run(self, fn):
+        pass
+
+    def token_table(self, tokens):
+        pass
+
+    def symbol_table(self, context):
+        pass
+
+class FileDiagnostics(NullDiagnostics):
+    enabled = True
+
+    def __init__(self, token_file="token_table.txt", symbol_file="symbol_table.txt", address_file="address_table.txt"):
+        self.token_file = token_file
+        self.symbol_file = symbol_file
+        self.address_file = address_file
+
+    # Every run starts from empty token and symbol tables
+    def begin_run(self, fn):
+        open(self.symbol_file, "w").close()
+        open(self.token_file, "w").close()
+
+    def token_table(self, tokens):
+        lines = ["////////////////////////////////////////////\n", "Tokens:\n"]
+        for value, type_name, identifier_flag, line_number in token_rows(tokens):
+            lines.append(f"{value} ,  {type_name}, {identifier_flag}, {line_number}\n")
+        lines.append("--------------------------------------------\n")
+        with open(self.token_file, "w") as file:
+            file.write(''.join(lines))
+
+    def symbol_table(self, context):
+        tables = symbol_tables(context)
+        with open(self.symbol_file, "a") as file:
+            file.write(format_symbol_tables(tables))
+        with open(self.address_file, "a") as file:
+            file.write(''.join(f"\\<{display_name}> at {address}\n" for display_name, address, _ in tables))
+
+class MemoryDiagnostics(NullDiagnostics):
+    enabled = True
+
+    def __init__(self):
+        self.runs = []
+        self.token_tables = []
+        self.symbol_tables = []
+
+    def begin_run(self, fn):
+        self.runs.append(fn)
+
+    # Rows are (value, kind name, identifier flag, line number)
+    def token_table(self, tokens):
+        self.token_tables.append(token_rows(tokens))
+
+    # Each dump is a list of (context name, address, symbols) from the
+    # innermost context outwards, with symbols as (name, repr, type, address)
+    def symbol_table(self, context):
+        self.symbol_tables.append(symbol_tables(context))
+
+###############################
+# SCOPE TRACER
+# Dumps the scope chain of user function calls to one buffered file. Only
+# every Nth call is sampled, and once the time spent tracing reaches the
+# budget (in seconds) the tracer stops writing
+###############################
+
+class ScopeTracer:
+    def __init__(self, path="scope_trace.txt", every=1, budget=None):
+        self.path = path
+        self.every = max(1, every)
+        self.budget = budget
+        self.file = None
+        self.calls = 0
+        self.samples = 0
+        self.spent = 0.0
+
+    def call(self, context):
+        self.calls += 1
+        if self.calls % self.every: return
+        if self.budget is not None and self.spent >= self.budget: return
+        start = time.perf_counter()
+        if self.file is None: self.file = open(self.path, "w", buffering=1 << 16)
+        self.file.write(f"\n# call {self.calls}\n" + format_symbol_tables(symbol_tables(context)))
+        self.samples += 1
+        self.spent += time.perf_counter() - start
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+active = NullDiagnostics()
+tracer = None
+
+def get_diagnostics():
+    return active
+
+def set_diagnostics(sink):
+    global active
+    previous = active
+    active = sink or NullDiagnostics()
+    return previous
+
+def enable_tracing(path="scope_trace.txt", every=1, budget=None):
+    global tracer
+    disable_tracing()
+    tracer = ScopeTracer(path, every, budget)
+    return tracer
+
+def disable_tracing():
+    global tracer
+    if tracer: tracer.close()
+    tracer = None
@@ -1,4 +1,5 @@
 from modules.strings_with_arrows import string_with_arrows
+from modules.position import SOURCES
 # Error class to keep track of the errors in the input text
 class Error:
     def __init__(self, pos_start, pos_end, error_name, details):
@@ -6,11 +7,21 @@ class Error:
         self.pos_end = pos_end
         self.error_name = error_name
         self.details = details
+        self.keep_sources()
+
+    # Source files the error points into, kept registered until it has been
+    # displayed
+    def keep_sources(self):
+        self.sources = [SOURCES.file_at(pos) for pos in self.positions() if pos is not None]
+
+    def positions(self):
+        return [self.pos_start]
         
     def as_string(self):
+        pos_start = SOURCES.resolve(self.pos_start)
         result = f'{self.error_name}: {self.details}\n'
-        result += f'File {self.pos_start.fn}, line {self.pos_start.ln + 1}'
-        result += '\n\n' + string_with_arrows(self.pos_start.ftxt, self.pos_start, self.pos_end)
+        result += f'File {pos_start.fn}, line {pos_start.ln + 1}'
+        result += '\n\n' + string_with_arrows(self.pos_start, self.pos_end)
         return result
 
 class IllegalCharError(Error):
@@ -27,13 +38,22 @@ class InvalidSyntaxError(Error):
 
 class RTError(Error):
     def __init__(self, pos_start, pos_end, details, context):
-        super().__init__(pos_start, pos_end, 'Runtime Error', details)
         self.context = context
+        super().__init__(pos_start, pos_end, 'Runtime Error', details)
+
+    # The traceback also shows the call that entered each context
+    def positions(self):
+        positions = [self.pos_start]
+        ctx = self.context
+        while ctx:
+            positions.append(ctx.parent_entry_pos)
+            ctx = ctx.parent
+        return positions
     
     def as_string(self):
         result = self.generate_traceback()
         result += f'{self.error_name}: {self.details}'
-        result += '\n\n' + string_with_arrows(self.pos_start.ftxt, self.pos_start, self.pos_end)
+        result += '\n\n' + string_with_arrows(self.pos_start, self.pos_end)
         return result
 
     def generate_traceback(self):
@@ -42,8 +62,15 @@ class RTError(Error):
         ctx = self.context
 
         while ctx:
-            result = f'  File {pos.fn}, line {str(pos.ln + 1)}, in {ctx.display_name}\n' + result
+            resolved = SOURCES.resolve(pos)
+            result = f'  File {resolved.fn}, line {str(resolved.ln + 1)}, in {ctx.display_name}\n' + result
             pos = ctx.parent_entry_pos
             ctx = ctx.parent
 
         return 'Traceback (most recent call last):\n' + result
+
+# Error of a value operation about its right operand, like a division by zero.
+# It is built without a position, the engine places it at the operand
+class OperandError(RTError):
+    def __init__(self, details):
+        super().__init__(None, None, details, None)
@@ -1,3 +1,4 @@
+from compiler.signals import Failure, Return
 from modules.errors import RTError
 from modules.list import List
 from modules.value import Number
@@ -5,106 +6,108 @@ from modules.value import String
 from modules.value import Value
 from modules.context import Context
 from modules.symbol_table import SymbolTable
+from modules import diagnostics
+from modules.nodes import BinOpNode, CallNode, ForNode, FuncDefNode, IfNode, ListNode, ReturnNode, UnaryOpNode, VarAccessNode, VarAssignNode, WhileNode
+from compiler.cache import ast_cache
+from compiler.resolver import CONSTANT_NAMES
+from collections import OrderedDict
 import os
 class BaseFunction(Value):
+    __slots__ = ('name',)
+
     def __init__(self, name):
-        super().__init__()
         self.name = name or "<anonymous>"
         
-    def generate_new_context(self):
-        new_context = Context(self.name, self.context, self.pos_start)
-        new_context.symbol_table = SymbolTable(self.context.symbol_table)
+    # Functions are shared values, not copied for each call: the call passes
+    # the caller's context and its own span, which the new context keeps
+    def generate_new_context(self, context, pos_start, pos_end):
+        new_context = Context(self.name, context, pos_start, pos_end)
+        new_context.symbol_table = SymbolTable(context.symbol_table)
         return new_context
+
+    # Context a wrong number of arguments is reported in, the caller's
+    def args_context(self, execution_context):
+        return execution_context.parent
+
+    # Error at the call that entered execution_context
+    def call_error(self, details, execution_context):
+        return RTError(execution_context.parent_entry_pos, execution_context.parent_entry_end, details, execution_context)
     
-    def check_args(self, arg_names, args, rt_result):
-        res = rt_result
+    def check_args(self, arg_names, args, execution_context):
         if len(args) > len(arg_names):
-            return res.failure(RTError(
-                self.pos_start, self.pos_end,
+            raise Failure(RTError(
+                execution_context.parent_entry_pos, execution_context.parent_entry_end,
                 f"{len(args) - len(arg_names)} too many args passed into '{self.name}'",
-                self.context
+                self.args_context(execution_context)
             ))
         if len(args) < len(arg_names):
-            return res.failure(RTError(
-                self.pos_start, self.pos_end,
+            raise Failure(RTError(
+                execution_context.parent_entry_pos, execution_context.parent_entry_end,
                 f"{len(arg_names) - len(args)} too few args passed into '{self.name}'",
-                self.context
+                self.args_context(execution_context)
             ))
-        return res.success(None)
     
     def populate_args(self, arg_names, args, execution_context):
         for i in range(len(args)):
-            arg_name = arg_names[i]
-            arg_value = args[i]
-            arg_value.set_context(execution_context)
-            execution_context.symbol_table.set(arg_name, arg_value)
-
-    def check_and_populate_args(self, arg_names, args, execution_context, rt_result):
-        res = rt_result
-        res.register(self.check_args(arg_names, args, rt_result))
-        if res.should_return(): return res
+            execution_context.symbol_table.set(arg_names[i], args[i])
+
+    def check_and_populate_args(self, arg_names, args, execution_context):
+        self.check_args(arg_names, args, execution_context)
         self.populate_args(arg_names, args, execution_context)
-        return res.success(None)
 
 class BuiltInFunction(BaseFunction):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name)
     
-    def execute(self, args, interpreter, rt_result, run=None):
-        res = rt_result
-        execution_context = self.generate_new_context()
+    # Returns the value of the call, errors are raised as a Failure
+    def execute(self, args, interpreter, context, pos_start, pos_end, run=None):
+        execution_context = self.generate_new_context(context, pos_start, pos_end)
         method_name = f'execute_{self.name}'
         method = getattr(self, method_name, self.no_visit_method)
         
-        res.register(self.check_and_populate_args(method.arg_names, args, execution_context, rt_result))
-        if res.should_return(): return res
+        self.check_and_populate_args(method.arg_names, args, execution_context)
 
         if self.name == "run":
-            return_value = res.register(method(execution_context, rt_result, run))
-        else:
-            return_value = res.register(method(execution_context, rt_result))
-        if res.should_return(): return res
-
-        return res.success(return_value)
+            return method(execution_context, run)
+        return method(execution_context)
     
     def no_visit_method(self, node, context):
         raise Exception(f'No execute_{self.name} method defined')
     
     def copy(self):
-        copy = BuiltInFunction(self.name)
-        copy.set_context(self.context)
-        copy.set_pos(self.pos_start, self.pos_end)
-        return copy
+        return BuiltInFunction(self.name)
     
     def __repr__(self):
         return f"<built-in function {self.name}>"
 
-    def execute_print(self, execution_context, rt_result):
+    def execute_print(self, execution_context):
         # print(str(execution_context.symbol_table.get("value")))
-        # return rt_result.success(Number.null)
+        # return Number.null
         value = execution_context.symbol_table.get("value")
         if isinstance(value, List):
             concatenated_string = ''.join([str(element) for element in value.elements])
         else:
             concatenated_string = str(value)
         print(concatenated_string)
-        return rt_result.success(Number.null)
+        return Number.null
     execute_print.arg_names = ["value"]
 
-    def execute_print_ret(self, execution_context, rt_result):
-        return rt_result.success(String(str(execution_context.symbol_table.get("value"))))
+    def execute_print_ret(self, execution_context):
+        return String(str(execution_context.symbol_table.get("value")))
     execute_print_ret.arg_names = ["value"]
 
-    def execute_input(self, execution_context, rt_result):
+    def execute_input(self, execution_context):
         text = input()
         try:
             number = float(text)
-            return rt_result.success(Number(number))
+            return Number(number)
         except ValueError:
-            return rt_result.success(String(text))
+            return String(text)
     execute_input.arg_names = []
     
-    def execute_input_int(self, execution_context, rt_result):
+    def execute_input_int(self, execution_context):
         while True:
             text = input()
             try:
@@ -113,10 +116,10 @@ class BuiltInFunction(BaseFunction):
             except ValueError:
                 print(f"'{text}' must be an integer. Try again.")
                 text = input()
-        return rt_result.success(Number(number))
+        return Number(number)
     execute_input_int.arg_names = []
 
-    def execute_input_float(self, execution_context, rt_result):
+    def execute_input_float(self, execution_context):
         while True:
             text = input()
             try:
@@ -124,134 +127,119 @@ class BuiltInFunction(BaseFunction):
                 break
             except ValueError:
                 print(f"'{text}' must be a float. Try again.")
-        return rt_result.success(Number(number))
+        return Number(number)
     execute_input_float.arg_names = []
 
-    def execute_clear(self, execution_context, rt_result):
+    def execute_clear(self, execution_context):
         os.system('cls' if os.name == 'nt' else 'clear')
-        return rt_result.success(Number.null)
+        return Number.null
     execute_clear.arg_names = []
 
-    def execute_is_number(self, execution_context, rt_result):
+    def execute_is_number(self, execution_context):
         is_number = isinstance(execution_context.symbol_table.get("value"), Number)
-        return rt_result.success(Number.true if is_number else Number.false)
+        return Number.true if is_number else Number.false
     execute_is_number.arg_names = ['value']
 
-    def execute_is_string(self, execution_context, rt_result):
+    def execute_is_string(self, execution_context):
         is_string = isinstance(execution_context.symbol_table.get("value"), String)
-        return rt_result.success(Number.true if is_string else Number.false)
+        return Number.true if is_string else Number.false
     execute_is_string.arg_names = ['value']
 
-    def execute_is_list(self, execution_context, rt_result):
+    def execute_is_list(self, execution_context):
         is_list = isinstance(execution_context.symbol_table.get("value"), List)
-        return rt_result.success(Number.true if is_list else Number.false)
+        return Number.true if is_list else Number.false
     execute_is_list.arg_names = ['value']
 
-    def execute_is_function(self, execution_context, rt_result):
+    def execute_is_function(self, execution_context):
         is_function = isinstance(execution_context.symbol_table.get("value"), BaseFunction)
-        return rt_result.success(Number.true if is_function else Number.false)
+        return Number.true if is_function else Number.false
     execute_is_function.arg_names = ['value']
 
-    def execute_append(self, execution_context, rt_result):
+    def execute_append(self, execution_context):
         list_ = execution_context.symbol_table.get("list")
         value = execution_context.symbol_table.get("value")
         if not isinstance(list_, List):
-            return rt_result.failure(RTError(
-                self.pos_start, self.pos_end,
-                "First argument must be list",
-                execution_context
-            ))
+            raise Failure(self.call_error("First argument must be list", execution_context))
         list_.elements.append(value)
-        return rt_result.success(Number.null)
+        return Number.null
     execute_append.arg_names = ['list', 'value']
 
-    def execute_pop(self, execution_context, rt_result):
+    def execute_pop(self, execution_context):
         list_ = execution_context.symbol_table.get("list")
         index = execution_context.symbol_table.get("index")
         if not isinstance(list_, List):
-            return rt_result.failure(RTError(
-                self.pos_start, self.pos_end,
-                "First argument must be list",
-                execution_context
-            ))
+            raise Failure(self.call_error("First argument must be list", execution_context))
         if not isinstance(index, Number):
-            return rt_result.failure(RTError(
-                self.pos_start, self.pos_end,
-                "Second argument must be number",
-                execution_context
-            ))
+            raise Failure(self.call_error("Second argument must be number", execution_context))
         try:
             element = list_.elements.pop(index.value)
         except:
-            return rt_result.failure(RTError(
-                self.pos_start, self.pos_end,
-                "Index out of bounds", execution_context))
-        return rt_result.success(element)
+            raise Failure(self.call_error("Index out of bounds", execution_context))
+        return element
     execute_pop.arg_names = ['list', 'index']
 
-    def execute_extend(self, execution_context, rt_result):
+    def execute_extend(self, execution_context):
         list1 = execution_context.symbol_table.get("list1")
         list2 = execution_context.symbol_table.get("list2")
         if not isinstance(list1, List):
-            return rt_result.failure(RTError(
-                self.pos_start, self.pos_end,
-                "First argument must be list",
-                execution_context
-            ))
+            raise Failure(self.call_error("First argument must be list", execution_context))
         if not isinstance(list2, List):
-            return rt_result.failure(RTError(
-                self.pos_start, self.pos_end,
-                "Second argument must be list",
-                execution_context
-            ))
+            raise Failure(self.call_error("Second argument must be list", execution_context))
         list1.elements.extend(list2.elements)
-        return rt_result.success(Number.null)
+        return Number.null
     execute_extend.arg_names = ['list1', 'list2']
 
-    def execute_len(self, execution_context, rt_result):
+    def execute_len(self, execution_context):
         list_ = execution_context.symbol_table.get("list")
         if not isinstance(list_, List):
-            return rt_result.failure(RTError(
-                self.pos_start, self.pos_end,
-                "Argument must be list",
-                execution_context
-            ))
-        return rt_result.success(Number(len(list_.elements)))
+            raise Failure(self.call_error("Argument must be list", execution_context))
+        return Number(len(list_.elements))
     execute_len.arg_names = ['list']
 
-    def execute_run(self, execution_context, rt_result, run):
+    def execute_run(self, execution_context, run):
         fn = execution_context.symbol_table.get("fn")
         if not isinstance(fn, String):
-            return rt_result.failure(RTError(
-                self.pos_start, self.pos_end,
-                "Argument must be string",
-                execution_context
-            ))
+            raise Failure(self.call_error("Argument must be string", execution_context))
         fn = fn.value
         try:
-            with open(fn, "r") as f:
-                script = f.read()
+            script = ast_cache.read(fn)
         except Exception as e:
-            return rt_result.failure(RTError(
-                self.pos_start, self.pos_end,
-                f"Failed to load script \"{fn}\"\n" + str(e),
-                execution_context
-            ))
+            raise Failure(self.call_error(f"Failed to load script \"{fn}\"\n" + str(e), execution_context))
         _, error, context = run(fn, script)
         if error:
-            return rt_result.failure(RTError(
-                self.pos_start, self.pos_end,
-                f"Failed to finish executing script \"{fn}\"\n" + error.as_string(),
-                execution_context
-            ))
+            raise Failure(self.call_error(f"Failed to finish executing script \"{fn}\"\n" + error.as_string(), execution_context))
         if context:
             execution_context.print_symbol_table()
             
 
-        return rt_result.success(Number.null)
+        return Number.null
 
     execute_run.arg_names = ['fn'] 
 
+    def execute_memoize(self, execution_context):
+        fn = execution_context.symbol_table.get("fn")
+        size = execution_context.symbol_table.get("size")
+        if not isinstance(fn, Function):
+            raise Failure(self.call_error("First argument must be a user function", execution_context))
+        if not isinstance(size, Number) or not isinstance(size.value, int) or size.value < 1:
+            raise Failure(self.call_error("Second argument must be a positive integer", execution_context))
+        symbol_table = execution_context.symbol_table
+        while symbol_table.parent: symbol_table = symbol_table.parent
+        check = PurityCheck(symbol_table)
+        reason = check.check(fn)
+        if reason:
+            raise Failure(self.call_error(f"Cannot memoize '{fn.name}', {reason}", execution_context))
+        return MemoizedFunction(fn, size.value, symbol_table, symbol_table.version, check.reads)
+    execute_memoize.arg_names = ['fn', 'size']
+
+    def execute_memo_stats(self, execution_context):
+        fn = execution_context.symbol_table.get("fn")
+        if not isinstance(fn, MemoizedFunction):
+            raise Failure(self.call_error("Argument must be a memoized function", execution_context))
+        hits, misses = fn.stats
+        return List([Number(hits), Number(misses), Number(len(fn.cache))])
+    execute_memo_stats.arg_names = ['fn']
+
 BuiltInFunction.print = BuiltInFunction("print")
 BuiltInFunction.print_ret = BuiltInFunction("print_ret")
 BuiltInFunction.input = BuiltInFunction("input")
@@ -267,34 +255,284 @@ BuiltInFunction.pop = BuiltInFunction("pop")
 BuiltInFunction.extend = BuiltInFunction("extend")
 BuiltInFunction.len = BuiltInFunction("len")
 BuiltInFunction.run = BuiltInFunction("run")
+BuiltInFunction.memoize = BuiltInFunction("memoize")
+BuiltInFunction.memo_stats = BuiltInFunction("memo_stats")
+
+###############################
+# FRAME POOL
+# The frame of a user function call is a list of slots of a size fixed by
+# the function. Frames of the calls that returned are kept by size, cleared,
+# and handed to the next calls. A function whose body defines functions
+# never gives its frames back: the functions it defines keep the frame as
+# their closure
+###############################
+
+# Free frames kept for each size
+FRAME_POOL_SIZE = 64
+
+class FramePool:
+    def __init__(self, size):
+        self.size = size
+        self.blank = [None] * size
+        self.free = []
+
+FRAME_POOLS = {}
+
+def frame_pool(size):
+    pool = FRAME_POOLS.get(size)
+    if pool is None:
+        pool = FRAME_POOLS[size] = FramePool(size)
+    return pool
 
 class Function(BaseFunction):
-    def __init__(self, name, body_node, arg_names, should_auto_return):
+    __slots__ = ('body_node', 'arg_names', 'should_auto_return', 'arg_slots', 'slot_names', 'closure', 'frame_escapes', 'source', 'arity', 'frame_size', 'pool', 'args_in_order')
+
+    # closure is the frame the function was defined in, None at the top level.
+    # frame_escapes is False when the body defines no functions, so a call's
+    # frame can be reused once it returns. source is the SourceFile of the
+    # definition, kept registered while the function exists
+    def __init__(self, name, body_node, arg_names, should_auto_return, arg_slots, slot_names, closure=None, frame_escapes=True, source=None):
         super().__init__(name)
         self.body_node = body_node
         self.arg_names = arg_names
         self.should_auto_return = should_auto_return
+        self.arg_slots = arg_slots
+        self.slot_names = slot_names
+        self.closure = closure
+        self.frame_escapes = frame_escapes
+        self.source = source
+        self.arity = len(arg_names)
+        self.frame_size = len(slot_names) + 1
+        self.pool = None if frame_escapes else frame_pool(self.frame_size)
+        # Arguments fill slots 1 to arity, unless two of them share a name
+        self.args_in_order = arg_slots == list(range(1, self.arity + 1))
+
+    # Locals live in a fixed size frame; names the function does not declare
+    # are globals, looked up in the caller's (global) symbol table
+    def generate_new_context(self, context, pos_start, pos_end):
+        new_context = Context(self.name, context, pos_start, pos_end)
+        new_context.symbol_table = context.symbol_table
+        pool = self.pool
+        frame = pool.free.pop() if pool and pool.free else [None] * self.frame_size
+        frame[0] = self.closure
+        new_context.frame = frame
+        new_context.slot_names = self.slot_names
+        return new_context
+
+    # Gives the frame of a call that returned back to the pool
+    def release_frame(self, execution_context):
+        pool = self.pool
+        frame = execution_context.frame
+        execution_context.frame = None
+        if len(pool.free) < FRAME_POOL_SIZE:
+            frame[:] = pool.blank
+            pool.free.append(frame)
+
+    # A user function reports it from inside the call
+    def args_context(self, execution_context):
+        return execution_context
+
+    def check_args(self, arg_names, args, execution_context):
+        if len(args) != self.arity: super().check_args(arg_names, args, execution_context)
+
+    def populate_args(self, arg_names, args, execution_context):
+        frame = execution_context.frame
+        if self.args_in_order:
+            frame[1:self.arity + 1] = args
+            return
+        for i in range(len(args)):
+            frame[self.arg_slots[i]] = args[i]
     
-    def execute(self, args, interpreter, rt_result, run=None):
-        res = rt_result
-        execution_context = self.generate_new_context()
-        self.context = execution_context  # Ensure the function context is set
+    # Returns the value of the call. Errors, and a BREAK or CONTINUE the body
+    # does not handle, are raised on to the caller
+    def execute(self, args, interpreter, context, pos_start, pos_end, run=None):
+        execution_context = self.generate_new_context(context, pos_start, pos_end)
         
-        res.register(self.check_and_populate_args(self.arg_names, args, execution_context, rt_result))
-        if res.should_return(): return res
+        self.check_and_populate_args(self.arg_names, args, execution_context)
 
-        value = res.register(interpreter.visit(self.body_node, execution_context, run))
-        if res.should_return() and res.func_return_value is None: return res
-        
-        ret_value = (value if self.should_auto_return else None) or res.func_return_value or Number.null
-        execution_context.print_symbol_table()
-        return res.success(ret_value)
+        try:
+            value = interpreter.evaluate(self.body_node, execution_context, run)
+            ret_value = (value if self.should_auto_return else None) or Number.null
+        except Return as signal:
+            ret_value = signal.value
+        if diagnostics.tracer: diagnostics.tracer.call(execution_context)
+        if self.pool: self.release_frame(execution_context)
+        return ret_value
     
     def copy(self):
-        copy = Function(self.name, self.body_node, self.arg_names, self.should_auto_return)
-        copy.set_context(self.context)
-        copy.set_pos(self.pos_start, self.pos_end)
-        return copy
+        return Function(self.name, self.body_node, self.arg_names, self.should_auto_return, self.arg_slots, self.slot_names, self.closure, self.frame_escapes, self.source)
     
     def __repr__(self):
         return f"<function {self.name}>"
+
+###############################
+# MEMOIZATION
+# MEMOIZE(fn, size) wraps a user function in a MemoizedFunction, which keeps
+# the values of its last size calls by argument values. Only calls whose
+# arguments are all Numbers and Strings are cached, any other call runs the
+# function. Only values that cannot be changed are kept, Numbers, Strings and
+# functions: a List given back would be shared by every call that finds it,
+# so a call giving a List runs the function every time. MEMO_STATS(fn) gives
+# the hits, misses and entries.
+#
+# A function is only memoized when its body has no visible side effect and
+# reads nothing that can change between calls: it may not call a builtin
+# that does I/O or changes a list, nor assign a global or a variable of an
+# enclosing function, and the only globals it may read are the built-in
+# constants and names bound to functions. Calls to global user functions
+# are followed into their bodies, while a function in a local or an
+# argument, or any other computed function, could be anything and may not
+# be called.
+#
+# The check keeps the Cell and value of every global name the bodies read.
+# When one of those names is bound to another value, or the table gains or
+# loses a name, the function is checked again before its next call: the
+# cached values are dropped if a name it reads changed, and the call fails
+# if the function is no longer pure.
+###############################
+
+IMPURE_BUILTINS = frozenset(('print', 'input', 'input_int', 'input_float', 'clear', 'append', 'pop', 'extend', 'run'))
+
+def child_nodes(node):
+    if isinstance(node, ListNode): return node.element_nodes
+    if isinstance(node, VarAssignNode): return [node.value_node]
+    if isinstance(node, BinOpNode): return [node.left_node, node.right_node]
+    if isinstance(node, UnaryOpNode): return [node.node]
+    if isinstance(node, IfNode):
+        nodes = [child for condition, expr, _ in node.cases for child in (condition, expr)]
+        if node.else_case: nodes.append(node.else_case[0])
+        return nodes
+    if isinstance(node, ForNode):
+        nodes = [node.start_value_node, node.end_value_node, node.body_node]
+        if node.step_value_node: nodes.append(node.step_value_node)
+        return nodes
+    if isinstance(node, WhileNode): return [node.condition_node, node.body_node]
+    if isinstance(node, FuncDefNode): return [node.body_node]
+    if isinstance(node, CallNode): return [node.node_to_call] + node.arg_nodes
+    if isinstance(node, ReturnNode): return [node.node_to_return] if node.node_to_return else []
+    return []
+
+class PurityCheck:
+    def __init__(self, symbol_table):
+        # The global symbol table the names are read from
+        self.symbol_table = symbol_table
+        # Bodies of the user functions already followed
+        self.visited = set()
+        # (Cell, value) of the global names read, by name
+        self.reads = {}
+
+    # The first side effect of calling function, described, or None
+    def check(self, function):
+        self.visited.add(function.body_node)
+        return self.side_effect(function.body_node)
+
+    def read(self, name):
+        value = self.symbol_table.get(name)
+        if value is not None and name not in self.reads:
+            self.reads[name] = (self.symbol_table.cell(name), value)
+        return value
+
+    # The side effect of calling the function node_to_call gives, described,
+    # or None
+    def call_side_effect(self, node_to_call):
+        # A function defined in place is checked as a child of the call
+        if isinstance(node_to_call, FuncDefNode): return None
+        if not isinstance(node_to_call, VarAccessNode): return "it calls a computed function"
+        name = node_to_call.var_name_tok.value
+        if node_to_call.slot is not None: return f"it calls the local '{name}'"
+        value = self.read(name)
+        if isinstance(value, MemoizedFunction): value = value.function
+        if isinstance(value, BuiltInFunction):
+            if value.name in IMPURE_BUILTINS: return f"it calls {name}"
+            return None
+        if isinstance(value, Function):
+            if value.body_node in self.visited: return None
+            self.visited.add(value.body_node)
+            reason = self.side_effect(value.body_node)
+            if reason: return f"{reason} through '{name}'"
+            return None
+        if value is None: return f"it calls '{name}', which is not defined"
+        return None
+
+    # The first side effect in a function body, described, or None. depth is
+    # the number of functions defined in the body around node
+    def side_effect(self, node, depth=0):
+        if isinstance(node, CallNode):
+            reason = self.call_side_effect(node.node_to_call)
+            if reason: return reason
+        if isinstance(node, VarAccessNode) and node.slot is None and node.var_name_tok.value not in CONSTANT_NAMES:
+            name = node.var_name_tok.value
+            if not isinstance(self.read(name), BaseFunction): return f"it reads the global '{name}'"
+        if isinstance(node, VarAssignNode) and not node.declare:
+            name = node.var_name_tok.value
+            if node.slot is None: return f"it assigns the global '{name}'"
+            if node.depth > depth: return f"it assigns '{name}' of an enclosing function"
+        if isinstance(node, FuncDefNode): depth += 1
+        for child in child_nodes(node):
+            reason = self.side_effect(child, depth)
+            if reason: return reason
+        return None
+
+class MemoizedFunction(BaseFunction):
+    __slots__ = ('function', 'size', 'symbol_table', 'version', 'reads', 'cache', 'stats')
+
+    def __init__(self, function, size, symbol_table, version, reads, cache=None, stats=None):
+        super().__init__(function.name)
+        self.function = function
+        self.size = size
+        # The global table the function was checked against, its version then
+        # and the (Cell, value) of the names it reads, by name
+        self.symbol_table = symbol_table
+        self.version = version
+        self.reads = reads
+        # Values by argument key, least recently used first
+        self.cache = OrderedDict() if cache is None else cache
+        # [hits, misses]
+        self.stats = [0, 0] if stats is None else stats
+
+    def execute(self, args, interpreter, context, pos_start, pos_end, run=None):
+        if self.symbol_table.version != self.version or self.rebound():
+            self.check_again(context, pos_start, pos_end)
+        key = []
+        for arg in args:
+            if type(arg) is not Number and type(arg) is not String:
+                self.stats[1] += 1
+                return self.function.execute(args, interpreter, context, pos_start, pos_end, run)
+            # 1 and 1.0 are different arguments
+            key.append((type(arg), type(arg.value), arg.value))
+        key = tuple(key)
+
+        value = self.cache.get(key)
+        if value is not None:
+            self.stats[0] += 1
+            self.cache.move_to_end(key)
+            return value
+        self.stats[1] += 1
+        value = self.function.execute(args, interpreter, context, pos_start, pos_end, run)
+        if isinstance(value, (Number, String, BaseFunction)):
+            self.cache[key] = value
+            if len(self.cache) > self.size: self.cache.popitem(last=False)
+        return value
+
+    def rebound(self):
+        for cell, value in self.reads.values():
+            if cell.value is not value: return True
+        return False
+
+    # A name the function reads changed: check it again, and drop the cached
+    # values if what it reads is not what it read
+    def check_again(self, context, pos_start, pos_end):
+        check = PurityCheck(self.symbol_table)
+        reason = check.check(self.function)
+        if reason:
+            raise Failure(RTError(pos_start, pos_end, f"Cannot memoize '{self.name}' any more, {reason}", context))
+        values = {name: value for name, (_, value) in check.reads.items()}
+        if values.keys() != self.reads.keys() or any(self.reads[name][1] is not value for name, value in values.items()):
+            self.cache.clear()
+        self.version, self.reads = self.symbol_table.version, check.reads
+
+    def copy(self):
+        return MemoizedFunction(self.function, self.size, self.symbol_table, self.version, self.reads, self.cache, self.stats)
+
+    def __repr__(self):
+        return f"<memoized function {self.name}>"
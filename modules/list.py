@@ -1,10 +1,11 @@
 from modules.value import Number
 from modules.value import Value
-from modules.errors import RTError
+from modules.errors import OperandError
 
 class List(Value):
+    __slots__ = ('elements',)
+
     def __init__(self, elements):
-        super().__init__()
         self.elements = elements
     
     # Add a value to the list
@@ -21,13 +22,9 @@ class List(Value):
                 new_list.elements.pop(other.value)
                 return new_list, None
             except:
-                return None, RTError(
-                other.pos_start, other.pos_end,
-                "Index out of bounds",
-                self.context
-            )
+                return None, OperandError("Index out of bounds")
         else:
-             return None, Value.illegal_operation(self, other)
+             return None, self.illegal_operation(other)
             
     # Concatenate two lists
     def multed_by(self, other):
@@ -36,7 +33,7 @@ class List(Value):
             new_list.elements.extend(other.elements)
             return new_list, None
         else:
-            return None, Value.illegal_operation(self, other)
+            return None, self.illegal_operation(other)
         
     # Get the value at a certain index
     def dived_by(self, other):
@@ -44,20 +41,13 @@ class List(Value):
             try:
                 return self.elements[other.value], None
             except:
-                return None, RTError(
-                other.pos_start, other.pos_end,
-                "Index out of bounds",
-                self.context
-            )
+                return None, OperandError("Index out of bounds")
         else:
-            return None, Value.illegal_operation(self, other)
+            return None, self.illegal_operation(other)
     
     # Copy the list
     def copy(self):
-        copy = List(self.elements)
-        copy.set_context(self.context)
-        copy.set_pos(self.pos_start, self.pos_end)
-        return copy
+        return List(self.elements)
     
     def __str__(self):
         return f'[{", ".join([str(x) for x in self.elements])}]'
@@ -1,3 +1,5 @@
+from modules.value import Number, String, constant
+from modules.position import SOURCES
 ###############################
 # NODES
 ###############################
@@ -6,6 +8,8 @@ class NumberNode:
         self.tok = tok
         self.pos_start = tok.pos_start
         self.pos_end = tok.pos_end
+        # The pooled Number every run of the literal gives
+        self.value = constant(Number, tok.value)
 
     
     def __repr__(self):
@@ -16,6 +20,8 @@ class StringNode:
         self.tok = tok
         self.pos_start = tok.pos_start
         self.pos_end = tok.pos_end
+        # The pooled String every run of the literal gives
+        self.value = constant(String, tok.value)
 
     
     def __repr__(self):
@@ -26,6 +32,8 @@ class ListNode:
         self.element_nodes = element_nodes
         self.pos_start = pos_start
         self.pos_end = pos_end
+        # Set by the resolver when the value is not used
+        self.should_return_null = False
 
     def __repr__(self):
         return f'({self.element_nodes})'
@@ -35,16 +43,28 @@ class VarAccessNode:
         self.var_name_tok = var_name_tok
         self.pos_start = var_name_tok.pos_start
         self.pos_end = var_name_tok.pos_end
+        # Set by the resolver: frame slot and number of functions up, or no
+        # slot for a global
+        self.depth = 0
+        self.slot = None
+        # Inline cache of a global, set by the interpreter the first time
+        # the node runs
+        self.cache = None
 
     def __repr__(self):
         return f'{self.tok}'
 
 class VarAssignNode:
-    def __init__(self, var_name_tok, value_node):
+    def __init__(self, var_name_tok, value_node, declare=False):
         self.var_name_tok = var_name_tok
         self.value_node = value_node
+        # True for VAR declarations
+        self.declare = declare
         self.pos_start = self.var_name_tok.pos_start
         self.pos_end = self.value_node.pos_end
+        # Set by the resolver
+        self.depth = 0
+        self.slot = None
 
     def __repr__(self):
         return f'({self.var_name_tok}, {self.value_node})'
@@ -56,6 +76,8 @@ class BinOpNode:
         self.right_node = right_node
         self.pos_start = self.left_node.pos_start
         self.pos_end = self.right_node.pos_end
+        # Inline cache, set by the interpreter the first time the node runs
+        self.cache = None
 
     def __repr__(self):
         return f'({self.left_node}, {self.op_tok}, {self.right_node})'
@@ -90,6 +112,10 @@ class ForNode:
         self.pos_start = self.var_name_tok.pos_start
         self.pos_end = self.body_node.pos_end
         self.should_return_null = should_return_null
+        # Set by the resolver: frame slot of the loop variable, and whether the
+        # body leaves the variable to the loop
+        self.slot = None
+        self.counted = False
 
     def __repr__(self):
         return f'({self.var_name_tok}, {self.start_value_node}, {self.end_value_node}, {self.step_value_node}, {self.body_node})'
@@ -120,6 +146,15 @@ class FuncDefNode:
             self.pos_start = self.body_node.pos_start
         
         self.pos_end = self.body_node.pos_end
+        # Functions made from the node keep its source registered
+        self.source = SOURCES.file_at(self.pos_start)
+        # Set by the resolver: frame slot of the function name, slots of the
+        # arguments, names of every slot in the function's own frame and
+        # whether the body defines functions, which keep the frame
+        self.slot = None
+        self.arg_slots = None
+        self.slot_names = None
+        self.frame_escapes = True
 
     def __repr__(self):
         return f'({self.var_name_tok}, {self.arg_name_toks}, {self.body_node})'
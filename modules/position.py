@@ -0,0 +1,121 @@
+import bisect
+import weakref
+###############################
+# SOURCE POSITIONS
+# Tokens, nodes, values and errors store positions as plain integer offsets
+# into one address space shared by every source file. Line and column are
+# only worked out when an error is displayed, by bisecting the line start
+# index of the file the offset falls in.
+#
+# The map holds its files weakly. A file stays registered while something
+# that points into it holds its SourceFile: the run executing it, the AST
+# cache entry of its AST, a function defined in it or an error raised in it.
+# Once the last of them is gone the file and its text are dropped.
+###############################
+
+# Resolved position of an offset inside its source file
+class Position:
+    __slots__ = ('idx', 'ln', 'col', 'fn', 'ftxt')
+
+    def __init__(self, idx, ln, col, fn, ftxt):
+        self.idx = idx
+        self.ln = ln
+        self.col = col
+        self.fn = fn
+        self.ftxt = ftxt
+
+    def advance(self, current_char=None):
+        self.idx += 1
+        self.col += 1
+
+        if current_char == '\n':
+            self.ln += 1
+            self.col = 0
+
+        return self
+
+    def copy(self):
+        return Position(self.idx, self.ln, self.col, self.fn, self.ftxt)
+
+class SourceFile:
+    def __init__(self, fn, text, base):
+        self.fn = fn
+        self.text = text
+        self.base = base
+        self.line_starts = None
+
+    # Offsets of the first character of every line, built on first use
+    def get_line_starts(self):
+        if self.line_starts is None:
+            line_starts = [0]
+            idx = self.text.find('\n')
+            while idx >= 0:
+                line_starts.append(idx + 1)
+                idx = self.text.find('\n', idx + 1)
+            self.line_starts = line_starts
+        return self.line_starts
+
+    def resolve(self, offset):
+        idx = offset - self.base
+        line_starts = self.get_line_starts()
+        ln = bisect.bisect_right(line_starts, idx) - 1
+        return Position(idx, ln, idx - line_starts[ln], self.fn, self.text)
+
+    # End offsets point one past the last character of a span, which for a
+    # NEWLINE token still belongs to the line the token is on
+    def resolve_end(self, offset):
+        idx = offset - self.base
+        if 0 < idx <= len(self.text) and self.text[idx - 1] == '\n':
+            return self.resolve(offset - 1).advance()
+        return self.resolve(offset)
+
+    # A pickled AST registers its source again when it is loaded, at the
+    # base the cache then rebases it to
+    def __reduce__(self):
+        return (source_file, (self.fn, self.text))
+
+class SourceMap:
+    def __init__(self):
+        # Weak references to the files, in the order of their bases
+        self.files = []
+        self.bases = []
+        self.by_text = weakref.WeakValueDictionary()
+        # Offset 0 is never handed out so a position is always truthy
+        self.next_base = 1
+
+    # Register a source text and return its SourceFile, reusing the existing
+    # entry when the same file is lexed again
+    def add(self, fn, text):
+        key = (fn, text)
+        source = self.by_text.get(key)
+        if source is None:
+            source = SourceFile(fn, text, self.next_base)
+            # Leave room for the EOF token and an unterminated string,
+            # which end up to three places past the last character
+            self.next_base += len(text) + 3
+            self.files.append(weakref.ref(source, lambda _, base=source.base: self.remove(base)))
+            self.bases.append(source.base)
+            self.by_text[key] = source
+        return source
+
+    # Drop a file nothing points into any more. Bases are never handed out
+    # again, so the other files keep theirs
+    def remove(self, base):
+        idx = bisect.bisect_left(self.bases, base)
+        if idx < len(self.bases) and self.bases[idx] == base:
+            del self.files[idx]
+            del self.bases[idx]
+
+    def file_at(self, offset):
+        return self.files[bisect.bisect_right(self.bases, offset) - 1]()
+
+    def resolve(self, offset):
+        return self.file_at(offset).resolve(offset)
+
+    def resolve_end(self, offset):
+        return self.file_at(offset).resolve_end(offset)
+
+SOURCES = SourceMap()
+
+def source_file(fn, text):
+    return SOURCES.add(fn, text)
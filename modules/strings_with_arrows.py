@@ -1,5 +1,11 @@
-def string_with_arrows(text, pos_start, pos_end):
+from modules.position import SOURCES
+
+# Takes source offsets and resolves them to lines and columns
+def string_with_arrows(pos_start, pos_end):
     result = ''
+    pos_start = SOURCES.resolve(pos_start)
+    pos_end = SOURCES.resolve_end(pos_end)
+    text = pos_start.ftxt
 
     # Calculate indices
     idx_start = max(text.rfind('\n', 0, pos_start.idx), 0)
@@ -1,24 +1,92 @@
+import itertools
 ###############################
 # SYMBOL TABLE
+# Adding or removing a name, or replacing all of them, gives the table a new
+# version, drawn from one counter for all tables, so a cached lookup is
+# still valid exactly when the table's version is the one it was made at.
+# A cached name has a Cell holding its value, which binding the name again
+# updates in place: that leaves the version, and the caches of the other
+# names, alone
 ###############################
+VERSIONS = itertools.count()
+
+class Cell:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
 class SymbolTable:
     def __init__(self, parent=None):
-        self.symbols = {}
+        self._symbols = {}
+        self.cells = {}
         self.parent = parent 
+        self.version = next(VERSIONS)
+
+    @property
+    def symbols(self):
+        return self._symbols
+
+    @symbols.setter
+    def symbols(self, symbols):
+        self._symbols = symbols
+        self.cells = {}
+        self.version = next(VERSIONS)
 
     def get(self, name):
-        value = self.symbols.get(name, None)
-        if value == None and self.parent:
+        value = self._symbols.get(name, None)
+        if value is None and self.parent:
             return self.parent.get(name)
         return value
     
     def set(self, name, value):
-        self.symbols[name] = value
+        symbols = self._symbols
+        if name not in symbols: self.version = next(VERSIONS)
+        symbols[name] = value
+        cell = self.cells.get(name)
+        if cell is not None: cell.value = value
     
     def remove(self, name):
-        del self.symbols[name]
+        del self._symbols[name]
+        self.cells.pop(name, None)
+        self.version = next(VERSIONS)
+
+    # The Cell of a name of the table, made the first time it is asked for
+    def cell(self, name):
+        cell = self.cells.get(name)
+        if cell is None:
+            cell = self.cells[name] = Cell(self._symbols[name])
+        return cell
 
     def __repr__(self):
-        return f"{self.symbols}"
-    
-    
+        return f"{self._symbols}"
+
+###############################
+# GLOBAL CACHE
+# The Cell a read of a global name found and the version of the table it was
+# found in: while the version matches the name is still in the table and
+# the Cell holds its current value, or the name is still missing
+###############################
+NO_CELL = Cell(None)
+
+class GlobalCache:
+    def __init__(self, name, pos_start=None, pos_end=None):
+        self.name = name
+        self.pos_start = pos_start
+        self.pos_end = pos_end
+        self.version = None
+        self.cell = NO_CELL
+
+    # Look the name up again. A table with a parent does not know when the
+    # names of the parent change, its lookups are not kept
+    def miss(self, symbol_table):
+        if symbol_table.parent:
+            self.version = None
+            return symbol_table.get(self.name)
+        self.version = symbol_table.version
+        self.cell = symbol_table.cell(self.name) if self.name in symbol_table.symbols else NO_CELL
+        return self.cell.value
+
+    # A cached AST is pickled, the cache starts over when it is loaded
+    def __reduce__(self):
+        return (GlobalCache, (self.name, self.pos_start, self.pos_end))
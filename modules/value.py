@@ -1,29 +1,23 @@
 import math
-from modules.errors import RTError
+import weakref
+from compiler.signals import Failure
+from modules.errors import OperandError, RTError
 ###############################
 # VALUES
+# Values hold nothing but what they are: no position and no context, and
+# __slots__ instead of a __dict__. An operation that fails returns an error
+# without a position, which the engine places at the node it was running
+# (see operation_error)
 ###############################
 
 class Value:
-    def __init__(self):
-        self.set_pos()
-        self.set_context()
-    
-    def set_pos(self, pos_start=None, pos_end=None):
-        self.pos_start = pos_start
-        self.pos_end = pos_end
-        return self
-    
+    __slots__ = ()
+
     def copy(self):
         raise Exception('No copy method defined')
     
-    def set_context(self, context=None):
-        self.context = context
-        return self
-    
     def illegal_operation(self, other=None):
-        if not other: other = self
-        return RTError(self.pos_start, other.pos_end, 'Illegal operation', self.context)
+        return RTError(None, None, 'Illegal operation', None)
     
     def added_to(self, other):
         return None, self.illegal_operation(other)
@@ -67,11 +61,12 @@ class Value:
     def ored_by(self, other):
         return None, self.illegal_operation(other)
 
-    def notted(self, other):
-        return None, self.illegal_operation(other)
+    def notted(self):
+        return None, self.illegal_operation()
     
-    def execute(self, other):
-        return None, self.illegal_operation(other)
+    # Only functions can be called
+    def execute(self, args, interpreter, context, pos_start, pos_end, run=None):
+        raise Failure(RTError(pos_start, pos_end, 'Illegal operation', context))
 
     def is_true(self):
         return False
@@ -80,29 +75,28 @@ class Value:
         return str(self.value)
 
 class String(Value):
+    # Literals are pooled in a WeakValueDictionary
+    __slots__ = ('value', '__weakref__')
+
     def __init__(self, value):
-        super().__init__()
         self.value = value
 
     def added_to(self, other):
         if isinstance(other, String) or isinstance(other, Number):
-            return String(self.value + str(other.value)).set_context(self.context), None
+            return String(self.value + str(other.value)), None
         else:
             return None, self.illegal_operation(other)
 
     def multed_by(self, other):
         if isinstance(other, Number):
-            return String(self.value * other.value).set_context(self.context), None
+            return String(self.value * other.value), None
         else:
             return None, self.illegal_operation(other)
     def is_true(self):
         return len(self.value) > 0
     
     def copy(self):
-        copy = String(self.value)
-        copy.set_pos(self.pos_start, self.pos_end)
-        copy.set_context(self.context)
-        return copy
+        return String(self.value)
 
     def __str__(self):
         return self.value
@@ -111,125 +105,110 @@ class String(Value):
         return f'"{self.value}"'
 
 class Number(Value):
+    __slots__ = ('value', '__weakref__')
+
     def __init__(self, value):
-        super().__init__()
         self.value = value
-       
-    def set_pos(self, pos_start=None, pos_end=None):
-        self.pos_start = pos_start
-        self.pos_end = pos_end
-        return self
     
     def added_to(self, other):
         if isinstance(other, Number):
-            return Number(self.value + other.value).set_context(self.context), None
+            return Number(self.value + other.value), None
         elif isinstance(other, String):
-            return String(str(self.value) + other.value).set_context(self.context), None
+            return String(str(self.value) + other.value), None
         else:
             return None, self.illegal_operation(other)
         
     def subbed_by(self, other):
         if isinstance(other, Number):
-            return Number(self.value - other.value).set_context(self.context), None
+            return Number(self.value - other.value), None
         else:
-            return None, Value.illegal_operation(self.pos_start, other.pos_end, self.context)
+            return None, self.illegal_operation(other)
         
     def multed_by(self, other):
         if isinstance(other, Number):
-            return Number(self.value * other.value).set_context(self.context), None
+            return Number(self.value * other.value), None
         else:
-            return None, Value.illegal_operation(self.pos_start, other.pos_end, self.context)
+            return None, self.illegal_operation(other)
         
     def dived_by(self, other):
         if isinstance(other, Number):
             if other.value == 0:
-                return None, RTError(other.pos_start, other.pos_end, 'Division by zero', self.context)
-            return Number(self.value / other.value).set_context(self.context), None
+                return None, OperandError('Division by zero')
+            return Number(self.value / other.value), None
         else:
-            return None, Value.illegal_operation(self.pos_start, other.pos_end, self.context)
+            return None, self.illegal_operation(other)
     
     def modded_by(self, other):
         if isinstance(other, Number):
             if other.value == 0:
-                return None, RTError(
-                    other.pos_start, other.pos_end,
-                    'Division by zero',
-                    self.context
-                )
-            return Number(self.value % other.value).set_context(self.context), None
+                return None, OperandError('Division by zero')
+            return Number(self.value % other.value), None
         else:
-            return None, Value.illegal_operation(self, other)
+            return None, self.illegal_operation(other)
 
     def powed_by(self, other):
         if isinstance(other, Number):
-            return Number(self.value ** other.value).set_context(self.context), None
+            return Number(self.value ** other.value), None
         else:
-            return None, Value.illegal_operation(self.pos_start, other.pos_end, self.context)
+            return None, self.illegal_operation(other)
     
     def get_comparison_eq(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value == other.value)).set_context(self.context), None
+            return Number(int(self.value == other.value)), None
         else:
-            return None, Value.illegal_operation(self.pos_start, other.pos_end, self.context)
+            return None, self.illegal_operation(other)
     
     def get_comparison_ne(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value != other.value)).set_context(self.context), None
+            return Number(int(self.value != other.value)), None
         else:
-            return None, Value.illegal_operation(self.pos_start, other.pos_end, self.context)
+            return None, self.illegal_operation(other)
     
     def get_comparison_lt(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value < other.value)).set_context(self.context), None
+            return Number(int(self.value < other.value)), None
         else:
-            return None, Value.illegal_operation(self.pos_start, other.pos_end, self.context)
+            return None, self.illegal_operation(other)
     
     def get_comparison_gt(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value > other.value)).set_context(self.context), None
+            return Number(int(self.value > other.value)), None
         else:
-            return None, Value.illegal_operation(self.pos_start, other.pos_end, self.context)
+            return None, self.illegal_operation(other)
 
     def get_comparison_lte(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value <= other.value)).set_context(self.context), None
+            return Number(int(self.value <= other.value)), None
         else:
-            return None, Value.illegal_operation(self.pos_start, other.pos_end, self.context)
+            return None, self.illegal_operation(other)
         
     def get_comparison_gte(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value >= other.value)).set_context(self.context), None
+            return Number(int(self.value >= other.value)), None
         else:
-            return None, Value.illegal_operation(self.pos_start, other.pos_end, self.context)
+            return None, self.illegal_operation(other)
     
     def anded_by(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value and other.value)).set_context(self.context), None
+            return Number(int(self.value and other.value)), None
         else:
-            return None, Value.illegal_operation(self.pos_start, other.pos_end, self.context)
+            return None, self.illegal_operation(other)
         
     def ored_by(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value or other.value)).set_context(self.context), None
+            return Number(int(self.value or other.value)), None
         else:
-            return None, Value.illegal_operation(self.pos_start, other.pos_end, self.context)
+            return None, self.illegal_operation(other)
 
     def notted(self):
-        return Number(1 if self.value == 0 else 0).set_context(self.context), None
+        return Number(1 if self.value == 0 else 0), None
     
     def is_true(self):
         return self.value != 0
 
     def copy(self):
-        copy = Number(self.value)
-        copy.set_pos(self.pos_start, self.pos_end)
-        copy.set_context(self.context)
-        return copy
-
-    def set_context(self, context=None):
-        self.context = context
-        return self
-        
+        return Number(self.value)
+
     def __repr__(self):
         return str(self.value)
     
@@ -237,4 +216,38 @@ class Number(Value):
 Number.null = Number(0)
 Number.false = Number(0)
 Number.true = Number(1)
-Number.math_PI = math.pi
\ No newline at end of file
+Number.math_PI = Number(math.pi)
+
+# Numbers for the small integers, shared by every result that is one
+SMALL_NUMBERS = [Number(value) for value in range(-5, 1025)]
+
+# Number(value) without the calls, for the engines' hot paths. A small
+# integer comes from SMALL_NUMBERS, a float never does: 1.0 prints as 1.0
+def new_number(value):
+    if type(value) is int and -5 <= value <= 1024: return SMALL_NUMBERS[value + 5]
+    number = object.__new__(Number)
+    number.value = value
+    return number
+
+# Values of the literals, one per distinct constant while an AST uses it.
+# Literal nodes take theirs when they are built, so running a literal gives
+# the same value every time instead of building one
+CONSTANT_POOL = weakref.WeakValueDictionary()
+
+def constant(value_type, value):
+    key = (value_type, type(value), value)
+    pooled = CONSTANT_POOL.get(key)
+    if pooled is None:
+        pooled = value_type(value)
+        CONSTANT_POOL[key] = pooled
+    return pooled
+
+# Places the error of a failed operation at the node that ran it: the
+# operation spans pos_start to pos_end and its right operand starts at
+# right_start. A unary operation passes its operand's start for both
+def operation_error(error, pos_start, right_start, pos_end, context):
+    error.pos_start = right_start if isinstance(error, OperandError) else pos_start
+    error.pos_end = pos_end
+    error.context = context
+    error.keep_sources()
+    return error
@@ -1,10 +1,21 @@
+import sys
 import compiler.run as run
 from compiler.lexer import Lexer
+from modules.diagnostics import FileDiagnostics, set_diagnostics, enable_tracing
+
+# --tables writes token_table.txt and symbol_table.txt for every line
+if "--tables" in sys.argv: set_diagnostics(FileDiagnostics())
+# --trace dumps the scopes of user function calls to scope_trace.txt
+if "--trace" in sys.argv: enable_tracing()
+# --no-optimize interprets every line without constant folding
+optimize = "--no-optimize" not in sys.argv
+# --engine=vm, --engine=closures or --engine=python runs every line on another engine
+engine = next((arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--engine=")), 'interpreter')
 
 while True:
     text = input('CoffeeScript > ')
     if text.strip() == "": continue
-    result, error, context = run.run('<stdin>', text)
+    result, error, context = run.run('<stdin>', text, optimize=optimize, engine=engine)
     if error: print(error.as_string())
     elif result: 
         if len(result.elements) == 1: print(repr(result.elements[0]))